@@ -1,17 +1,25 @@
 import os
 import re
 import time
+import codecs
 import threading
-import random
 import json
-import subprocess
 import logging
 import platform
 import tkinter as tk
 from tkinter import simpledialog  # Para renomear
+import tkinter.font as tkfont
 import sys
 import webbrowser
 
+import votemap_engine
+from votemap_engine import (ServidorEngine, ServidorEngineListener, FilaEventos, MedidorTrocaMapa, NOMES_ETAPAS,
+                            CONFIG_FILENAME, LOG_FILENAME)
+
+if __name__ == '__main__' and '--headless' in sys.argv[1:]:
+    # Modo sem janela: sai antes de importar ttkbootstrap/pystray, que exigem um display
+    sys.exit(votemap_engine.main(sys.argv[1:]))
+
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from ttkbootstrap.tooltip import ToolTip
@@ -30,14 +38,8 @@ try:
 except ImportError:
     PYWIN32_AVAILABLE = False
 
-# Configure logging (ajustado)
-logging.basicConfig(
-    level=logging.INFO,  # Use INFO para produção, DEBUG para desenvolvimento
-    format='%(asctime)s - %(levelname)s - [%(threadName)s] - %(module)s.%(funcName)s:%(lineno)d - %(message)s',
-    filename='votemap_patch_multi.log',  # Nome de log diferente
-    filemode='a',
-    encoding='utf-8'
-)
+# Configure logging: gravação em thread própria, com rotação ('log_level', 'log_max_mb' e 'log_backups' na configuração)
+votemap_engine.configurar_logging(**votemap_engine.opcoes_log_da_config(CONFIG_FILENAME))
 
 
 def resource_path(relative_path):
@@ -50,6 +52,474 @@ def resource_path(relative_path):
 
 ICON_FILENAME = "pred.ico"
 ICON_PATH = resource_path(ICON_FILENAME)
+UI_FLUSH_INTERVAL_MS = 50  # Cadência com que a fila de eventos das threads é aplicada na GUI
+LOG_TRIM_BATCH_LINES = 500  # Folga acima do limite de linhas antes de cortar o início do log (corte em lote)
+TK_LAG_PROBE_MS = 250  # Intervalo da medição de atraso do loop do Tk (só com o endpoint de métricas ativo)
+SYSTEM_LOG_INTERVAL_MS = 3000  # Verificação de novas linhas no Log do Sistema (só com a aba visível)
+SYSTEM_LOG_MAX_LEITURA_BYTES = 2 * 1024 * 1024  # Por leitura (primeira ou atrasada), só o fim vai para a tela
+SYSTEM_LOG_MAX_LINHAS = 50000  # Linhas guardadas na aba Log do Sistema (rotações se acumulam na mesma vista)
+
+
+# ############################################################################
+# # Fila de despacho para a GUI: threads enfileiram, a thread do Tk drena em lote
+# ############################################################################
+class UIDispatchQueue:
+    """Leva os eventos das threads do motor para a GUI em lotes, a cada UI_FLUSH_INTERVAL_MS.
+
+    Por baixo é uma FilaEventos (limitada): chamadas prioritárias saem
+    primeiro em cada flush e nunca são descartadas; status e atualizações com chave
+    mantêm só a mais recente; o texto de log de cada aba vira um único insert, com no
+    máximo FILA_EXIBICAO_MAX_LINHAS linhas pendentes por aba. Acima disso as linhas
+    mais antigas são descartadas e o flush avisa quantas. Nada aqui toca no Tcl fora da thread da GUI.
+    """
+
+    _CHAVE_STATUS = object()
+
+    def __init__(self, root, aplicar_status, intervalo_ms=UI_FLUSH_INTERVAL_MS):
+        self.root = root
+        self._aplicar_status = aplicar_status
+        self.intervalo_ms = intervalo_ms
+        self.fila = FilaEventos()
+        self._after_id = None
+
+    def adicionar_texto(self, tab, texto):
+        self.fila.publicar_linhas(tab, texto)
+
+    def definir_status(self, mensagem):
+        self.fila.publicar_coalescido(self._CHAVE_STATUS, (self._aplicar_status, (mensagem,)))
+
+    def agendar(self, chave, func, *args):
+        """Executa func(*args) no próximo flush; com a mesma chave, só a última chamada vale."""
+        self.fila.publicar_coalescido(object() if chave is None else chave, (func, args))
+
+    def agendar_prioritario(self, func, *args):
+        """Executa func(*args) no início do próximo flush, antes de qualquer texto ou status. Nunca descartada."""
+        self.fila.publicar_prioritario((func, args))
+
+    def profundidade(self):
+        """Atualizações aguardando o próximo flush (chamável de qualquer thread)."""
+        return self.fila.profundidade()
+
+    @property
+    def linhas_descartadas(self):
+        return self.fila.descartadas_total
+
+    def start(self):
+        if self._after_id is None:
+            self._after_id = self.root.after(self.intervalo_ms, self._drenar)
+
+    def stop(self):
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except tk.TclError:
+                pass
+            self._after_id = None
+
+    def _drenar(self):
+        prioritarios, coalescidos, textos = self.fila.retirar()
+
+        for func, args in prioritarios:
+            self._executar(func, args)
+        for func, args in coalescidos:
+            self._executar(func, args)
+        for tab, (texto, descartadas) in textos.items():
+            if descartadas:
+                texto = f"[... {descartadas} linha(s) descartada(s): log chegando mais rápido que a tela ...]\n" + texto
+            tab._append_text_to_log_area_gui_thread(texto)  # Um insert e um scroll por aba
+
+        try:
+            self._after_id = self.root.after(self.intervalo_ms, self._drenar)
+        except tk.TclError:  # Janela principal destruída
+            self._after_id = None
+
+    @staticmethod
+    def _executar(func, args):
+        try:
+            func(*args)
+        except tk.TclError as e_tcl:  # Widget destruído entre o agendamento e o flush
+            logging.debug(f"UIDispatchQueue: TclError ao aplicar atualização agendada: {e_tcl}")
+        except Exception as e_chamada:
+            logging.error(f"UIDispatchQueue: erro ao aplicar atualização agendada: {e_chamada}", exc_info=True)
+
+
+# ############################################################################
+# # Leitura incremental de um arquivo de texto que pode rotacionar (Log do Sistema)
+# ############################################################################
+class LeitorIncrementalLog:
+    """Lê só os bytes acrescentados desde a última chamada, lembrando offset e identidade do arquivo.
+
+    Se o arquivo mudou de identidade (rotação do RotatingFileHandler) o que faltava do
+    arquivo antigo é lido de "<caminho>.1", quando ele é o mesmo arquivo, e a leitura
+    recomeça do início do novo. Se encolheu (truncado), recomeça do início.
+
+    Nenhuma leitura passa de ``max_bytes`` por arquivo: na primeira, ao voltar de uma aba
+    escondida ou depois de uma rotação, só o fim do que falta é lido (a partir de uma
+    linha inteira) e o salto vira uma linha de aviso no texto.
+    """
+
+    def __init__(self, caminho, encoding='utf-8', max_bytes=0):
+        self.caminho = caminho
+        self.encoding = encoding
+        self.max_bytes = max_bytes  # 0 = sem limite
+        self._identidade = None
+        self._offset = 0
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+
+    def ler_novo(self):
+        """Devolve (rotacionado, texto). texto vazio = nada de novo. FileNotFoundError se o arquivo não existe."""
+        st = os.stat(self.caminho)
+        identidade = votemap_engine.identidade_arquivo(st)
+        if self._identidade is None:  # Primeira leitura: só o fim de um arquivo grande, sem aviso
+            return False, self._ler_desde(identidade, 0, avisar_salto=False)
+        if identidade != self._identidade:
+            resto = self._ler_resto_rotacionado()
+            self._decoder.reset()
+            return True, resto + self._ler_desde(identidade, 0)
+        if st.st_size < self._offset:  # Truncado
+            self._decoder.reset()
+            return True, self._ler_desde(identidade, 0)
+        if st.st_size == self._offset:
+            return False, ""
+        return False, self._ler_desde(identidade, self._offset)
+
+    def _abrir_a_partir(self, f, offset):
+        """Posiciona f em offset ou, se faltar mais que max_bytes, nos últimos max_bytes. Devolve os bytes pulados."""
+        tamanho = f.seek(0, os.SEEK_END)
+        inicio = offset
+        if self.max_bytes and tamanho - offset > self.max_bytes:
+            inicio = tamanho - self.max_bytes
+        f.seek(inicio)
+        return inicio - offset
+
+    def _ler_desde(self, identidade, offset, avisar_salto=True):
+        with open(self.caminho, 'rb') as f:
+            pulados = self._abrir_a_partir(f, offset)
+            dados = f.read(self.max_bytes) if self.max_bytes else f.read()
+        self._identidade = identidade
+        self._offset = offset + pulados + len(dados)
+        return self._decodificar(dados, pulados, avisar_salto)
+
+    def _decodificar(self, dados, pulados, avisar_salto=True, final=False):
+        if not pulados:
+            return self._decoder.decode(dados, final=final)
+        # Começou no meio de uma linha: descarta o pedaço
+        self._decoder.reset()
+        quebra = dados.find(b"\n")
+        texto = self._decoder.decode(dados[quebra + 1:] if quebra >= 0 else b"", final=final)
+        return f"[... {pulados} bytes omitidos ...]\n" + texto if avisar_salto else texto
+
+    def _ler_resto_rotacionado(self):
+        """O que foi gravado no arquivo antigo entre a última leitura e a rotação (se ainda é o '.1')."""
+        caminho_antigo = self.caminho + ".1"
+        try:
+            if votemap_engine.identidade_arquivo(os.stat(caminho_antigo)) != self._identidade:
+                return ""
+            with open(caminho_antigo, 'rb') as f:
+                pulados = self._abrir_a_partir(f, self._offset)
+                dados = f.read(self.max_bytes) if self.max_bytes else f.read()
+            return self._decodificar(dados, pulados, final=True)
+        except OSError:
+            return ""
+
+
+# ############################################################################
+# # Visualizador de log virtualizado: as linhas ficam numa lista Python e só a janela visível vai para o Tk
+# ############################################################################
+class VirtualLogView(ttk.Frame):
+    """Substituto do ScrolledText para logs longos.
+
+    As linhas ficam em uma lista (com deslocamento de início, para cortar a cabeça
+    sem copiar) e o widget Text só recebe as linhas visíveis mais uma pequena margem.
+    Anexar e rolar custam o mesmo com mil ou com milhões de linhas guardadas.
+
+    auto_scroll_var: BooleanVar que liga o "seguir o fim"; se None, segue o fim
+    apenas quando a vista já estava no fim (comportamento do Log do Sistema).
+    """
+    MARGEM_LINHAS = 5
+
+    def __init__(self, master, auto_scroll_var=None, max_linhas=0, **kwargs):
+        super().__init__(master, **kwargs)
+        self.auto_scroll_var = auto_scroll_var
+        self.max_linhas = max_linhas  # 0 = sem limite
+        self._linhas = []
+        self._inicio = 0  # Índice da primeira linha válida em _linhas
+        self._ultima_aberta = False  # A última linha ainda não recebeu o '\n'
+        self._topo = 0  # Primeira linha exibida (relativa a _inicio)
+        self._destaque = None  # (linha, coluna, tamanho) do resultado de busca atual
+        self._render_pendente = False
+
+        self.texto = tk.Text(self, wrap='none', height=10, state='disabled', undo=False)
+        self._scroll_y = ttk.Scrollbar(self, orient='vertical', command=self._yview)
+        self._scroll_x = ttk.Scrollbar(self, orient='horizontal', command=self.texto.xview)
+        self.texto.configure(xscrollcommand=self._scroll_x.set)
+        self.texto.tag_config("search_match", background="yellow", foreground="black")  # Cores de destaque
+        self._scroll_y.pack(side='right', fill='y')
+        self._scroll_x.pack(side='bottom', fill='x')
+        self.texto.pack(side='left', fill='both', expand=True)
+
+        self.texto.bind("<Configure>", lambda e: self._agendar_render())
+        for sequencia in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.texto.bind(sequencia, self._on_roda_mouse)
+        self.texto.bind("<Prior>", lambda e: self._rolar(-self._linhas_visiveis()))
+        self.texto.bind("<Next>", lambda e: self._rolar(self._linhas_visiveis()))
+        self.texto.bind("<Up>", lambda e: self._rolar(-1))
+        self.texto.bind("<Down>", lambda e: self._rolar(1))
+        self.texto.bind("<Control-Home>", lambda e: self._rolar_para(0))
+        self.texto.bind("<Control-End>", lambda e: self._rolar_para(self.total_linhas()))
+
+    # --- Store ---
+    def total_linhas(self):
+        return len(self._linhas) - self._inicio
+
+    def adicionar(self, texto):
+        """Anexa texto (pode conter várias linhas e terminar sem '\\n')."""
+        if not texto:
+            return
+        no_fim = self._topo >= self.total_linhas() - self._linhas_visiveis()
+        pedacos = texto.split("\n")
+        if self._ultima_aberta and self.total_linhas():
+            self._linhas[-1] += pedacos[0]
+            if len(pedacos) == 1:
+                self._agendar_render()
+                return
+            del pedacos[0]
+        ultimo = pedacos.pop()
+        self._linhas.extend(pedacos)
+        self._ultima_aberta = bool(ultimo)
+        if ultimo:
+            self._linhas.append(ultimo)
+        self._cortar_excesso()
+        if self._seguir_fim(no_fim):
+            self._topo = self.total_linhas()  # Ajustado para a última página no render
+        self._agendar_render()
+
+    def substituir(self, texto):
+        """Troca todo o conteúdo, mantendo a posição de leitura (ou o fim, se a vista estava no fim)."""
+        no_fim = self._topo >= self.total_linhas() - self._linhas_visiveis()
+        topo_anterior = self._topo
+        self._linhas, self._inicio, self._ultima_aberta = [], 0, False
+        self._destaque = None
+        self.adicionar(texto)
+        self._topo = self.total_linhas() if no_fim else topo_anterior
+        self._agendar_render()
+
+    def limpar(self):
+        self._linhas, self._inicio, self._ultima_aberta = [], 0, False
+        self._topo = 0
+        self._destaque = None
+        self._agendar_render()
+
+    def obter_texto(self):
+        texto = "\n".join(self._linhas[self._inicio:])
+        return texto if self._ultima_aberta or not texto else texto + "\n"
+
+    def _cortar_excesso(self):
+        """Descarta a cabeça em lotes de LOG_TRIM_BATCH_LINES quando passa de max_linhas."""
+        excesso = self.total_linhas() - self.max_linhas
+        if self.max_linhas <= 0 or excesso <= LOG_TRIM_BATCH_LINES:
+            return
+        self._inicio += excesso
+        self._topo = max(0, self._topo - excesso)
+        if self._destaque:
+            linha = self._destaque[0] - excesso
+            self._destaque = (linha,) + self._destaque[1:] if linha >= 0 else None
+        if self._inicio > len(self._linhas) // 2:  # Compacta de vez em quando: custo amortizado O(1)
+            del self._linhas[:self._inicio]
+            self._inicio = 0
+
+    def _seguir_fim(self, estava_no_fim):
+        if self.auto_scroll_var is None:
+            return estava_no_fim
+        try:
+            return bool(self.auto_scroll_var.get())
+        except tk.TclError:
+            return False
+
+    # --- Rolagem e renderização ---
+    def _linhas_visiveis(self):
+        try:
+            altura_linha = tkfont.nametofont(self.texto.cget("font")).metrics("linespace")
+        except tk.TclError:
+            altura_linha = 15
+        return max(1, self.texto.winfo_height() // max(1, altura_linha))
+
+    def _rolar_para(self, topo):
+        self._topo = max(0, int(topo))
+        self._agendar_render()
+        return "break"
+
+    def _topo_efetivo(self):
+        """_topo limitado à última página (o "seguir o fim" guarda _topo além do total)."""
+        return max(0, min(self._topo, self.total_linhas() - self._linhas_visiveis()))
+
+    def _rolar(self, delta):
+        return self._rolar_para(self._topo_efetivo() + delta)
+
+    def _on_roda_mouse(self, event):
+        if getattr(event, 'num', None) == 4:
+            return self._rolar(-3)
+        if getattr(event, 'num', None) == 5:
+            return self._rolar(3)
+        return self._rolar(-3 * int(event.delta / 120) if abs(event.delta) >= 120 else (-1 if event.delta > 0 else 1))
+
+    def _yview(self, *args):
+        total = self.total_linhas()
+        if not args:
+            return
+        if args[0] == 'moveto':
+            self._rolar_para(float(args[1]) * total)
+        elif args[0] == 'scroll':
+            passos = int(args[1])
+            if len(args) > 2 and args[2] == 'pages':
+                passos *= self._linhas_visiveis()
+            self._rolar(passos)
+
+    def _agendar_render(self):
+        if not self._render_pendente:
+            self._render_pendente = True
+            self.after_idle(self._renderizar)
+
+    def _renderizar(self):
+        self._render_pendente = False
+        try:
+            if self.texto.winfo_exists():
+                self._renderizar_janela()
+        except tk.TclError:  # Janela fechando
+            pass
+
+    def _renderizar_janela(self):
+        total = self.total_linhas()
+        visiveis = self._linhas_visiveis()
+        self._topo = max(0, min(self._topo, total - visiveis))
+        fim = min(total, self._topo + visiveis + self.MARGEM_LINHAS)
+        janela = self._linhas[self._inicio + self._topo:self._inicio + fim]
+
+        self.texto.configure(state='normal')
+        self.texto.delete('1.0', 'end')
+        self.texto.insert('1.0', "\n".join(janela))
+        if self._destaque and self._topo <= self._destaque[0] < fim:
+            linha, coluna, tamanho = self._destaque
+            inicio_idx = f"{linha - self._topo + 1}.{coluna}"
+            self.texto.tag_add("search_match", inicio_idx, f"{inicio_idx}+{tamanho}c")
+            self.texto.see(inicio_idx)  # Rolagem horizontal até o resultado
+        self.texto.configure(state='disabled')
+        self.texto.yview_moveto(0)
+        if total:
+            self._scroll_y.set(self._topo / total, min(1.0, (self._topo + visiveis) / total))
+        else:
+            self._scroll_y.set(0.0, 1.0)
+
+    # --- Busca ---
+    def limpar_destaque(self):
+        if self._destaque:
+            self._destaque = None
+            self._agendar_render()
+
+    def buscar(self, termo, para_frente=True):
+        """Procura termo (sem diferenciar maiúsculas) a partir do destaque atual, dando a volta. True se achou."""
+        total = self.total_linhas()
+        if not termo or not total:
+            return False
+        termo = termo.lower()
+        if self._destaque:
+            linha_atual, coluna_atual = self._destaque[0], self._destaque[1]
+        else:
+            topo = self._topo_efetivo()
+            linha_atual, coluna_atual = (topo, -1) if para_frente else (
+                min(total - 1, topo + self._linhas_visiveis()), None)
+        linhas, base = self._linhas, self._inicio
+
+        if para_frente:
+            ordem = [(linha_atual, coluna_atual + 1)] + [(i, 0) for i in range(linha_atual + 1, total)] + \
+                    [(i, 0) for i in range(0, linha_atual + 1)]
+            for i, coluna in ordem:
+                pos = linhas[base + i].lower().find(termo, coluna)
+                if pos >= 0:
+                    return self._destacar(i, pos, len(termo))
+        else:
+            ordem = [(linha_atual, coluna_atual)] + [(i, None) for i in range(linha_atual - 1, -1, -1)] + \
+                    [(i, None) for i in range(total - 1, linha_atual - 1, -1)]
+            for i, coluna in ordem:
+                conteudo = linhas[base + i].lower()
+                limite = len(conteudo) if coluna is None else coluna + len(termo) - 1
+                pos = conteudo.rfind(termo, 0, max(0, limite))
+                if pos >= 0:
+                    return self._destacar(i, pos, len(termo))
+        self.limpar_destaque()
+        return False
+
+    def _destacar(self, linha, coluna, tamanho):
+        self._destaque = (linha, coluna, tamanho)
+        visiveis = self._linhas_visiveis()
+        self._topo = self._topo_efetivo()
+        if not (self._topo <= linha < self._topo + visiveis):
+            self._topo = max(0, linha - visiveis // 2)
+        self._agendar_render()
+        return True
+
+    def focus_set(self):
+        self.texto.focus_set()
+
+
+# ############################################################################
+# # Listener que leva os eventos do ServidorEngine para a aba (thread da GUI)
+# ############################################################################
+class _TabEngineListener(ServidorEngineListener):
+    def __init__(self, tab):
+        self.tab = tab
+
+    def linha_log(self, linha):
+        self.tab.append_text_to_log_area(linha)
+
+    def log(self, texto):
+        self.tab.append_text_to_log_area(texto)
+
+    def status(self, mensagem):
+        self.tab.app.set_status_from_thread(mensagem)
+
+    def mensagem(self, tipo, titulo, texto):
+        self.tab.app.show_messagebox_from_thread(tipo, titulo, texto)
+
+    # Chamados fora da thread da GUI: só enfileiram (sem winfo_exists, que também é chamada Tcl)
+    def arquivo_log_alterado(self, nome_exibicao):
+        tab = self.tab
+        tab.app.ui_queue.agendar((tab, "log_label"), lambda p=nome_exibicao: tab.log_label_display.config(
+            text=f"LOG: {p}") if tab.log_label_display.winfo_exists() else None)
+
+    def json_alterado(self, tipo, caminho, estado, texto, externo=False):
+        # Chamado no pool do motor com o texto já formatado; a GUI só troca o texto e o rótulo.
+        # Gravações do próprio motor (após cada troca) atualizam a exibição em silêncio
+        tab = self.tab
+        json_type_name = "Servidor" if tipo == votemap_engine.JSON_SERVIDOR else "Votemap"
+        nome_arquivo = os.path.basename(caminho) if caminho else 'Nenhum'
+        if estado == votemap_engine.JSON_OK:
+            if externo:
+                tab.append_text_to_log_area(f"JSON de {json_type_name} '{nome_arquivo}' alterado externamente; recarregado.\n")
+            resultado = (texto, f"JSON {json_type_name}: {nome_arquivo}", "green")
+        elif estado == votemap_engine.JSON_INVALIDO:
+            tab.append_text_to_log_area(f"ERRO: JSON de {json_type_name} '{nome_arquivo}' é inválido.\n")
+            resultado = (f"ERRO: Conteúdo de '{nome_arquivo}' não é JSON válido.",
+                         f"JSON {json_type_name} (INVÁLIDO): {nome_arquivo}", "red")
+        elif estado == votemap_engine.JSON_ERRO_LEITURA:
+            tab.append_text_to_log_area(f"ERRO ao ler JSON de {json_type_name} '{nome_arquivo}': {texto}\n")
+            resultado = (f"ERRO ao ler '{nome_arquivo}': {texto}",
+                         f"JSON {json_type_name} (ERRO LEITURA): {nome_arquivo}", "red")
+        elif estado == votemap_engine.JSON_AUSENTE:
+            tab.append_text_to_log_area(f"Arquivo JSON de {json_type_name} '{caminho}' não encontrado.\n")
+            resultado = ("Arquivo não encontrado.", f"JSON {json_type_name} (NÃO ENC.): {nome_arquivo}", "orange")
+        else:
+            resultado = ("Não configurado.", f"JSON {json_type_name}: Nenhum", None)
+        tab.app.ui_queue.agendar((tab, "json", json_type_name), tab._exibir_json_lido, json_type_name, *resultado)
+
+    def servico_alterado(self):
+        self.tab.app.ui_queue.agendar((self.tab, "servico"), self.tab.update_service_status_display)
+
+    def pasta_raiz_perdida(self):
+        self.tab.app.ui_queue.agendar((self.tab, "pasta_raiz"), self.tab.pasta_raiz.set, "")
+
+    def latencias_atualizadas(self, resumo):
+        self.tab.app.ui_queue.agendar((self.tab, "latencias"), self.tab.atualizar_latencias, resumo)
 
 
 # ############################################################################
@@ -83,59 +553,66 @@ class ServidorTab(ttk.Frame):
         self.stop_delay_var = tk.IntVar(value=self.config_inicial.get("stop_delay", 10))
         self.start_delay_var = tk.IntVar(value=self.config_inicial.get("start_delay", 30))
         self.auto_scroll_log_var = tk.BooleanVar(value=self.config_inicial.get("auto_scroll_log", True))
+        self.max_log_lines_var = tk.IntVar(value=self.config_inicial.get("max_log_lines", 5000))
+        # Chave da configuração -> variável Tk (a ordem é a do arquivo salvo)
+        self._config_vars = {
+            "log_folder": self.pasta_raiz,
+            "server_json": self.arquivo_json,
+            "votemap_json": self.arquivo_json_votemap,
+            "service_name": self.nome_servico,
+            "filter": self.filtro_var,
+            "auto_restart": self.auto_restart_var,
+            "vote_pattern": self.vote_pattern_var,
+            "winner_pattern": self.winner_pattern_var,
+            "default_mission": self.default_mission_var,
+            "stop_delay": self.stop_delay_var,
+            "start_delay": self.start_delay_var,
+            "auto_scroll_log": self.auto_scroll_log_var,
+            "max_log_lines": self.max_log_lines_var,
+        }
 
         self.log_search_var = tk.StringVar()
-        self.last_search_pos = "1.0"
         self.search_log_frame_visible = False
 
-        # --- Atributos de Monitoramento ---
-        self._stop_event = threading.Event()
-        self._paused = False
-        self.log_monitor_thread = None
-        self.log_tail_thread = None
-        self.file_log_handle = None
-        self.caminho_log_atual = None
-        self.pasta_log_detectada_atual = None  # Para rastrear a pasta de log ex: 2023-10-27_10-00-00
+        # --- Motor de monitoramento (sem Tk); esta aba é só a interface dele ---
+        self.engine = ServidorEngine(
+            self.nome, self._config_para_motor(), listener=_TabEngineListener(self), reactor=self.app.reactor,
+            checkpoints=votemap_engine.CheckpointStore.compartilhado(
+                votemap_engine.caminho_checkpoints(self.app.config_file))
+        )  # A troca de mapa roda no pool do motor; só o resultado passa pela fila da GUI
+        self.engine.iniciar_observacao_json()  # Painéis de JSON acompanham edições externas sozinhos
 
         self._create_ui_for_tab()
         self.initialize_from_config_vars()
 
-        # Adicionar listeners para detectar mudanças e notificar app principal
-        vars_to_trace_str = [
-            self.pasta_raiz, self.arquivo_json, self.arquivo_json_votemap, self.nome_servico,
-            self.filtro_var, self.vote_pattern_var, self.winner_pattern_var, self.default_mission_var
-        ]
-        vars_to_trace_bool = [self.auto_restart_var, self.auto_scroll_log_var]
-        vars_to_trace_int = [self.stop_delay_var, self.start_delay_var]
-
-        for var in vars_to_trace_str:
-            var.trace_add("write", lambda *args, v=var: self._value_changed(v.get()))
-        for var in vars_to_trace_bool:
-            var.trace_add("write", lambda *args, v=var: self._value_changed(v.get()))
-        for var in vars_to_trace_int:
-            var.trace_add("write", lambda *args, v=var: self._value_changed(v.get()))
-
-    def _value_changed(self, new_value=None):  # new_value é para o trace
-        # logging.debug(f"Tab '{self.nome}': Value changed to '{new_value}'")
+        # Qualquer mudança gera um novo snapshot imutável para o motor e marca a config como alterada
+        for var in self._config_vars.values():
+            var.trace_add("write", lambda *args: self._value_changed())
+
+    def _value_changed(self):
+        self.sync_engine_config()
         self.app.mark_config_changed()
 
+    def sync_engine_config(self):
+        """Troca o snapshot de configuração do motor (os workers nunca leem as variáveis Tk)."""
+        self.engine.atualizar_config(self._config_para_motor())
+
+    def _config_para_motor(self):
+        """Valores atuais das variáveis; um campo com texto inválido (Spinbox sendo editado) fica
+        de fora e o snapshot do motor mantém o valor anterior dele."""
+        dados = {"nome": self.nome}
+        for chave, var in self._config_vars.items():
+            try:
+                dados[chave] = var.get()
+            except tk.TclError:
+                pass
+        return dados
+
     def get_current_config(self):
         """Retorna a configuração atual desta aba de servidor."""
-        return {
-            "nome": self.nome,  # O nome da aba é gerenciado por LogViewerApp, mas útil ter aqui
-            "log_folder": self.pasta_raiz.get(),
-            "server_json": self.arquivo_json.get(),
-            "votemap_json": self.arquivo_json_votemap.get(),
-            "service_name": self.nome_servico.get(),
-            "filter": self.filtro_var.get(),
-            "auto_restart": self.auto_restart_var.get(),
-            "vote_pattern": self.vote_pattern_var.get(),
-            "winner_pattern": self.winner_pattern_var.get(),
-            "default_mission": self.default_mission_var.get(),
-            "stop_delay": self.stop_delay_var.get(),
-            "start_delay": self.start_delay_var.get(),
-            "auto_scroll_log": self.auto_scroll_log_var.get(),
-        }
+        config = {"nome": self.nome}  # O nome da aba é gerenciado por LogViewerApp, mas útil ter aqui
+        config.update((chave, var.get()) for chave, var in self._config_vars.items())
+        return config
 
     def _create_ui_for_tab(self):
         # Frame superior para botões de seleção e labels de caminho
@@ -210,7 +687,8 @@ class ServidorTab(ttk.Frame):
         ttk.Label(log_controls_subframe, text="Filtro:").pack(side='left', padx=(0, 5))
         self.filtro_entry = ttk.Entry(log_controls_subframe, textvariable=self.filtro_var, width=20)
         self.filtro_entry.pack(side='left', padx=(0, 5))
-        ToolTip(self.filtro_entry, text="Filtra as linhas de log exibidas (case-insensitive).")
+        ToolTip(self.filtro_entry, text="Filtra as linhas de log exibidas (case-insensitive).\n"
+                                        "Vários termos separados por vírgula; -termo exclui; re:padrão usa RegEx.")
 
         self.refresh_json_btn = ttk.Button(log_controls_subframe, text="Atualizar JSONs",
                                            command=self.forcar_refresh_json_display, bootstyle=SUCCESS)
@@ -254,9 +732,10 @@ class ServidorTab(ttk.Frame):
         close_search_btn.pack(side='left', padx=(2, 5))
         # self.search_log_frame não é empacotado aqui, _toggle_log_search_bar fará isso.
 
-        self.text_area_log = ScrolledText(log_frame, wrap='word', height=10, state='disabled')  # Altura ajustada
+        self.text_area_log = VirtualLogView(log_frame, auto_scroll_var=self.auto_scroll_log_var,
+                                            max_linhas=self._get_max_log_lines())
         self.text_area_log.pack(fill='both', expand=True, pady=(0, 5))
-        self.text_area_log.bind("<Control-f>", lambda e: self._toggle_log_search_bar(force_show=True))
+        self.text_area_log.texto.bind("<Control-f>", lambda e: self._toggle_log_search_bar(force_show=True))
         # O bind Escape no root da app principal para fechar a barra de busca é feito em LogViewerApp
 
         self.auto_scroll_check = ttk.Checkbutton(log_frame, text="Rolar Auto.", variable=self.auto_scroll_log_var)
@@ -326,8 +805,35 @@ class ServidorTab(ttk.Frame):
         start_delay_spinbox = ttk.Spinbox(delay_frame, from_=5, to=180, textvariable=self.start_delay_var, width=5)
         start_delay_spinbox.pack(side='left', padx=5)
         ToolTip(start_delay_spinbox, "Tempo (s) para aguardar o servidor iniciar completamente.")
+
+        ttk.Label(delay_frame, text="Máx. linhas no log:").pack(side='left', padx=15)
+        max_log_lines_spinbox = ttk.Spinbox(delay_frame, from_=0, to=1000000, increment=1000,
+                                            textvariable=self.max_log_lines_var, width=8)
+        max_log_lines_spinbox.pack(side='left', padx=5)
+        ToolTip(max_log_lines_spinbox,
+                "Linhas mantidas na tela de logs desta aba; as mais antigas são descartadas (0 = sem limite).")
         options_inner_frame.columnconfigure(0, weight=1)  # Para expandir entries
 
+        # --- Aba de Latência (duração de cada etapa das trocas de mapa) ---
+        latency_frame = ttk.Frame(self.tab_notebook)
+        self.tab_notebook.add(latency_frame, text="Latência")
+        latency_top_frame = ttk.Frame(latency_frame)
+        latency_top_frame.pack(fill='x', padx=5, pady=(5, 0))
+        self.latency_last_label = ttk.Label(latency_top_frame, text="Nenhuma troca de mapa medida ainda.")
+        self.latency_last_label.pack(side='left')
+        latency_reset_btn = ttk.Button(latency_top_frame, text="Zerar", command=self.zerar_latencias,
+                                       bootstyle=SECONDARY)
+        latency_reset_btn.pack(side='right')
+        ToolTip(latency_reset_btn, text="Descarta as medições acumuladas desta aba.")
+        colunas = ("etapa", "amostras", "ultimo", "p50", "p95", "max")
+        self.latency_tree = ttk.Treeview(latency_frame, columns=colunas, show='headings', height=8)
+        for coluna, titulo, largura in (("etapa", "Etapa", 260), ("amostras", "Amostras", 80),
+                                        ("ultimo", "Última", 100), ("p50", "p50", 100), ("p95", "p95", 100),
+                                        ("max", "Máx.", 100)):
+            self.latency_tree.heading(coluna, text=titulo)
+            self.latency_tree.column(coluna, width=largura, anchor='w' if coluna == "etapa" else 'e')
+        self.latency_tree.pack(fill='both', expand=True, padx=5, pady=5)
+
     def initialize_from_config_vars(self):
         """Inicializa os labels e o monitoramento com base nas tk.StringVars já populadas."""
         default_fg = self.app.style.colors.fg if hasattr(self.app.style,
@@ -360,64 +866,34 @@ class ServidorTab(ttk.Frame):
         # logging.info(f"ServidorTab '{self.nome}' inicializado com base nas variáveis.")
 
     def forcar_refresh_json_display(self):
-        """Atualiza a exibição dos JSONs com base nos caminhos em self.arquivo_json e self.arquivo_json_votemap."""
-        # JSON do Servidor
-        self._refresh_single_json_display(
-            self.arquivo_json.get(),
-            self.json_text_area_server,
-            self.server_json_path_label_var,
-            self.json_server_path_label,
-            "Servidor"
-        )
-        # JSON do Votemap
-        self._refresh_single_json_display(
-            self.arquivo_json_votemap.get(),
-            self.json_text_area_votemap,
-            self.votemap_json_path_label_var,
-            self.json_votemap_path_label,
-            "Votemap"
-        )
+        """Relê os JSONs do servidor e do votemap no pool do motor, mesmo sem mudança no disco.
+
+        Fora isso os painéis se atualizam sozinhos: o motor observa os dois arquivos e só
+        entrega o texto quando o conteúdo muda (json_alterado).
+        """
+        self.sync_engine_config()
+        try:
+            self.engine.recarregar_jsons()
+        except RuntimeError:  # Pool já encerrado (app fechando)
+            return
         if self.app:  # Pode ser None durante a inicialização muito cedo
             self.app.set_status_from_thread(f"JSONs para '{self.nome}' atualizados.")
 
-    def _refresh_single_json_display(self, file_path, text_widget, label_var, label_widget, json_type_name):
-        default_fg = self.app.style.colors.fg if hasattr(self.app.style,
-                                                         'colors') and self.app.style.colors else "black"
-        if file_path:
-            if os.path.exists(file_path):
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        conteudo = f.read()
-                    json_data = json.loads(conteudo)  # Valida
-                    self._display_json_in_widget(text_widget, json_data)
-                    self.append_text_to_log_area(
-                        f"JSON de {json_type_name} '{os.path.basename(file_path)}' recarregado.\n")
-                    label_var.set(f"JSON {json_type_name}: {os.path.basename(file_path)}")
-                    label_widget.config(foreground="green")
-                except json.JSONDecodeError:
-                    self._display_json_in_widget(text_widget,
-                                                 f"ERRO: Conteúdo de '{os.path.basename(file_path)}' não é JSON válido.")
-                    self.append_text_to_log_area(
-                        f"ERRO: JSON de {json_type_name} '{os.path.basename(file_path)}' é inválido.\n")
-                    label_var.set(f"JSON {json_type_name} (INVÁLIDO): {os.path.basename(file_path)}")
-                    label_widget.config(foreground="red")
-                except Exception as e_read:
-                    self._display_json_in_widget(text_widget, f"ERRO ao ler '{os.path.basename(file_path)}': {e_read}")
-                    self.append_text_to_log_area(
-                        f"ERRO ao ler JSON de {json_type_name} '{os.path.basename(file_path)}': {e_read}\n")
-                    label_var.set(f"JSON {json_type_name} (ERRO LEITURA): {os.path.basename(file_path)}")
-                    label_widget.config(foreground="red")
-            else:
-                self.append_text_to_log_area(f"Arquivo JSON de {json_type_name} '{file_path}' não encontrado.\n")
-                self._display_json_in_widget(text_widget, "Arquivo não encontrado.")
-                label_var.set(
-                    f"JSON {json_type_name} (NÃO ENC.): {os.path.basename(file_path) if file_path else 'Nenhum'}")
-                label_widget.config(foreground="orange")
+    def _exibir_json_lido(self, json_type_name, texto, texto_label, cor):
+        """Aplica na aba (thread da GUI) um JSON lido e formatado pelo motor."""
+        if not self.winfo_exists():
+            return
+        if json_type_name == "Servidor":
+            text_widget, label_var, label_widget = (self.json_text_area_server, self.server_json_path_label_var,
+                                                    self.json_server_path_label)
         else:
-            self.append_text_to_log_area(f"Caminho do JSON de {json_type_name} não configurado.\n")
-            self._display_json_in_widget(text_widget, "Não configurado.")
-            label_var.set(f"JSON {json_type_name}: Nenhum")
-            label_widget.config(foreground=default_fg)
+            text_widget, label_var, label_widget = (self.json_text_area_votemap, self.votemap_json_path_label_var,
+                                                    self.json_votemap_path_label)
+        if cor is None:
+            cor = self.app.style.colors.fg if hasattr(self.app.style, 'colors') and self.app.style.colors else "black"
+        self._display_json_in_widget(text_widget, texto)
+        label_var.set(texto_label)
+        label_widget.config(foreground=cor)
 
     def _display_json_in_widget(self, text_area_widget, content):
         """Exibe o conteúdo (string ou dados JSON) formatado na área de texto."""
@@ -526,12 +1002,9 @@ class ServidorTab(ttk.Frame):
             current_text_base = f"Serviço: {nome_servico_val}"
             self.servico_label_var.set(f"{current_text_base} (Verificando...)")
             self.servico_label_widget.config(foreground="blue")  # Cor temporária enquanto verifica
-            threading.Thread(
-                target=self._get_and_display_service_status_thread_worker,
-                args=(nome_servico_val, current_text_base),
-                daemon=True,
-                name=f"ServiceStatusCheck-{self.nome}"
-            ).start()
+            # 'sc query' roda no pool fixo do motor, sem criar uma thread por consulta
+            self.app.reactor.executar_em_background(
+                self._get_and_display_service_status_thread_worker, nome_servico_val, current_text_base)
         else:
             self.servico_label_var.set("Serviço: Nenhum")
             default_fg = "orange"
@@ -540,7 +1013,7 @@ class ServidorTab(ttk.Frame):
             self.servico_label_widget.config(foreground=default_fg)
 
     def _get_and_display_service_status_thread_worker(self, service_name_to_check, base_text_for_label):
-        status = self._verificar_status_servico_win(service_name_to_check)  # Método interno
+        status = self.engine.verificar_status_servico(service_name_to_check)
         status_map_colors = {
             "RUNNING": ("(Rodando)", "green"),
             "STOPPED": ("(Parado)", "red"),
@@ -552,892 +1025,90 @@ class ServidorTab(ttk.Frame):
         }
         display_status_text, color = status_map_colors.get(status, ("(Status ?)", "gray"))
 
-        if self.app.root.winfo_exists() and self.winfo_exists():  # Verifica se a aba e a app ainda existem
-            self.app.root.after(0, lambda: (
-                self.servico_label_var.set(f"{base_text_for_label} {display_status_text}"),
-                self.servico_label_widget.config(foreground=color) if self.servico_label_widget.winfo_exists() else None
-            ))
-
-    def _verificar_status_servico_win(self, nome_servico_local):
-        """Verifica o status de um serviço do Windows usando 'sc query'."""
-        if not PYWIN32_AVAILABLE: return "ERROR"  # Deveria ser checado antes, mas por segurança
-        if not nome_servico_local: return "NOT_FOUND"
-        try:
-            startupinfo = None
-            if platform.system() == "Windows":
-                startupinfo = subprocess.STARTUPINFO()
-                startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                startupinfo.wShowWindow = subprocess.SW_HIDE
-
-            # Tentar com 'latin-1' para decodificar a saída do 'sc', comum em PT-BR Windows
-            # Se falhar, tentar com 'utf-8' como fallback.
-            encodings_to_try = ['latin-1', 'utf-8', 'cp850', 'cp1252']
-            output_text = None
-            for enc in encodings_to_try:
-                try:
-                    result = subprocess.run(
-                        ['sc', 'query', nome_servico_local],
-                        capture_output=True, text=False,  # text=False para decodificar manualmente
-                        check=False,  # Não levantar exceção para códigos de saída != 0
-                        startupinfo=startupinfo
-                    )
-                    # Tentar decodificar stdout e stderr
-                    stdout_decoded = result.stdout.decode(enc, errors='replace')
-                    stderr_decoded = result.stderr.decode(enc, errors='replace')
-                    output_text = stdout_decoded + stderr_decoded
-                    break  # Sucesso na decodificação
-                except UnicodeDecodeError:
-                    logging.warning(
-                        f"Tab '{self.nome}': Falha ao decodificar saída 'sc query' com {enc} para '{nome_servico_local}'. Tentando próximo.")
-                except Exception as e_run:  # Outros erros do subprocess
-                    logging.error(
-                        f"Tab '{self.nome}': Erro ao executar 'sc query' para '{nome_servico_local}': {e_run}",
-                        exc_info=True)
-                    return "ERROR"
-
-            if output_text is None:  # Se todas as tentativas de decodificação falharem
-                logging.error(
-                    f"Tab '{self.nome}': Não foi possível decodificar a saída de 'sc query' para '{nome_servico_local}'.")
-                return "ERROR"
-
-            output_lower = output_text.lower()
-
-            # Erros comuns para serviço não encontrado (incluindo PT-BR)
-            service_not_found_errors = [
-                "failed 1060", "falha 1060", "o servi‡o especificado nÆo existe como servi‡o instalado",
-                "specified service does not exist as an installed service"
-            ]
-            if any(err_str in output_lower for err_str in service_not_found_errors):
-                logging.warning(
-                    f"Tab '{self.nome}': Serviço '{nome_servico_local}' não encontrado via 'sc query'. Output: {output_text[:200]}")
-                return "NOT_FOUND"
-
-            if "state" not in output_lower:  # Se a palavra "STATE" não estiver na saída
-                logging.warning(
-                    f"Tab '{self.nome}': Saída inesperada de 'sc query {nome_servico_local}', sem 'STATE': {output_text[:200]}")
-                return "ERROR"  # Ou UNKNOWN se preferir
-
-            # Mapeamento de estados (incluindo PT-BR comuns)
-            if "running" in output_lower or "em execu‡Æo" in output_lower: return "RUNNING"
-            if "stopped" in output_lower or "parado" in output_lower: return "STOPPED"
-            if "start_pending" in output_lower or "pendente deinÝcio" in output_lower: return "START_PENDING"  # "início" com acento pode variar
-            if "stop_pending" in output_lower or "pendente deparada" in output_lower: return "STOP_PENDING"  # "parada" com acento pode variar
-
-            logging.info(
-                f"Tab '{self.nome}': Status desconhecido para '{nome_servico_local}' com saída: {output_text[:200]}")
-            return "UNKNOWN"
-
-        except FileNotFoundError:  # sc.exe não encontrado
-            logging.error(f"Tab '{self.nome}': 'sc.exe' não encontrado. Verifique se o System32 está no PATH.",
-                          exc_info=True)
-            # Não mostrar messagebox daqui, pois é uma thread worker. LogViewerApp pode mostrar se for um erro persistente.
-            return "ERROR"
-        except Exception as e:
-            logging.error(f"Tab '{self.nome}': Erro ao verificar status do serviço '{nome_servico_local}': {e}",
-                          exc_info=True)
-            return "ERROR"
+        self.app.ui_queue.agendar((self, "servico_label"), lambda: (
+            self.servico_label_var.set(f"{base_text_for_label} {display_status_text}"),
+            self.servico_label_widget.config(foreground=color) if self.servico_label_widget.winfo_exists() else None
+        ))
 
     def start_log_monitoring(self):
-        if self.log_monitor_thread and self.log_monitor_thread.is_alive():
-            logging.warning(f"Tab '{self.nome}': Tentativa de iniciar monitoramento de log já em execução.")
-            return
-        if not self.pasta_raiz.get() or not os.path.isdir(self.pasta_raiz.get()):
-            self.append_text_to_log_area(
-                f"AVISO: Pasta de logs '{self.pasta_raiz.get()}' inválida. Monitoramento não iniciado.\n")
-            return
-
-        self._stop_event.clear()
-        self.log_monitor_thread = threading.Thread(
-            target=self.monitorar_log_continuamente_worker,
-            daemon=True,
-            name=f"LogMonitor-{self.nome}"
-        )
-        self.log_monitor_thread.start()
-        logging.info(f"Tab '{self.nome}': Monitoramento de logs iniciado para pasta '{self.pasta_raiz.get()}'.")
+        self.sync_engine_config()
+        self.engine.start()
 
     def stop_log_monitoring(self, from_tab_closure=False):
-        """Para o monitoramento de logs desta aba."""
-        thread_name = threading.current_thread().name
-        logging.debug(f"Tab '{self.nome}' [{thread_name}]: Chamada para stop_log_monitoring.")
-        self._stop_event.set()
-
-        # Parar thread de acompanhamento de arquivo (log_tail_thread)
-        if self.log_tail_thread and self.log_tail_thread.is_alive():
-            logging.debug(
-                f"Tab '{self.nome}' [{thread_name}]: Aguardando LogTailThread ({self.log_tail_thread.name}) finalizar...")
-            self.log_tail_thread.join(timeout=2.0)  # Timeout para evitar bloqueio indefinido
-            if self.log_tail_thread.is_alive():
-                logging.warning(
-                    f"Tab '{self.nome}' [{thread_name}]: LogTailThread ({self.log_tail_thread.name}) não finalizou no tempo esperado.")
-        self.log_tail_thread = None
-
-        # Parar thread principal de monitoramento de pasta (log_monitor_thread)
-        if self.log_monitor_thread and self.log_monitor_thread.is_alive() and self.log_monitor_thread != threading.current_thread():
-            logging.debug(
-                f"Tab '{self.nome}' [{thread_name}]: Aguardando LogMonitorThread ({self.log_monitor_thread.name}) finalizar...")
-            self.log_monitor_thread.join(timeout=2.0)
-            if self.log_monitor_thread.is_alive():
-                logging.warning(
-                    f"Tab '{self.nome}' [{thread_name}]: LogMonitorThread ({self.log_monitor_thread.name}) não finalizou no tempo esperado.")
-        self.log_monitor_thread = None
-
-        # Fechar handle do arquivo de log
-        if self.file_log_handle:
-            try:
-                handle_name_for_log = getattr(self.file_log_handle, 'name', 'N/A')
-                logging.debug(
-                    f"Tab '{self.nome}' [{thread_name}]: Fechando file_log_handle para: {handle_name_for_log}")
-                self.file_log_handle.close()
-            except Exception as e:
-                logging.error(
-                    f"Tab '{self.nome}' [{thread_name}]: Erro ao fechar handle do log ({handle_name_for_log}): {e}",
-                    exc_info=True)
-            finally:
-                self.file_log_handle = None
-
-        self.caminho_log_atual = None
-        self.pasta_log_detectada_atual = None
-        if not from_tab_closure:  # Só loga se não for parte do fechamento da aba/app
-            logging.info(f"Tab '{self.nome}' [{thread_name}]: stop_log_monitoring completado.")
-
-    def monitorar_log_continuamente_worker(self):
-        """Thread worker para monitorar a pasta de logs e detectar novos arquivos/pastas de log."""
-        thread_name = threading.current_thread().name
-        pasta_raiz_monitorada = self.pasta_raiz.get()
-        self.app.set_status_from_thread(
-            f"'{self.nome}': Monitorando pasta: {os.path.basename(pasta_raiz_monitorada) if pasta_raiz_monitorada else 'N/A'}")
-        logging.info(f"[{thread_name}] Tab '{self.nome}': Iniciando monitoramento contínuo de: {pasta_raiz_monitorada}")
-
-        while not self._stop_event.is_set():
-            if not pasta_raiz_monitorada or not os.path.isdir(pasta_raiz_monitorada):
-                if pasta_raiz_monitorada:  # Se havia um caminho, mas agora é inválido
-                    logging.warning(
-                        f"[{thread_name}] Tab '{self.nome}': Pasta de logs '{pasta_raiz_monitorada}' não encontrada ou não é um diretório.")
-                # Não precisa setar status aqui, pois a UI já deve refletir a pasta inválida
-                if self._stop_event.wait(10): break  # Pausa longa se a pasta for inválida
-                pasta_raiz_monitorada = self.pasta_raiz.get()  # Re-checa se o usuário corrigiu
-                continue
-
-            try:
-                # Obter a subpasta de log mais recente (ex: .../logs/2023-10-27_10-00-00)
-                subpasta_log_recente = self._obter_subpasta_log_mais_recente(pasta_raiz_monitorada)
-
-                if not subpasta_log_recente:  # Nenhuma subpasta de log encontrada
-                    if self.caminho_log_atual:  # Se antes estávamos monitorando algo
-                        self.append_text_to_log_area(
-                            f"AVISO: Nenhuma subpasta de log encontrada em '{pasta_raiz_monitorada}'. Verificando...\n")
-                        self.caminho_log_atual = None  # Resetar
-                        if self.log_tail_thread and self.log_tail_thread.is_alive():  # Parar tail antigo
-                            self.log_tail_thread.join(timeout=1.0)
-                        if self.file_log_handle: self.file_log_handle.close(); self.file_log_handle = None
-                    if self._stop_event.wait(5): break  # Espera antes de checar de novo
-                    continue
-
-                # Caminho para o arquivo console.log dentro da subpasta mais recente
-                novo_arquivo_log_path_potencial = os.path.join(subpasta_log_recente, 'console.log')
-
-                # Se um novo arquivo de log foi detectado (diferente do atual) OU se não há log atual mas encontramos um
-                if os.path.exists(novo_arquivo_log_path_potencial) and \
-                        (novo_arquivo_log_path_potencial != self.caminho_log_atual or not self.caminho_log_atual):
-
-                    logging.info(
-                        f"[{thread_name}] Tab '{self.nome}': Novo arquivo de log detectado/mudança: '{novo_arquivo_log_path_potencial}' (anterior: '{self.caminho_log_atual}')")
-                    self.append_text_to_log_area(
-                        f"\n>>> Monitorando novo arquivo de log: {novo_arquivo_log_path_potencial}\n")
-
-                    # Parar thread de acompanhamento anterior, se houver
-                    if self.log_tail_thread and self.log_tail_thread.is_alive():
-                        logging.debug(
-                            f"[{thread_name}] Tab '{self.nome}': Parando LogTailThread antiga para '{self.caminho_log_atual}'...")
-                        # Não precisa de _stop_event.set() aqui, o join deve ser suficiente ou o próprio LogTailThread deve verificar
-                        self.log_tail_thread.join(timeout=1.5)
-                        if self.log_tail_thread.is_alive():
-                            logging.warning(
-                                f"[{thread_name}] Tab '{self.nome}': LogTailThread antiga não parou a tempo.")
-
-                    # Fechar handle do arquivo de log anterior, se houver
-                    if self.file_log_handle:
-                        try:
-                            old_fh_name = getattr(self.file_log_handle, 'name', 'N/A')
-                            logging.debug(
-                                f"[{thread_name}] Tab '{self.nome}': Fechando file_log_handle antigo para: {old_fh_name}")
-                            self.file_log_handle.close()
-                        except Exception as e_close_old:
-                            logging.error(
-                                f"[{thread_name}] Tab '{self.nome}': Erro ao fechar handle antigo ({old_fh_name}): {e_close_old}",
-                                exc_info=True)
-                        finally:
-                            self.file_log_handle = None
-
-                    self.caminho_log_atual = novo_arquivo_log_path_potencial
-                    self.pasta_log_detectada_atual = subpasta_log_recente  # Atualiza a pasta de log sendo monitorada
-
-                    novo_fh_temp = None
-                    try:
-                        logging.debug(
-                            f"[{thread_name}] Tab '{self.nome}': Tentando abrir novo arquivo de log: {self.caminho_log_atual}")
-                        # Usar 'latin-1' como encoding padrão para logs de Arma, errors='replace' para evitar crash
-                        novo_fh_temp = open(self.caminho_log_atual, 'r', encoding='latin-1', errors='replace')
-                        novo_fh_temp.seek(0, os.SEEK_END)  # Ir para o fim do arquivo
-                        self.file_log_handle = novo_fh_temp
-
-                        if self.app.root.winfo_exists() and self.winfo_exists():  # Verifica se a aba e a app ainda existem
-                            # Atualiza o label que mostra o arquivo de log sendo monitorado
-                            log_file_display_name = os.path.join(os.path.basename(self.pasta_log_detectada_atual),
-                                                                 os.path.basename(self.caminho_log_atual))
-                            self.app.root.after(0, lambda p=log_file_display_name: self.log_label_display.config(
-                                text=f"LOG: {p}") if self.log_label_display.winfo_exists() else None)
-                            self.app.set_status_from_thread(f"'{self.nome}': Monitorando: {log_file_display_name}")
-
-                        logging.info(
-                            f"[{thread_name}] Tab '{self.nome}': Novo log {self.caminho_log_atual} aberto. Iniciando nova LogTailThread.")
-                        self.log_tail_thread = threading.Thread(
-                            target=self.acompanhar_log_do_arquivo_worker,
-                            args=(self.caminho_log_atual,),
-                            # Passa o caminho para a thread saber qual arquivo ela é responsável
-                            daemon=True,
-                            name=f"LogTail-{self.nome}-{os.path.basename(self.caminho_log_atual)}"
-                        )
-                        self.log_tail_thread.start()
-
-                    except FileNotFoundError:
-                        logging.error(
-                            f"[{thread_name}] Tab '{self.nome}': Arquivo {self.caminho_log_atual} não encontrado ao tentar abrir.")
-                        if novo_fh_temp: novo_fh_temp.close()
-                        self.file_log_handle = None
-                        self.caminho_log_atual = None  # Reset
-                    except Exception as e_open_new:
-                        logging.error(
-                            f"[{thread_name}] Tab '{self.nome}': Erro ao abrir/acompanhar {self.caminho_log_atual}: {e_open_new}",
-                            exc_info=True)
-                        if novo_fh_temp: novo_fh_temp.close()
-                        self.file_log_handle = None
-                        self.caminho_log_atual = None  # Reset
-
-                elif self.caminho_log_atual and not os.path.exists(self.caminho_log_atual):
-                    # O arquivo que estávamos monitorando sumiu
-                    logging.warning(
-                        f"[{thread_name}] Tab '{self.nome}': Arquivo de log monitorado {self.caminho_log_atual} não existe mais.")
-                    self.append_text_to_log_area(
-                        f"AVISO: Arquivo de log {self.caminho_log_atual} não encontrado. Procurando por novo...\n")
-                    if self.log_tail_thread and self.log_tail_thread.is_alive():
-                        self.log_tail_thread.join(timeout=1.0)  # Tenta parar a thread antiga
-                    if self.file_log_handle:
-                        try:
-                            self.file_log_handle.close()
-                        except:
-                            pass  # Ignora erros ao fechar se já estiver fechado
-                    self.file_log_handle = None
-                    self.caminho_log_atual = None  # Força a redetecção no próximo ciclo
-
-            except Exception as e_monitor_loop:
-                logging.error(
-                    f"[{thread_name}] Tab '{self.nome}': Erro no loop principal de monitoramento: {e_monitor_loop}",
-                    exc_info=True)
-                self.append_text_to_log_area(
-                    f"ERRO CRÍTICO AO MONITORAR LOGS: {e_monitor_loop}\nVerifique o Log do Sistema do Patch.\n")
-
-            if self._stop_event.wait(5): break  # Intervalo de verificação da pasta de logs
-
-        logging.info(
-            f"[{thread_name}] Tab '{self.nome}': Thread de monitoramento de log contínuo ({thread_name}) encerrada.")
-        # Limpeza final se a thread estiver parando
-        if self.log_tail_thread and self.log_tail_thread.is_alive():
-            self.log_tail_thread.join(timeout=1.0)
-        if self.file_log_handle:
-            try:
-                self.file_log_handle.close()
-            except:
-                pass
-        self.file_log_handle = None
-        self.caminho_log_atual = None
-
-    def _obter_subpasta_log_mais_recente(self, pasta_raiz_logs):
-        """Obtém a subpasta de log mais recente dentro da pasta_raiz_logs."""
-        if not pasta_raiz_logs or not os.path.isdir(pasta_raiz_logs):
-            return None
-        try:
-            # Listar todas as entradas na pasta_raiz_logs
-            entradas = os.listdir(pasta_raiz_logs)
-            # Filtrar para manter apenas diretórios que parecem ser pastas de log (ex: YYYY-MM-DD_HH-MM-SS)
-            # Regex simples para validar o formato esperado das pastas de log do Arma Reforger
-            log_folder_pattern = re.compile(r"^logs_\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}$")
-
-            subpastas_log_validas = []
-            for nome_entrada in entradas:
-                caminho_completo = os.path.join(pasta_raiz_logs, nome_entrada)
-                if os.path.isdir(caminho_completo) and log_folder_pattern.match(nome_entrada):
-                    subpastas_log_validas.append(caminho_completo)
-
-            if not subpastas_log_validas:
-                return None
-
-            # Retornar a subpasta mais recente com base no tempo de modificação
-            return max(subpastas_log_validas, key=os.path.getmtime)
-        except FileNotFoundError:  # Se a pasta_raiz_logs sumir entre a verificação e o listdir
-            logging.warning(f"Tab '{self.nome}': Pasta raiz '{pasta_raiz_logs}' não encontrada ao buscar subpastas.")
-            self.pasta_raiz.set("")  # Limpa a configuração da pasta raiz se ela sumiu
-            return None
-        except PermissionError:
-            logging.error(f"Tab '{self.nome}': Permissão negada ao acessar '{pasta_raiz_logs}' para buscar subpastas.")
-            self.pasta_raiz.set("")  # Limpa a configuração
-            return None
-        except Exception as e:
-            logging.error(f"Tab '{self.nome}': Erro ao obter subpasta mais recente em '{pasta_raiz_logs}': {e}",
-                          exc_info=True)
-            return None
-
-    def acompanhar_log_do_arquivo_worker(self, caminho_log_designado_para_esta_thread):
-        """Thread worker para acompanhar um arquivo de log específico (tail -f)."""
-        thread_name = threading.current_thread().name
-        logging.info(
-            f"[{thread_name}] Tab '{self.nome}': Tentando iniciar acompanhamento para: {caminho_log_designado_para_esta_thread}")
-
-        if self._stop_event.is_set():  # Verifica se já foi pedido para parar
-            logging.info(
-                f"[{thread_name}] Tab '{self.nome}': _stop_event já setado no início. Encerrando para {caminho_log_designado_para_esta_thread}.")
-            return
-
-        # Validação crítica: o file_log_handle deve estar aberto e correto
-        if not self.file_log_handle or self.file_log_handle.closed:
-            logging.error(
-                f"[{thread_name}] Tab '{self.nome}': ERRO CRÍTICO - file_log_handle NULO ou FECHADO no início do acompanhamento para '{caminho_log_designado_para_esta_thread}'. Esta thread não pode prosseguir.")
-            return
-        try:
-            # Compara o caminho do handle atual com o caminho que esta thread deveria monitorar
-            handle_real_path_norm = os.path.normpath(self.file_log_handle.name)
-            caminho_designado_norm = os.path.normpath(caminho_log_designado_para_esta_thread)
-            if handle_real_path_norm != caminho_designado_norm:
-                logging.warning(
-                    f"[{thread_name}] Tab '{self.nome}': DESCOMPASSO DE HANDLE! Thread para '{caminho_designado_norm}' mas handle é '{handle_real_path_norm}'. Encerrando.")
-                return
-        except AttributeError:  # Se self.file_log_handle.name não existir
-            logging.error(
-                f"[{thread_name}] Tab '{self.nome}': ERRO CRÍTICO - file_log_handle inválido (sem 'name') para '{caminho_log_designado_para_esta_thread}'. Encerrando.")
-            return
-        except Exception as e_check_init_handle:
-            logging.error(
-                f"[{thread_name}] Tab '{self.nome}': Exceção na verificação inicial do handle para '{caminho_log_designado_para_esta_thread}': {e_check_init_handle}. Encerrando.")
-            return
-
-        logging.info(
-            f"[{thread_name}] Tab '{self.nome}': Iniciando acompanhamento EFETIVO de: {caminho_log_designado_para_esta_thread}")
-        aguardando_winner = False
-        vote_pattern_re, winner_pattern_re = None, None
-        try:
-            # Compilar regex patterns uma vez
-            vote_pattern_str = self.vote_pattern_var.get()
-            if vote_pattern_str: vote_pattern_re = re.compile(vote_pattern_str)
-            winner_pattern_str = self.winner_pattern_var.get()
-            if winner_pattern_str: winner_pattern_re = re.compile(winner_pattern_str)
-        except re.error as e_re_compile:
-            logging.error(
-                f"[{thread_name}] Tab '{self.nome}': Erro de RegEx nos padrões para '{caminho_log_designado_para_esta_thread}': {e_re_compile}",
-                exc_info=True)
-            self.append_text_to_log_area(f"ERRO DE REGEX: Verifique os padrões em 'Opções Votemap': {e_re_compile}\n")
-            self.app.set_status_from_thread(f"'{self.nome}': Erro de RegEx! Verifique Configurações.")
-            return  # Não continuar se os padrões são inválidos
-
-        logging.debug(
-            f"[{thread_name}] Tab '{self.nome}': Padrões para '{caminho_log_designado_para_esta_thread}': FimVoto='{vote_pattern_str}', Vencedor='{winner_pattern_str}'")
-        logging.debug(
-            f"[{thread_name}] Tab '{self.nome}': Estado inicial aguardando_winner={aguardando_winner} para '{caminho_log_designado_para_esta_thread}'")
-
-        while not self._stop_event.is_set():
-            if self._paused:  # Se a pausa desta aba estiver ativa
-                if self._stop_event.wait(0.5): break  # Checa _stop_event periodicamente mesmo pausado
-                continue
-
-            # Validação do handle DENTRO do loop para detectar mudanças externas
-            if not self.file_log_handle or self.file_log_handle.closed:
-                logging.warning(
-                    f"[{thread_name}] Tab '{self.nome}': file_log_handle NULO ou FECHADO DENTRO DO LOOP para '{caminho_log_designado_para_esta_thread}'. Encerrando thread.")
-                break
-            try:
-                current_handle_path_norm = os.path.normpath(self.file_log_handle.name)
-                caminho_designado_norm_loop = os.path.normpath(caminho_log_designado_para_esta_thread)
-                if current_handle_path_norm != caminho_designado_norm_loop:
-                    logging.warning(
-                        f"[{thread_name}] Tab '{self.nome}': MUDANÇA DE HANDLE DETECTADA! Thread para '{caminho_designado_norm_loop}', mas handle é '{current_handle_path_norm}'. Encerrando esta instância.")
-                    break
-            except AttributeError:  # self.file_log_handle.name não existe
-                logging.warning(
-                    f"[{thread_name}] Tab '{self.nome}': self.file_log_handle tornou-se inválido (sem 'name') DENTRO DO LOOP para '{caminho_log_designado_para_esta_thread}'. Encerrando.")
-                break
-            except Exception as e_check_loop_consistency:
-                logging.error(
-                    f"[{thread_name}] Tab '{self.nome}': Erro ao verificar consistência do handle no loop para '{caminho_log_designado_para_esta_thread}': {e_check_loop_consistency}. Encerrando.")
-                break
-
-            try:
-                linha = self.file_log_handle.readline()
-                if linha:
-                    # Decodificar explicitamente se necessário, embora o open já deva ter lidado com 'latin-1'
-                    # linha_decoded = linha.decode('latin-1', errors='replace') if isinstance(linha, bytes) else linha
-                    linha_strip = linha.strip()  # Usar a linha já decodificada pelo open()
-
-                    # Aplicar filtro
-                    filtro_atual = self.filtro_var.get().strip().lower()
-                    if not filtro_atual or filtro_atual in linha.lower():  # linha original para filtro
-                        self.append_text_to_log_area(linha)  # Adiciona a linha original (com \n)
-
-                    logging.debug(
-                        f"[{thread_name}] Tab '{self.nome}': LIDO de '{caminho_log_designado_para_esta_thread}': repr='{repr(linha)}', strip='{linha_strip}', aguardando_winner={aguardando_winner}")
-
-                    # Detecção de fim de votação
-                    if vote_pattern_re and vote_pattern_re.search(linha_strip):  # Usar linha_strip para regex
-                        if not aguardando_winner:
-                            logging.info(
-                                f"[{thread_name}] Tab '{self.nome}': FIM DE VOTAÇÃO detectado em '{caminho_log_designado_para_esta_thread}'. Linha: '{linha_strip}'. Set aguardando_winner=True.")
-                        else:  # Já estava aguardando, isso pode ser um log repetido ou um problema
-                            logging.warning(
-                                f"[{thread_name}] Tab '{self.nome}': FIM DE VOTAÇÃO detectado NOVAMENTE em '{caminho_log_designado_para_esta_thread}' (aguardando_winner já era True). Linha: '{linha_strip}'.")
-                        aguardando_winner = True
-                        self.app.set_status_from_thread(f"'{self.nome}': Fim da votação. Aguardando vencedor...")
-
-                    # Detecção de vencedor (somente se estivermos aguardando um)
-                    if winner_pattern_re and aguardando_winner:
-                        logging.debug(
-                            f"[{thread_name}] Tab '{self.nome}': AGUARDANDO WINNER é TRUE. Testando linha para Winner: '{linha_strip}'")
-                        match = winner_pattern_re.search(linha_strip)  # Usar linha_strip para regex
-                        if match:
-                            try:
-                                indice_str = match.group(1)  # Pega o primeiro grupo de captura
-                                indice_vencedor = int(indice_str)
-                                logging.info(
-                                    f"[{thread_name}] Tab '{self.nome}': VENCEDOR detectado (aguardando_winner=True). Índice: {indice_vencedor}. Linha: '{linha_strip}'")
-                                self.app.set_status_from_thread(
-                                    f"'{self.nome}': Vencedor índice {indice_vencedor}. Processando...")
-
-                                # Processar a troca de mapa na thread principal da GUI
-                                if self.app.root.winfo_exists():
-                                    self.app.root.after(0, self.processar_troca_mapa_logica, indice_vencedor)
-
-                                logging.debug(
-                                    f"[{thread_name}] Tab '{self.nome}': Winner processado. RESETANDO aguardando_winner para False.")
-                                aguardando_winner = False  # Resetar após processar
-                            except IndexError:
-                                logging.error(
-                                    f"[{thread_name}] Tab '{self.nome}': Padrão de vencedor '{winner_pattern_str}' casou em '{linha_strip}', mas falta grupo de captura (group 1).")
-                                self.append_text_to_log_area(
-                                    f"ERRO: Padrão de vencedor '{winner_pattern_str}' não tem grupo de captura (verifique Opções Votemap).\n")
-                                aguardando_winner = False  # Resetar para evitar loops de erro
-                            except ValueError:
-                                logging.error(
-                                    f"[{thread_name}] Tab '{self.nome}': Padrão vencedor capturou '{indice_str}' em '{linha_strip}', que não é um número de índice válido.")
-                                self.append_text_to_log_area(
-                                    f"ERRO: Vencedor capturado '{indice_str}' não é um número (verifique Opções Votemap e logs).\n")
-                                aguardando_winner = False  # Resetar
-                            except Exception as e_proc_winner_inesperado:
-                                logging.error(
-                                    f"[{thread_name}] Tab '{self.nome}': Erro inesperado ao processar vencedor: {e_proc_winner_inesperado}",
-                                    exc_info=True)
-                                aguardando_winner = False  # Resetar
-                        # Se não deu match, continua aguardando winner na proxima linha
-                    elif winner_pattern_re and winner_pattern_re.search(linha_strip) and not aguardando_winner:
-                        # Encontrou padrão de vencedor, mas não estávamos esperando (ex: log antigo)
-                        logging.info(
-                            f"[{thread_name}] Tab '{self.nome}': Padrão de vencedor APARECEU na linha '{linha_strip}', MAS aguardando_winner era FALSO. Ignorando.")
-
-                else:  # Linha vazia, significa fim do arquivo por enquanto
-                    if self._stop_event.wait(0.2): break  # Pausa curta antes de tentar ler de novo
-
-            except UnicodeDecodeError as ude_loop:  # Pode acontecer se o encoding mudar no meio ou caractere inválido
-                logging.warning(
-                    f"[{thread_name}] Tab '{self.nome}': Erro de decodificação Unicode ao ler log {caminho_log_designado_para_esta_thread}: {ude_loop}. Linha ignorada.")
-                # self.append_text_to_log_area(f"AVISO: Caractere inválido no log, linha ignorada.\n")
-            except ValueError as ve_loop:  # Ex: "I/O operation on closed file"
-                if "closed file" in str(ve_loop).lower():
-                    logging.warning(
-                        f"[{thread_name}] Tab '{self.nome}': Tentativa de I/O em arquivo fechado ({caminho_log_designado_para_esta_thread}). Encerrando thread de acompanhamento.")
-                    break  # Sai do loop while
-                else:  # Outro ValueError
-                    logging.error(
-                        f"[{thread_name}] Tab '{self.nome}': Erro de ValueError ao acompanhar log {caminho_log_designado_para_esta_thread}: {ve_loop}",
-                        exc_info=True)
-                    break  # Sai do loop por segurança
-            except Exception as e_tail_loop_inesperado:
-                if not self._stop_event.is_set():  # Só loga se não for uma parada intencional
-                    logging.error(
-                        f"[{thread_name}] Tab '{self.nome}': Erro INESPERADO ao acompanhar log {caminho_log_designado_para_esta_thread}: {e_tail_loop_inesperado}",
-                        exc_info=True)
-                    self.append_text_to_log_area(
-                        f"ERRO GRAVE ao ler log: {e_tail_loop_inesperado}\nVerifique o Log do Sistema do Patch.\n")
-                    self.app.set_status_from_thread(f"'{self.nome}': Erro na leitura do log. Ver Log do Sistema.")
-                break  # Sai do loop por segurança
-
-        logging.info(
-            f"[{thread_name}] Tab '{self.nome}': Acompanhamento de '{caminho_log_designado_para_esta_thread}' encerrado. Estado final aguardando_winner: {aguardando_winner}")
-        # Não fechar self.file_log_handle aqui, a thread monitorar_log_continuamente_worker é responsável por isso.
-
-    def processar_troca_mapa_logica(self, indice_vencedor):
-        """Lógica para processar a troca de mapa, chamada pela GUI thread."""
-        logging.info(f"Tab '{self.nome}': Processando troca de mapa para o índice: {indice_vencedor}")
-
-        arquivo_json_val = self.arquivo_json.get()
-        arquivo_json_votemap_val = self.arquivo_json_votemap.get()
-
-        if not arquivo_json_val or not arquivo_json_votemap_val:
-            msg = f"Arquivos JSON de servidor ({arquivo_json_val}) ou votemap ({arquivo_json_votemap_val}) não configurados para '{self.nome}'."
-            self.append_text_to_log_area(f"ERRO: {msg}\n");
-            logging.error(msg)
-            self.app.set_status_from_thread(f"'{self.nome}': Erro - JSONs não configurados.")
-            return
-
-        try:
-            with open(arquivo_json_votemap_val, 'r', encoding='utf-8') as f_vm:
-                votemap_data = json.load(f_vm)
-        except FileNotFoundError:
-            msg = f"Arquivo votemap.json ('{arquivo_json_votemap_val}') não encontrado para '{self.nome}'."
-            self.append_text_to_log_area(f"ERRO: {msg}\n");
-            logging.error(msg)
-            self.app.set_status_from_thread(f"'{self.nome}': Erro - votemap.json não encontrado.")
-            return
-        except json.JSONDecodeError as e_json_vm:
-            msg = f"Erro ao decodificar votemap.json ('{arquivo_json_votemap_val}') para '{self.nome}': {e_json_vm}"
-            self.append_text_to_log_area(f"ERRO: {msg}\n");
-            logging.error(msg)
-            self.app.set_status_from_thread(f"'{self.nome}': Erro - votemap.json inválido.")
-            return
-
-        map_list = votemap_data.get("list", [])
-        if not map_list:
-            msg = f"Lista de mapas ('list') vazia ou não encontrada no votemap.json ('{arquivo_json_votemap_val}') para '{self.nome}'."
-            self.append_text_to_log_area(f"AVISO: {msg}\n");
-            logging.warning(msg)
-            self.app.set_status_from_thread(f"'{self.nome}': Aviso - Lista de mapas vazia.")
-            return
-
-        novo_scenario_id = None
-        nome_mapa_log = "N/A"
-        # O índice 0 no log do Arma geralmente significa "Random" ou a primeira opção da lista que pode ser "Random"
-        if indice_vencedor == 0:  # Assumindo que o primeiro item (índice 0 da lista de mapas) é o "random" ou um placeholder.
-            if len(map_list) > 1:  # Precisa de pelo menos mais uma opção além do "random"
-                # Escolhe um mapa aleatório da lista, EXCLUINDO o primeiro item (índice 0)
-                indice_selecionado_random_na_lista = random.randint(1, len(map_list) - 1)
-                novo_scenario_id = map_list[indice_selecionado_random_na_lista]
-                nome_mapa_log = os.path.basename(str(novo_scenario_id)).replace(".ArmaReforgerLink", "")
-                self.append_text_to_log_area(
-                    f"VOTO ALEATÓRIO: Selecionado mapa '{nome_mapa_log}' (índice real na lista: {indice_selecionado_random_na_lista}).\n")
-                logging.info(
-                    f"Tab '{self.nome}': Seleção aleatória: {novo_scenario_id} (índice da lista {indice_selecionado_random_na_lista})")
-            else:
-                msg = f"Voto aleatório (índice 0), mas não há mapas suficientes na lista de votemap.json (apenas {len(map_list)} item(ns)) para '{self.nome}'."
-                self.append_text_to_log_area(f"AVISO: {msg}\n");
-                logging.warning(msg)
-                self.app.set_status_from_thread(f"'{self.nome}': Aviso - Poucos mapas para aleatório.")
-                return
-        elif 0 < indice_vencedor < len(
-                map_list):  # Voto direto para um mapa da lista (excluindo o primeiro se for random)
-            novo_scenario_id = map_list[indice_vencedor]
-            nome_mapa_log = os.path.basename(str(novo_scenario_id)).replace(".ArmaReforgerLink", "")
-            self.append_text_to_log_area(
-                f"MAPA VENCEDOR: '{nome_mapa_log}' (índice {indice_vencedor} da lista de votemap.json).\n")
-            logging.info(f"Tab '{self.nome}': Mapa vencedor selecionado: {novo_scenario_id}")
-        else:  # Índice inválido
-            msg = f"Índice do mapa vencedor ({indice_vencedor}) inválido para a lista de mapas (tamanho {len(map_list)}) em votemap.json para '{self.nome}'."
-            self.append_text_to_log_area(f"ERRO: {msg}\n");
-            logging.error(msg)
-            self.app.set_status_from_thread(f"'{self.nome}': Erro - Índice de mapa inválido.")
-            return
-
-        if not novo_scenario_id:
-            msg = f"Não foi possível determinar o novo scenarioId para o índice {indice_vencedor} para '{self.nome}'."
-            self.append_text_to_log_area(f"ERRO: {msg}\n");
-            logging.error(msg)
-            return
-
-        # Atualizar o JSON de configuração do servidor
-        try:
-            with open(arquivo_json_val, 'r+', encoding='utf-8') as f_srv:
-                server_data = json.load(f_srv)
-
-                # Caminho comum para scenarioId: server_data["game"]["scenarioId"]
-                # Adicionar verificação se "game" existe
-                if "game" not in server_data:
-                    server_data["game"] = {}  # Cria a chave 'game' se não existir
-
-                server_data["game"]["scenarioId"] = novo_scenario_id
-
-                f_srv.seek(0)  # Voltar ao início do arquivo
-                json.dump(server_data, f_srv, indent=4)
-                f_srv.truncate()  # Remover qualquer conteúdo antigo restante se o novo for menor
-
-            # Atualizar a exibição do JSON na GUI
-            if self.winfo_exists() and self.json_text_area_server.winfo_exists():
-                self._display_json_in_widget(self.json_text_area_server, server_data)
-
-            self.append_text_to_log_area(
-                f"JSON do servidor '{os.path.basename(arquivo_json_val)}' atualizado para o mapa: {nome_mapa_log}\n")
-            logging.info(f"Tab '{self.nome}': JSON do servidor atualizado com scenarioId: {novo_scenario_id}")
-
-            # Reiniciar o servidor se auto_restart estiver habilitado e nome_servico configurado
-            if self.auto_restart_var.get() and self.nome_servico.get():
-                self.append_text_to_log_area("Iniciando reinício automático do servidor...\n")
-                # O reinício em si deve ser em uma thread para não bloquear a GUI
-                threading.Thread(
-                    target=self.reiniciar_servidor_worker,  # Método worker da aba
-                    args=(novo_scenario_id,),  # Passar o scenarioId para log, se necessário
-                    daemon=True,
-                    name=f"ServidorRestart-{self.nome}"
-                ).start()
-            else:
-                msg_status = f"'{self.nome}': Mapa alterado para {nome_mapa_log}. Reinício manual."
-                if not self.nome_servico.get() and self.auto_restart_var.get():
-                    msg_status += " (Serviço não config.)"
-                self.app.set_status_from_thread(msg_status)
-                logging.info(f"Tab '{self.nome}': Reinício automático desabilitado ou serviço não configurado.")
-
-        except FileNotFoundError:
-            msg = f"Arquivo de config. do servidor ('{arquivo_json_val}') não encontrado para '{self.nome}' ao tentar atualizar."
-            self.append_text_to_log_area(f"ERRO: {msg}\n");
-            logging.error(msg)
-            self.app.set_status_from_thread(f"'{self.nome}': Erro - server.json não encontrado.")
-        except (KeyError, TypeError) as e_json_key:
-            msg = f"Estrutura do JSON do servidor ('{arquivo_json_val}') inválida para '{self.nome}' (game -> scenarioId não encontrado ou tipo errado): {e_json_key}"
-            self.append_text_to_log_area(f"ERRO: {msg}\n");
-            logging.error(msg)
-            self.app.set_status_from_thread(f"'{self.nome}': Erro - Estrutura server.json inválida.")
-        except json.JSONDecodeError as e_json_srv:
-            msg = f"Erro ao decodificar JSON do servidor ('{arquivo_json_val}') para '{self.nome}': {e_json_srv}"
-            self.append_text_to_log_area(f"ERRO: {msg}\n");
-            logging.error(msg)
-            self.app.set_status_from_thread(f"'{self.nome}': Erro - server.json inválido.")
-        except Exception as e_proc_mapa_inesperado:
-            msg = f"Erro inesperado ao processar troca de mapa para '{self.nome}': {e_proc_mapa_inesperado}"
-            self.append_text_to_log_area(f"ERRO: {msg}\n");
-            logging.error(msg, exc_info=True)
-            self.app.set_status_from_thread(f"'{self.nome}': Erro inesperado na troca de mapa.")
-
-    def reiniciar_servidor_worker(self, scenario_id_que_causou_restart):
-        """Thread worker para reiniciar o serviço do Windows."""
-        if not PYWIN32_AVAILABLE:  # Dupla checagem
-            self.app.show_messagebox_from_thread("error", f"'{self.nome}': Funcionalidade Indisponível",
-                                                 "pywin32 é necessário para reiniciar serviços.")
-            return
-
-        nome_servico_reiniciar = self.nome_servico.get()
-        if not nome_servico_reiniciar:
-            self.append_text_to_log_area_threadsafe("ERRO: Nome do serviço não configurado para reinício automático.\n")
-            logging.error(f"Tab '{self.nome}': Tentativa de reiniciar servidor sem nome de serviço.")
-            self.app.set_status_from_thread(f"'{self.nome}': Erro - Serviço não configurado para reinício.")
-            return
-
-        logging.info(
-            f"Tab '{self.nome}': Iniciando processo de reinício do serviço '{nome_servico_reiniciar}' em background.")
-        self.app.set_status_from_thread(f"'{self.nome}': Reiniciando {nome_servico_reiniciar}...")
-
-        # Chamar a lógica de reinício que contém os comandos 'sc' e delays
-        success = self._executar_logica_reinicio_servico(nome_servico_reiniciar, scenario_id_que_causou_restart)
-
-        # Após a tentativa de reinício, mostrar mensagem e atualizar status
-        if self.app.root.winfo_exists():  # Verificar se a GUI ainda existe
-            if success:
-                self.app.show_messagebox_from_thread("info", f"'{self.nome}': Servidor Reiniciado",
-                                                     f"O serviço {nome_servico_reiniciar} foi reiniciado com sucesso.")
-            else:
-                self.app.show_messagebox_from_thread("error", f"'{self.nome}': Falha no Reinício",
-                                                     f"Ocorreu um erro ao reiniciar o serviço {nome_servico_reiniciar}.\nVerifique os logs.")
-            self.update_service_status_display()  # Atualiza o status do serviço na GUI após a tentativa
-
-    def _executar_logica_reinicio_servico(self, nome_servico_a_gerenciar, scenario_id_anterior):
-        """Contém a lógica real de parada e início do serviço usando 'sc'."""
-        stop_delay_s = self.stop_delay_var.get()
-        start_delay_s = self.start_delay_var.get()
-        default_votemap_mission_id = self.default_mission_var.get()
-        arquivo_json_servidor_path = self.arquivo_json.get()
-
-        startupinfo = None
-        if platform.system() == "Windows":
-            startupinfo = subprocess.STARTUPINFO()
-            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-            startupinfo.wShowWindow = subprocess.SW_HIDE
-
-        try:
-            # --- Parar o Serviço ---
-            self.app.set_status_from_thread(f"'{self.nome}': Parando serviço {nome_servico_a_gerenciar}...")
-            self.append_text_to_log_area_threadsafe(f"Parando serviço '{nome_servico_a_gerenciar}'...\n")
-            logging.info(f"Tab '{self.nome}': Tentando parar o serviço: {nome_servico_a_gerenciar}")
-
-            status_atual = self._verificar_status_servico_win(nome_servico_a_gerenciar)
-            if status_atual == "RUNNING" or status_atual == "START_PENDING":  # Se estiver rodando ou iniciando
-                subprocess.run(["sc", "stop", nome_servico_a_gerenciar], check=True, shell=False,
-                               startupinfo=startupinfo)
-                self.append_text_to_log_area_threadsafe(f"Comando de parada enviado. Aguardando {stop_delay_s}s...\n")
-                time.sleep(stop_delay_s)  # Esperar o serviço parar
-                status_apos_parada = self._verificar_status_servico_win(nome_servico_a_gerenciar)
-                if status_apos_parada != "STOPPED":
-                    logging.warning(
-                        f"Tab '{self.nome}': Serviço {nome_servico_a_gerenciar} não parou como esperado. Status: {status_apos_parada}")
-                    self.append_text_to_log_area_threadsafe(
-                        f"AVISO: Serviço '{nome_servico_a_gerenciar}' pode não ter parado. Status: {status_apos_parada}\n")
-                else:
-                    logging.info(f"Tab '{self.nome}': Serviço {nome_servico_a_gerenciar} parado com sucesso.")
-            elif status_atual == "STOPPED":
-                self.append_text_to_log_area_threadsafe(f"Serviço '{nome_servico_a_gerenciar}' já estava parado.\n")
-                logging.info(f"Tab '{self.nome}': Serviço {nome_servico_a_gerenciar} já estava parado.")
-            elif status_atual == "NOT_FOUND":
-                self.append_text_to_log_area_threadsafe(
-                    f"ERRO: Serviço '{nome_servico_a_gerenciar}' não encontrado para parada.\n")
-                logging.error(f"Tab '{self.nome}': Serviço {nome_servico_a_gerenciar} não encontrado para parada.")
-                self.app.set_status_from_thread(
-                    f"'{self.nome}': Erro - Serviço '{nome_servico_a_gerenciar}' não existe.")
-                return False  # Falha crítica
-            else:  # Erro ou estado desconhecido
-                self.append_text_to_log_area_threadsafe(
-                    f"ERRO: Não foi possível determinar estado do serviço '{nome_servico_a_gerenciar}' ou estado inesperado: {status_atual}.\n")
-                logging.error(
-                    f"Tab '{self.nome}': Estado do serviço {nome_servico_a_gerenciar} desconhecido ou erro: {status_atual}")
-                self.app.set_status_from_thread(
-                    f"'{self.nome}': Erro - Estado de '{nome_servico_a_gerenciar}' desconhecido.")
-                return False  # Falha
-
-            # --- Iniciar o Serviço ---
-            self.app.set_status_from_thread(f"'{self.nome}': Iniciando serviço {nome_servico_a_gerenciar}...")
-            self.append_text_to_log_area_threadsafe(f"Iniciando serviço '{nome_servico_a_gerenciar}'...\n")
-            logging.info(f"Tab '{self.nome}': Tentando iniciar o serviço: {nome_servico_a_gerenciar}")
-            subprocess.run(["sc", "start", nome_servico_a_gerenciar], check=True, shell=False, startupinfo=startupinfo)
-            self.append_text_to_log_area_threadsafe(
-                f"Comando de início enviado. Aguardando {start_delay_s}s para estabilizar...\n")
-            self.app.set_status_from_thread(
-                f"'{self.nome}': Aguardando {nome_servico_a_gerenciar} iniciar ({start_delay_s}s)...")
-            time.sleep(start_delay_s)  # Esperar o servidor iniciar
-
-            status_apos_inicio = self._verificar_status_servico_win(nome_servico_a_gerenciar)
-            if status_apos_inicio != "RUNNING":
-                logging.error(
-                    f"Tab '{self.nome}': Serviço {nome_servico_a_gerenciar} falhou ao iniciar. Status: {status_apos_inicio}")
-                self.append_text_to_log_area_threadsafe(
-                    f"ERRO: Serviço '{nome_servico_a_gerenciar}' falhou ao iniciar ou demorando. Status: {status_apos_inicio}\n")
-                self.app.set_status_from_thread(
-                    f"'{self.nome}': Erro - {nome_servico_a_gerenciar} não iniciou. Status: {status_apos_inicio}")
-                return False  # Falha
-
-            logging.info(f"Tab '{self.nome}': Serviço {nome_servico_a_gerenciar} iniciado com sucesso.")
-            self.update_service_status_display()  # Atualiza o label na GUI via after()
-
-            # --- Restaurar JSON do Servidor para o Mapa de Votação Padrão ---
-            self.append_text_to_log_area_threadsafe("Restaurando JSON do servidor para o mapa de votação padrão...\n")
-            if not default_votemap_mission_id:
-                self.append_text_to_log_area_threadsafe(
-                    "AVISO: Missão padrão de votemap não definida. O servidor pode não iniciar a votação.\n")
-                logging.warning(f"Tab '{self.nome}': Missão padrão de votemap não definida em Opções.")
-            elif not arquivo_json_servidor_path or not os.path.exists(arquivo_json_servidor_path):
-                msg = f"Arquivo JSON do servidor ({arquivo_json_servidor_path}) não encontrado para restaurar votemap para '{self.nome}'."
-                self.append_text_to_log_area_threadsafe(f"ERRO: {msg}\n");
-                logging.error(msg)
-                self.app.set_status_from_thread(f"'{self.nome}': Erro - server.json não encontrado para reset.")
-                return False  # Considerar falha se não puder resetar o mapa
-            else:  # Tentar restaurar
-                with open(arquivo_json_servidor_path, 'r+', encoding='utf-8') as f_srv_reset:
-                    server_data_reset = json.load(f_srv_reset)
-                    if "game" not in server_data_reset: server_data_reset["game"] = {}
-                    server_data_reset["game"]["scenarioId"] = default_votemap_mission_id
-                    f_srv_reset.seek(0)
-                    json.dump(server_data_reset, f_srv_reset, indent=4)
-                    f_srv_reset.truncate()
-
-                # Atualizar a exibição do JSON na GUI (se a aba ainda existir)
-                if self.winfo_exists() and self.json_text_area_server.winfo_exists():
-                    self.app.root.after(0, self._display_json_in_widget, self.json_text_area_server, server_data_reset)
-
-                self.append_text_to_log_area_threadsafe(
-                    f"JSON do servidor restaurado para votemap: {os.path.basename(default_votemap_mission_id)}\n")
-                logging.info(
-                    f"Tab '{self.nome}': JSON do servidor restaurado para scenarioId de votemap: {default_votemap_mission_id}")
-
-            nome_mapa_anterior_log = os.path.basename(str(scenario_id_anterior)).replace(".ArmaReforgerLink", "")
-            self.app.set_status_from_thread(
-                f"'{self.nome}': Servidor reiniciado. Mapa anterior: {nome_mapa_anterior_log}. Próximo: Votação.")
-            return True  # Sucesso no reinício
-
-        except subprocess.CalledProcessError as e_sc:
-            # Tentar decodificar a saída de erro do 'sc'
-            err_output = "Nenhuma saída de erro detalhada."
-            if e_sc.stderr:
-                try:
-                    err_output = e_sc.stderr.decode('latin-1', errors='replace')
-                except:
-                    pass  # Se falhar, mantém a msg padrão
-            elif e_sc.stdout:
-                try:
-                    err_output = e_sc.stdout.decode('latin-1', errors='replace')
-                except:
-                    pass
-
-            err_msg = f"Erro ao executar comando 'sc' para '{nome_servico_a_gerenciar}': {err_output.strip()}"
-            self.append_text_to_log_area_threadsafe(f"ERRO: {err_msg}\n");
-            logging.error(err_msg, exc_info=True)
-            self.app.set_status_from_thread(f"'{self.nome}': Erro ao gerenciar serviço: {e_sc.cmd}")
-            self.update_service_status_display()  # Atualiza status mesmo em erro
-            return False
-        except FileNotFoundError:  # sc.exe não encontrado
-            self.app.show_messagebox_from_thread("error", f"'{self.nome}': Erro de Comando",
-                                                 "Comando 'sc.exe' não encontrado. Verifique o PATH do sistema.")
-            logging.error(f"Tab '{self.nome}': Comando 'sc.exe' não encontrado.")
-            self.app.set_status_from_thread(f"'{self.nome}': Erro - sc.exe não encontrado.")
-            self.update_service_status_display()
-            return False
-        except (json.JSONDecodeError, KeyError, TypeError) as e_json_reset:
-            err_msg = f"Erro ao manipular JSON do servidor durante o reinício para '{self.nome}': {e_json_reset}"
-            self.append_text_to_log_area_threadsafe(f"ERRO: {err_msg}\n");
-            logging.error(err_msg, exc_info=True)
-            self.app.set_status_from_thread(f"'{self.nome}': Erro - Falha ao atualizar JSON do servidor.")
-            return False
-        except Exception as e_reinicio_inesperado:
-            err_msg = f"Erro inesperado ao reiniciar o servidor '{self.nome}': {e_reinicio_inesperado}"
-            self.append_text_to_log_area_threadsafe(f"ERRO: {err_msg}\n");
-            logging.error(err_msg, exc_info=True)
-            self.app.set_status_from_thread(f"'{self.nome}': Erro inesperado no reinício do servidor.")
-            self.update_service_status_display()
-            return False
+        """Para o monitoramento de logs desta aba (e, ao fechar a aba, a observação dos JSONs)."""
+        if from_tab_closure:
+            self.engine.parar_observacao_json()
+        self.engine.stop(from_tab_closure=from_tab_closure)
 
     def append_text_to_log_area(self, texto):
-        """Adiciona texto à área de log da aba, garantindo que seja feito na thread da GUI se chamada de outra."""
-        if not (self.winfo_exists() and self.text_area_log.winfo_exists()):
-            logging.debug(f"Tab '{self.nome}': Tentativa de adicionar texto ao log, mas widget não existe.")
-            return
+        """Adiciona texto à área de log da aba (de qualquer thread).
 
-        try:
-            # Se estivermos na thread da GUI, podemos modificar diretamente.
-            # Caso contrário, usamos 'after' para enfileirar a modificação.
-            # No entanto, para simplificar e garantir segurança, usar 'after' sempre é mais robusto.
-            # A performance é geralmente aceitável para logs.
-            self.app.root.after(0, self._append_text_to_log_area_gui_thread, texto)
-        except Exception as e:  # Captura genérica se a root não existir mais, etc.
-            logging.warning(f"Tab '{self.nome}': Exceção ao tentar agendar append_text_to_log_area: {e}")
+        O texto vai para a fila de despacho da app e é inserido no próximo flush,
+        junto com todo o resto que chegou para esta aba no intervalo.
+        """
+        self.app.ui_queue.adicionar_texto(self, texto)
 
     def _append_text_to_log_area_gui_thread(self, texto):
-        """Executado pela thread da GUI para realmente modificar o widget ScrolledText."""
+        """Executado pela thread da GUI (flush da UIDispatchQueue) para anexar ao VirtualLogView."""
         if not (self.winfo_exists() and self.text_area_log.winfo_exists()):
             return
         try:
-            current_state = self.text_area_log.cget("state")
-            self.text_area_log.configure(state='normal')
-            self.text_area_log.insert('end', texto)
-            if self.auto_scroll_log_var.get():
-                self.text_area_log.yview_moveto(1.0)
-            self.text_area_log.configure(state=current_state)
+            self.text_area_log.max_linhas = self._get_max_log_lines()
+            self.text_area_log.adicionar(texto)  # Guarda na store; só a janela visível é redesenhada
         except tk.TclError as e_tcl:  # Comum se a GUI estiver fechando
             logging.debug(
                 f"Tab '{self.nome}': TclError em _append_text_to_log_area_gui_thread (GUI fechando?): {e_tcl}")
         except Exception as e_append:
             logging.error(f"Tab '{self.nome}': Erro em _append_text_to_log_area_gui_thread: {e_append}", exc_info=True)
 
+    @staticmethod
+    def _formatar_ms(valor):
+        if valor is None:
+            return "-"
+        return f"{valor / 1000:.2f} s" if valor >= 1000 else f"{valor:.1f} ms"
+
+    def atualizar_latencias(self, resumo):
+        """Redesenha a tabela de latência (thread da GUI, via UIDispatchQueue)."""
+        if not self.latency_tree.winfo_exists():
+            return
+        self.latency_tree.delete(*self.latency_tree.get_children())
+        for de, para, estatisticas in resumo:
+            if (de, para) == MedidorTrocaMapa.TOTAL:
+                etapa = "TOTAL da troca"
+                self.latency_last_label.config(
+                    text=f"Última troca: {self._formatar_ms(estatisticas['ultimo_ms'])} "
+                         f"({estatisticas['amostras']} medida(s))")
+            else:
+                etapa = f"{NOMES_ETAPAS.get(de, de)} → {NOMES_ETAPAS.get(para, para)}"
+            self.latency_tree.insert('', 'end', values=(
+                etapa, estatisticas["amostras"], self._formatar_ms(estatisticas["ultimo_ms"]),
+                self._formatar_ms(estatisticas["p50_ms"]), self._formatar_ms(estatisticas["p95_ms"]),
+                self._formatar_ms(estatisticas["max_ms"])))
+
+    def zerar_latencias(self):
+        self.engine.latencias.limpar()
+        self.atualizar_latencias([])
+        self.latency_last_label.config(text="Nenhuma troca de mapa medida ainda.")
+
+    def _get_max_log_lines(self):
+        """Limite de linhas guardadas na tela de logs (0 = sem limite)."""
+        try:
+            return max(0, self.max_log_lines_var.get())
+        except tk.TclError:  # Spinbox com texto inválido enquanto o usuário digita
+            return self.text_area_log.max_linhas if hasattr(self, 'text_area_log') else 0
+
     def append_text_to_log_area_threadsafe(self, texto):  # Alias para clareza
         self.append_text_to_log_area(texto)
 
     def limpar_tela_log(self):
         if self.text_area_log.winfo_exists():
-            self.text_area_log.configure(state='normal')
-            self.text_area_log.delete('1.0', 'end')
-            self.text_area_log.configure(state='disabled')
+            self.text_area_log.limpar()
             self.app.set_status_from_thread(f"Tela de logs de '{self.nome}' limpa.")
             logging.info(f"Tab '{self.nome}': Tela de logs limpa pelo usuário.")
 
     def toggle_pausa(self):
-        self._paused = not self._paused
-        if self._paused:
+        self.engine.paused = not self.engine.paused
+        if self.engine.paused:
             self.pausar_btn.config(text="▶️ Retomar", bootstyle=SUCCESS)
             self.app.set_status_from_thread(f"Monitoramento de '{self.nome}' pausado.")
             logging.info(f"Tab '{self.nome}': Monitoramento de logs pausado.")
@@ -1446,14 +1117,14 @@ class ServidorTab(ttk.Frame):
             self.app.set_status_from_thread(f"Monitoramento de '{self.nome}' retomado.")
             logging.info(f"Tab '{self.nome}': Monitoramento de logs retomado.")
 
-    # --- Métodos de Busca no Log (adaptados para self.text_area_log) ---
+    # --- Métodos de Busca no Log (a busca roda na store do VirtualLogView) ---
     def _toggle_log_search_bar(self, event=None, force_hide=False, force_show=False):
         if force_hide or (self.search_log_frame_visible and not force_show):
             if self.search_log_frame.winfo_ismapped():
                 self.search_log_frame_visible = False
                 self.search_log_frame.pack_forget()
                 if self.text_area_log.winfo_exists(): self.text_area_log.focus_set()
-                self.text_area_log.tag_remove("search_match", "1.0", "end")
+                self.text_area_log.limpar_destaque()
         elif force_show or not self.search_log_frame_visible:
             if not self.search_log_frame.winfo_ismapped():
                 self.search_log_frame_visible = True
@@ -1463,79 +1134,22 @@ class ServidorTab(ttk.Frame):
                 self.search_log_frame.pack(fill='x', before=self.text_area_log, pady=(0, 2), padx=5)
                 if self.log_search_entry.winfo_exists(): self.log_search_entry.focus_set()
                 self.log_search_entry.select_range(0, 'end')
-        self.last_search_pos = "1.0"
 
-    def _perform_log_search_internal(self, term, start_pos, direction_forward=True, wrap=True):
+    def _perform_log_search_internal(self, direction_forward=True):
+        term = self.log_search_var.get()
         if not term or not self.text_area_log.winfo_exists():
-            if self.text_area_log.winfo_exists(): self.text_area_log.tag_remove("search_match", "1.0", "end")
-            return None
-
-        self.text_area_log.tag_remove("search_match", "1.0", "end")
-        count_var = tk.IntVar()
-        original_state = self.text_area_log.cget("state")
-        self.text_area_log.config(state="normal")
-        pos = None
-        if direction_forward:
-            pos = self.text_area_log.search(term, start_pos, stopindex="end", count=count_var, nocase=True)
-            if not pos and wrap and start_pos != "1.0":
-                pos = self.text_area_log.search(term, "1.0", stopindex=start_pos, count=count_var, nocase=True)
-        else:  # Backwards
-            pos = self.text_area_log.search(term, start_pos, stopindex="1.0", count=count_var, nocase=True,
-                                            backwards=True)
-            if not pos and wrap and start_pos != "end":
-                pos = self.text_area_log.search(term, "end", stopindex=start_pos, count=count_var, nocase=True,
-                                                backwards=True)
-
-        if pos:
-            end_pos = f"{pos}+{count_var.get()}c"
-            self.text_area_log.tag_add("search_match", pos, end_pos)
-            self.text_area_log.tag_config("search_match", background="yellow", foreground="black")  # Cores de destaque
-            self.text_area_log.see(pos)
-            self.text_area_log.config(state=original_state)
-            return end_pos if direction_forward else pos
-        else:
-            self.text_area_log.config(state=original_state)
-            self.app.set_status_from_thread(f"'{term}' não encontrado em '{self.nome}'.")
-            return None
+            return False
+        # A busca continua a partir do resultado destacado e dá a volta no fim/início
+        if self.text_area_log.buscar(term, para_frente=direction_forward):
+            return True
+        self.app.set_status_from_thread(f"'{term}' não encontrado em '{self.nome}'.")
+        return False
 
     def _search_log_next(self, event=None):
-        term = self.log_search_var.get()
-        if not term: return
-
-        current_match_ranges = self.text_area_log.tag_ranges("search_match")
-        start_from = self.last_search_pos
-        if current_match_ranges:  # Se há uma seleção, começar depois dela
-            start_from = current_match_ranges[1]
-
-        next_start_pos = self._perform_log_search_internal(term, start_from, direction_forward=True)
-        if next_start_pos:
-            self.last_search_pos = next_start_pos
-        else:  # Tentar do início (wrap)
-            next_start_pos_wrapped = self._perform_log_search_internal(term, "1.0", direction_forward=True, wrap=False)
-            if next_start_pos_wrapped:
-                self.last_search_pos = next_start_pos_wrapped
-            else:  # Realmente não encontrou
-                self.last_search_pos = "1.0"  # Reset
+        self._perform_log_search_internal(direction_forward=True)
 
     def _search_log_prev(self, event=None):
-        term = self.log_search_var.get()
-        if not term: return
-
-        current_match_ranges = self.text_area_log.tag_ranges("search_match")
-        start_from = self.last_search_pos
-        if current_match_ranges:  # Se há uma seleção, começar antes dela
-            start_from = current_match_ranges[0]
-
-        new_match_start_pos = self._perform_log_search_internal(term, start_from, direction_forward=False)
-        if new_match_start_pos:
-            self.last_search_pos = new_match_start_pos
-        else:  # Tentar do fim (wrap)
-            new_match_start_pos_wrapped = self._perform_log_search_internal(term, "end", direction_forward=False,
-                                                                            wrap=False)
-            if new_match_start_pos_wrapped:
-                self.last_search_pos = new_match_start_pos_wrapped
-            else:  # Realmente não encontrou
-                self.last_search_pos = "end"  # Reset
+        self._perform_log_search_internal(direction_forward=False)
 
 
 # ############################################################################
@@ -1550,7 +1164,7 @@ class LogViewerApp:
 
         self.style = ttk.Style()
         # Tenta carregar tema salvo, senão usa 'darkly'
-        self.config_file = "votemap_config_multi.json"
+        self.config_file = CONFIG_FILENAME
         self.config = self._load_app_config_from_file()  # Método para carregar config da app
 
         try:
@@ -1563,6 +1177,30 @@ class LogViewerApp:
         self.servidores = []  # Lista de instâncias ServidorTab
         self.config_changed = False  # Flag para indicar se algo foi alterado
         self._app_stop_event = threading.Event()  # Evento para parar threads da app (ex: log do sistema)
+        # Fila que leva os eventos das threads para a GUI em lotes (criada antes das abas)
+        self.ui_queue = UIDispatchQueue(self.root, self._aplicar_status)
+        self.ui_queue.start()
+        # Loop único que acompanha os logs de todos os servidores (criado antes das abas)
+        self.reactor = votemap_engine.EngineReactor()
+        self.reactor.start()
+        # Endpoint de métricas local, só se "metrics_port" estiver no arquivo de configuração
+        self.metricas = None
+        self.atraso_tk_s = 0.0
+        self._proxima_medicao_tk = None
+        if self.config.get("metrics_port"):
+            self.metricas = votemap_engine.ServidorMetricas(
+                self.config["metrics_port"], lambda: [tab.engine for tab in list(self.servidores)],
+                gauges={
+                    "votemap_ui_queue_depth": ("Atualizações pendentes na fila da GUI.", self.ui_queue.profundidade),
+                    "votemap_tk_loop_lag_seconds": ("Atraso do loop de eventos do Tk na última medição.",
+                                                    lambda: self.atraso_tk_s),
+                },
+                contadores={
+                    "votemap_ui_dropped_lines": ("Linhas de log descartadas pela fila da GUI por sobrecarga.",
+                                                 lambda: self.ui_queue.linhas_descartadas),
+                })
+            if self.metricas.start():
+                self._medir_atraso_tk()
 
         self.create_menu()
 
@@ -1574,7 +1212,7 @@ class LogViewerApp:
         # Aba para Log do Sistema (do próprio Patch)
         self.system_log_frame = ttk.Frame(self.main_notebook)
         self.main_notebook.add(self.system_log_frame, text="Log do Sistema (Patch)")
-        self.system_log_text_area = ScrolledText(self.system_log_frame, wrap='word', height=10, state='disabled')
+        self.system_log_text_area = VirtualLogView(self.system_log_frame, max_linhas=SYSTEM_LOG_MAX_LINHAS)
         self.system_log_text_area.pack(fill='both', expand=True, padx=5, pady=5)
 
         # Inicializar servidores salvos (após criar a UI básica)
@@ -1585,6 +1223,8 @@ class LogViewerApp:
 
         # Atualizar Log do Sistema periodicamente
         self._system_log_update_error_count = 0  # Para evitar spam de logs de erro
+        self._leitor_log_sistema = LeitorIncrementalLog(LOG_FILENAME, max_bytes=SYSTEM_LOG_MAX_LEITURA_BYTES)
+        self._log_sistema_ausente = False
         self.atualizar_log_sistema_periodicamente()
 
         # Bind Escape global para fechar a barra de busca da aba ativa
@@ -1596,6 +1236,19 @@ class LogViewerApp:
                                              "Funcionalidades de gerenciamento de serviços do Windows (iniciar/parar servidor, status) estarão desabilitadas.\n"
                                              "Instale com: pip install pywin32")
 
+    def _medir_atraso_tk(self):
+        """Compara quando o after deveria rodar com quando rodou: o excesso é o atraso do loop do Tk."""
+        agora = time.monotonic()
+        if self._proxima_medicao_tk is not None:
+            self.atraso_tk_s = max(0.0, agora - self._proxima_medicao_tk)
+        if self._app_stop_event.is_set():
+            return
+        self._proxima_medicao_tk = agora + TK_LAG_PROBE_MS / 1000
+        try:
+            self.root.after(TK_LAG_PROBE_MS, self._medir_atraso_tk)
+        except tk.TclError:  # Janela principal destruída
+            pass
+
     def handle_escape_key(self, event=None):
         """Fecha a barra de busca da aba de servidor atualmente ativa."""
         current_tab_widget = self.get_current_servidor_tab_widget()
@@ -1615,6 +1268,7 @@ class LogViewerApp:
                 # current_tab_widget.text_area_log.focus_set() # Exemplo
             elif self.main_notebook.tab(self.main_notebook.select(), "text") == "Log do Sistema (Patch)":
                 self.set_status_from_thread("Visualizando Log do Sistema do Patch.")
+                self._ler_log_sistema()  # Traz o que foi gravado enquanto a aba estava fora de vista
         except tk.TclError:
             pass  # Pode acontecer se a aba estiver sendo destruída
 
@@ -1719,6 +1373,7 @@ class LogViewerApp:
                 return
 
             current_tab_widget.nome = novo_nome
+            current_tab_widget.sync_engine_config()
             # Atualizar o texto da aba no notebook
             # Precisamos encontrar o ID da aba pelo widget para mudar o texto
             for i, tab_id in enumerate(self.main_notebook.tabs()):
@@ -1774,6 +1429,9 @@ class LogViewerApp:
             pass
 
         current_app_config = {"theme": self.style.theme_use(), "servers": []}
+        for chave_global in ("metrics_port", "log_level", "log_max_mb", "log_backups"):
+            if self.config.get(chave_global) is not None:
+                current_app_config[chave_global] = self.config[chave_global]
 
         for servidor_tab in self.servidores:
             current_app_config["servers"].append(servidor_tab.get_current_config())
@@ -1819,9 +1477,9 @@ class LogViewerApp:
             with open(caminho, 'r', encoding='utf-8') as f:
                 loaded_config_data = json.load(f)
 
-            # Parar todos os monitoramentos das abas atuais e removê-las
+            # Parar todos os monitoramentos das abas atuais (um só prazo para todas) e removê-las
+            votemap_engine.parar_engines([srv_tab.engine for srv_tab in self.servidores])
             for srv_tab in list(self.servidores):  # Iterar sobre uma cópia para poder modificar a original
-                srv_tab.stop_log_monitoring(from_tab_closure=True)
                 self.main_notebook.forget(srv_tab)
                 srv_tab.destroy()
             self.servidores.clear()
@@ -1948,7 +1606,7 @@ class LogViewerApp:
             try:
                 if text_widget.winfo_exists():
                     with open(caminho_arquivo, 'w', encoding='utf-8') as f:
-                        f.write(text_widget.get('1.0', 'end-1c'))  # -1c para não incluir o newline final do widget
+                        f.write(text_widget.obter_texto())
                     self.set_status_from_thread(
                         f"{default_filename_part} exportados para: {os.path.basename(caminho_arquivo)}")
                     logging.info(f"{default_filename_part} exportados para: {caminho_arquivo}")
@@ -2107,49 +1765,24 @@ class LogViewerApp:
         draw.text((width // 2 - 10, height // 2 - 10), "P", fill="blue")  # Letra "P"
         return image
 
+    def _log_sistema_visivel(self):
+        """A aba Log do Sistema está selecionada e a janela não está minimizada/na bandeja."""
+        try:
+            if self.root.state() in ('withdrawn', 'iconic'):
+                return False
+            return self.main_notebook.select() == str(self.system_log_frame)
+        except tk.TclError:
+            return False
+
     def atualizar_log_sistema_periodicamente(self):
         try:
             if not self.root.winfo_exists() or not hasattr(self,
                                                            'system_log_text_area') or not self.system_log_text_area.winfo_exists():
                 return
 
-            # Só atualiza se a aba "Log do Sistema" estiver visível
-            # Isso é opcional, mas pode economizar recursos se a aba não estiver em foco.
-            # current_selected_tab_text = self.main_notebook.tab(self.main_notebook.select(), "text")
-            # if current_selected_tab_text != "Log do Sistema (Patch)":
-            #     if not self._app_stop_event.is_set() and self.root.winfo_exists():
-            #         self.root.after(5000, self.atualizar_log_sistema_periodicamente) # Checa menos frequentemente se não visível
-            #     return
-
-            log_file_path = 'votemap_patch_multi.log'  # Usar o nome correto do arquivo de log
-            if os.path.exists(log_file_path):
-                with open(log_file_path, 'r', encoding='utf-8', errors='replace') as f:
-                    # Ler apenas as últimas N linhas para performance, se o log for grande
-                    # conteudo = "".join(f.readlines()[-500:]) # Ex: últimas 500 linhas
-                    # Ou ler tudo se não for um problema
-                    conteudo = f.read()
-
-                self.system_log_text_area.configure(state='normal')
-                # Otimização: verificar se o conteúdo mudou antes de deletar e reinserir tudo
-                # current_content = self.system_log_text_area.get('1.0', 'end-1c')
-                # if current_content != conteudo: # Só atualiza se houver mudança
-                pos_atual_scroll_y, _ = self.system_log_text_area.yview()  # Pega a posição atual do scroll (0.0 a 1.0)
-
-                self.system_log_text_area.delete('1.0', 'end')
-                self.system_log_text_area.insert('end', conteudo)
-
-                # Manter scroll no fundo apenas se já estava no fundo
-                if pos_atual_scroll_y >= 0.99:  # Se estava perto do fim (considerando float precision)
-                    self.system_log_text_area.yview_moveto(1.0)
-                else:  # Caso contrário, tenta manter a posição (pode não ser perfeito com conteúdo mudando)
-                    self.system_log_text_area.yview_moveto(pos_atual_scroll_y)
-
-                self.system_log_text_area.configure(state='disabled')
-            else:  # Arquivo de log não existe
-                self.system_log_text_area.configure(state='normal')
-                self.system_log_text_area.delete('1.0', 'end')
-                self.system_log_text_area.insert('end', f"Arquivo '{log_file_path}' não encontrado.")
-                self.system_log_text_area.configure(state='disabled')
+            # Com a aba fora de vista nada é lido; on_tab_changed atualiza na hora ao voltar para ela
+            if self._log_sistema_visivel():
+                self._ler_log_sistema()
         except tk.TclError as e_tcl_syslog:
             if "invalid command name" not in str(e_tcl_syslog).lower():  # Ignora erro comum ao fechar
                 logging.error(f"TclError ao atualizar log do sistema na GUI: {e_tcl_syslog}", exc_info=False)
@@ -2161,7 +1794,25 @@ class LogViewerApp:
 
         # Continuar agendando a atualização se a app não estiver parando
         if not self._app_stop_event.is_set() and self.root.winfo_exists():
-            self.root.after(3000, self.atualizar_log_sistema_periodicamente)  # Intervalo de 3 segundos
+            self.root.after(SYSTEM_LOG_INTERVAL_MS, self.atualizar_log_sistema_periodicamente)
+
+    def _ler_log_sistema(self):
+        """Anexa à aba só o que foi gravado no log desde a última leitura."""
+        try:
+            rotacionado, novo = self._leitor_log_sistema.ler_novo()
+        except FileNotFoundError:
+            if not self._log_sistema_ausente:
+                self._log_sistema_ausente = True
+                self.system_log_text_area.substituir(f"Arquivo '{LOG_FILENAME}' não encontrado.\n")
+            return
+        except OSError:  # Bloqueado no meio de uma rotação (Windows): tenta de novo no próximo ciclo
+            return
+        if self._log_sistema_ausente:  # Arquivo apareceu (ou voltou): tira o aviso
+            self._log_sistema_ausente = False
+            self.system_log_text_area.limpar()
+        if rotacionado:
+            novo = f"--- {LOG_FILENAME} rotacionado ---\n" + novo
+        self.system_log_text_area.adicionar(novo)
 
     def iniciar_selecao_servico_para_aba(self, servidor_tab_instance):
         """Chamado por ServidorTab para iniciar o processo de seleção de serviço."""
@@ -2376,9 +2027,13 @@ class LogViewerApp:
             logging.warning("TclError ao tentar centralizar _show_progress_dialog (janela destruída?).")
         return progress_win, pb
 
-    def set_status_from_thread(self, message):  # Mantido como antes
-        if self.root.winfo_exists() and hasattr(self, 'status_label_var'):
-            self.root.after(0, lambda: self.status_label_var.set(str(message)[:200]))  # Limita tamanho da msg
+    def set_status_from_thread(self, message):
+        # Só a última mensagem recebida no intervalo de flush é exibida
+        self.ui_queue.definir_status(message)
+
+    def _aplicar_status(self, message):
+        if hasattr(self, 'status_label_var'):
+            self.status_label_var.set(str(message)[:200])  # Limita tamanho da msg
 
     def show_messagebox_from_thread(self, boxtype, title, message):  # Mantido como antes
         if self.root.winfo_exists():
@@ -2442,10 +2097,7 @@ class LogViewerApp:
         log_area = current_tab.text_area_log if current_tab else self.system_log_text_area  # Log na aba atual ou do sistema
 
         if log_area and log_area.winfo_exists():
-            log_area.configure(state='normal')
-            log_area.insert('end', f"Abrindo página de atualizações: {url}\n")
-            log_area.configure(state='disabled')
-            if hasattr(log_area, 'yview_moveto'): log_area.yview_moveto(1.0)
+            log_area.adicionar(f"Abrindo página de atualizações: {url}\n")
 
         logging.info(f"Abrindo URL para verificação de atualizações: {url}")
         try:
@@ -2539,9 +2191,12 @@ class LogViewerApp:
 
         self._app_stop_event.set()  # Sinaliza para threads da app pararem (ex: log do sistema)
 
-        # Parar monitoramento de todas as abas de servidor
-        for srv_tab in self.servidores:
-            srv_tab.stop_log_monitoring(from_tab_closure=True)
+        # Parar monitoramento de todas as abas de servidor: pede a parada a todas e espera com um só prazo
+        votemap_engine.parar_engines([srv_tab.engine for srv_tab in self.servidores])
+        self.reactor.stop()
+        self.ui_queue.stop()
+        if self.metricas:
+            self.metricas.stop()
 
         if self.root.winfo_exists():
             self.set_status_from_thread("Encerrando...")
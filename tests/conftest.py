@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Os testes importam votemap_engine/votemap_replay direto da raiz do repositório (sem Tk)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,122 @@
+import json
+import os
+import stat
+import threading
+
+import pytest
+
+from votemap_engine import CheckpointStore, gravar_arquivo_atomico
+
+
+def test_gravar_arquivo_atomico_cria_e_substitui(tmp_path):
+    caminho = tmp_path / "server.json"
+    st = gravar_arquivo_atomico(str(caminho), b"um")
+    assert caminho.read_bytes() == b"um"
+    assert st.st_size == 2
+    gravar_arquivo_atomico(str(caminho), b"dois")
+    assert caminho.read_bytes() == b"dois"
+    assert os.listdir(tmp_path) == ["server.json"]  # Nenhum temporário sobra
+
+
+@pytest.mark.skipif(os.name == "nt", reason="permissões POSIX")
+def test_gravar_arquivo_atomico_mantem_as_permissoes(tmp_path):
+    caminho = tmp_path / "server.json"
+    caminho.write_bytes(b"{}")
+    os.chmod(caminho, 0o640)
+    gravar_arquivo_atomico(str(caminho), b"{}")
+    assert stat.S_IMODE(os.stat(caminho).st_mode) == 0o640
+
+
+def test_gravar_arquivo_atomico_concorrente_nunca_mistura_conteudos(tmp_path):
+    caminho = str(tmp_path / "server.json")
+    conteudos = [bytes([ord("a") + indice]) * 100000 for indice in range(8)]
+    erros = []
+
+    def gravar(conteudo):
+        try:
+            for _ in range(20):
+                gravar_arquivo_atomico(caminho, conteudo)
+        except Exception as e_gravar:  # pragma: no cover - só aparece se a gravação falhar
+            erros.append(e_gravar)
+
+    def ler():
+        for _ in range(200):
+            try:
+                with open(caminho, "rb") as f:
+                    dados = f.read()
+            except FileNotFoundError:
+                continue
+            if dados not in conteudos:
+                erros.append(AssertionError("leitura viu um arquivo pela metade"))
+
+    threads = [threading.Thread(target=gravar, args=(conteudo,)) for conteudo in conteudos]
+    threads.append(threading.Thread(target=ler))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not erros
+    assert os.listdir(tmp_path) == ["server.json"]
+
+
+def test_gravar_arquivo_atomico_falha_remove_o_temporario(tmp_path):
+    caminho = tmp_path / "server.json"
+    caminho.write_bytes(b"antigo")
+    with pytest.raises(TypeError):
+        gravar_arquivo_atomico(str(caminho), "não é bytes")
+    assert caminho.read_bytes() == b"antigo"
+    assert os.listdir(tmp_path) == ["server.json"]
+
+
+def test_checkpoints_sobrevivem_a_reabertura(tmp_path):
+    caminho = str(tmp_path / "votemap_checkpoints.json")
+    store = CheckpointStore(caminho)
+    entrada = {"arquivo": "console.log", "identidade": [1, 2], "offset": 123, "aguardando_winner": True}
+    store.atualizar("Servidor 1", entrada)
+    store.gravar()
+    assert CheckpointStore(caminho).obter("Servidor 1") == entrada
+
+
+def test_checkpoints_so_regravam_quando_mudam(tmp_path):
+    caminho = tmp_path / "votemap_checkpoints.json"
+    store = CheckpointStore(str(caminho))
+    store.gravar()
+    assert not caminho.exists()
+    store.atualizar("a", {"offset": 1})
+    store.gravar()
+    mtime = os.stat(caminho).st_mtime_ns
+    os.utime(caminho, ns=(mtime - 10 ** 9, mtime - 10 ** 9))
+    store.gravar()
+    assert os.stat(caminho).st_mtime_ns == mtime - 10 ** 9
+
+
+def test_checkpoints_invalidos_comecam_do_zero(tmp_path):
+    caminho = tmp_path / "votemap_checkpoints.json"
+    caminho.write_text("{pela metade", encoding="utf-8")
+    assert CheckpointStore(str(caminho)).obter("a") is None
+    caminho.write_text("[1, 2]", encoding="utf-8")
+    assert CheckpointStore(str(caminho)).obter("a") is None
+
+
+def test_checkpoints_gravados_de_varias_threads(tmp_path):
+    caminho = str(tmp_path / "votemap_checkpoints.json")
+    store = CheckpointStore(caminho)
+
+    def servidor(nome):
+        for offset in range(200):
+            store.atualizar(nome, {"offset": offset})
+            store.gravar()
+
+    threads = [threading.Thread(target=servidor, args=(f"Servidor {indice}",)) for indice in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with open(caminho, encoding="utf-8") as f:
+        assert json.load(f) == {f"Servidor {indice}": {"offset": 199} for indice in range(4)}
+
+
+def test_store_compartilhada_por_caminho(tmp_path):
+    caminho = str(tmp_path / "votemap_checkpoints.json")
+    assert CheckpointStore.compartilhado(caminho) is CheckpointStore.compartilhado(caminho)
+    assert CheckpointStore.compartilhado(caminho) is not CheckpointStore.compartilhado(str(tmp_path / "outro.json"))
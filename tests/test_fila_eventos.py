@@ -0,0 +1,85 @@
+import threading
+
+from votemap_engine import FilaEventos
+
+
+def test_fila_vazia():
+    fila = FilaEventos()
+    assert fila.retirar() == ([], [], {})
+    assert fila.profundidade() == 0
+
+
+def test_prioritarios_saem_todos_na_ordem_mesmo_com_linhas_em_excesso():
+    fila = FilaEventos(max_linhas=10)
+    fila.publicar_linhas("aba", "ruído\n" * 1000)
+    for numero in range(100):
+        fila.publicar_prioritario(("vencedor", numero))
+    prioritarios, _, _ = fila.retirar()
+    assert prioritarios == [("vencedor", numero) for numero in range(100)]
+
+
+def test_coalescidos_mantem_so_o_mais_recente_por_chave_na_ordem_de_chegada():
+    fila = FilaEventos()
+    fila.publicar_coalescido(("status", "a"), "a1")
+    fila.publicar_coalescido(("status", "b"), "b1")
+    fila.publicar_coalescido(("status", "a"), "a2")
+    assert fila.profundidade() == 2
+    _, coalescidos, _ = fila.retirar()
+    assert coalescidos == ["b1", "a2"]
+
+
+def test_linhas_por_destino_sao_concatenadas():
+    fila = FilaEventos()
+    fila.publicar_linhas("a", "1\n")
+    fila.publicar_linhas("b", "x\n")
+    fila.publicar_linhas("a", "2\n3\n")
+    assert fila.profundidade() == 4
+    assert fila.retirar()[2] == {"a": ("1\n2\n3\n", 0), "b": ("x\n", 0)}
+    assert fila.profundidade() == 0
+
+
+def test_sobrecarga_descarta_as_linhas_mais_antigas_e_conta():
+    fila = FilaEventos(max_linhas=3)
+    for numero in range(5):
+        fila.publicar_linhas("a", f"{numero}\n")
+    fila.publicar_linhas("b", "b\n")
+    _, _, textos = fila.retirar()
+    assert textos == {"a": ("2\n3\n4\n", 2), "b": ("b\n", 0)}
+    assert fila.descartadas_total == 2
+    fila.publicar_linhas("a", "5\n")
+    assert fila.retirar()[2] == {"a": ("5\n", 0)}  # A contagem de descartadas zera a cada retirada
+
+
+def test_texto_maior_que_o_limite_nao_e_descartado_sozinho():
+    fila = FilaEventos(max_linhas=2)
+    fila.publicar_linhas("a", "1\n2\n3\n")
+    assert fila.retirar()[2] == {"a": ("1\n2\n3\n", 0)}
+
+
+def test_produtores_concorrentes_nao_perdem_prioritarios():
+    fila = FilaEventos(max_linhas=50)
+    parar = threading.Event()
+    recebidos = []
+
+    def consumir():
+        while not parar.is_set():
+            recebidos.extend(fila.retirar()[0])
+
+    def produzir(produtor):
+        for numero in range(2000):
+            fila.publicar_prioritario((produtor, numero))
+            fila.publicar_linhas(produtor, "linha\n")
+            fila.publicar_coalescido(("status", produtor), numero)
+
+    consumidor = threading.Thread(target=consumir)
+    consumidor.start()
+    produtores = [threading.Thread(target=produzir, args=(produtor,)) for produtor in range(4)]
+    for thread in produtores:
+        thread.start()
+    for thread in produtores:
+        thread.join()
+    parar.set()
+    consumidor.join()
+    recebidos.extend(fila.retirar()[0])
+    for produtor in range(4):
+        assert [numero for origem, numero in recebidos if origem == produtor] == list(range(2000))
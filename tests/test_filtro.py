@@ -0,0 +1,81 @@
+import threading
+
+import pytest
+
+from votemap_engine import FiltroExibicao
+
+
+def test_filtro_vazio_mostra_tudo():
+    filtro = FiltroExibicao(" , ")
+    assert filtro.vazio
+    assert filtro.mostra(b"qualquer linha")
+
+
+def test_texto_sem_virgula_e_uma_substring_sem_diferenciar_maiusculas():
+    filtro = FiltroExibicao("EndVote")
+    assert filtro.mostra(b"Votemap.ENDVOTE()")
+    assert not filtro.mostra(b"Winner: [1]")
+
+
+def test_inclusao_com_varios_termos_e_exclusao():
+    filtro = FiltroExibicao("winner, endvote, -chat")
+    assert filtro.mostra(b"Winner: [2]")
+    assert filtro.mostra(b".EndVote()")
+    assert not filtro.mostra(b"Chat: Winner: [2]")
+    assert not filtro.mostra(b"Player joined")
+
+
+def test_so_exclusao_mostra_o_resto():
+    filtro = FiltroExibicao("-chat")
+    assert filtro.mostra(b"Winner: [2]")
+    assert not filtro.mostra(b"CHAT: oi")
+
+
+def test_termos_com_prefixo_comum():
+    filtro = FiltroExibicao("win, winner, wi-fi")
+    assert filtro.mostra(b"WIN")
+    assert filtro.mostra(b"wi-fi caiu")
+    assert not filtro.mostra(b"wi")
+
+
+def test_regex_e_regex_de_exclusao():
+    filtro = FiltroExibicao(r"re:winner: \[\d+\], -re:^debug")
+    assert filtro.mostra(b"WINNER: [12]")
+    assert not filtro.mostra(b"winner: [x]")
+    assert not filtro.mostra(b"DEBUG winner: [1]")
+
+
+def test_regex_invalida_vira_literal_e_reporta_erro():
+    filtro = FiltroExibicao("re:[abc")
+    assert len(filtro.erros) == 1
+    assert filtro.mostra(b"texto re:[ABC aqui")
+    assert not filtro.mostra(b"abc")
+
+
+def test_acentos_latin1():
+    filtro = FiltroExibicao("ação")
+    assert filtro.mostra("Missão: ação iniciada".encode("latin-1"))
+    assert not filtro.mostra(b"acao")
+
+
+def test_filtro_e_imutavel():
+    filtro = FiltroExibicao("x")
+    with pytest.raises(AttributeError):
+        filtro.texto = "y"
+
+
+def test_uso_concorrente_do_mesmo_filtro():
+    filtro = FiltroExibicao("winner, -chat, re:end\\w+")
+    linhas = [b"Winner: [1]", b"chat winner", b".EndVote()", b"nada"] * 500
+    esperado = [filtro.mostra(linha) for linha in linhas]
+    resultados = []
+
+    def rodar():
+        resultados.append([filtro.mostra(linha) for linha in linhas])
+
+    threads = [threading.Thread(target=rodar) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert resultados == [esperado] * 4
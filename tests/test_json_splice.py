@@ -0,0 +1,67 @@
+import json
+import os
+
+from votemap_engine import VariantesServidorJson, molde_scenario_id
+
+
+def _trocar(texto, scenario_id):
+    antes, depois = molde_scenario_id(texto)
+    return antes + json.dumps(scenario_id) + depois
+
+
+def test_troca_so_o_valor_e_preserva_o_layout():
+    texto = ('{\n  "bindAddress": "0.0.0.0",\n  "game": {\n    "name": "Predadores — PvP",\n'
+             '    "scenarioId":   "{AAA}Missions/A.conf" ,\n    "maxPlayers": 64\n  }\n}\n')
+    novo = _trocar(texto, "{BBB}Missions/B.conf")
+    assert novo == texto.replace('"{AAA}Missions/A.conf"', '"{BBB}Missions/B.conf"')
+    assert json.loads(novo)["game"]["scenarioId"] == "{BBB}Missions/B.conf"
+
+
+def test_scenario_id_com_aspas_e_escapes():
+    texto = '{"game": {"scenarioId": "{A}\\"x\\"\\\\y", "x": 1}}'
+    novo = _trocar(texto, 'novo "id"')
+    assert json.loads(novo) == {"game": {"scenarioId": 'novo "id"', "x": 1}}
+
+
+def test_chaves_aninhadas_com_o_mesmo_nome_nao_confundem():
+    texto = '{"outro": {"game": {"scenarioId": "errado"}}, "game": {"mods": [{"scenarioId": "x"}], "scenarioId": "A"}}'
+    dados = json.loads(_trocar(texto, "B"))
+    assert dados["game"]["scenarioId"] == "B"
+    assert dados["outro"]["game"]["scenarioId"] == "errado"
+    assert dados["game"]["mods"] == [{"scenarioId": "x"}]
+
+
+def test_chave_repetida_vale_a_ultima_como_no_json_loads():
+    texto = '{"game": {"scenarioId": "A", "scenarioId": "B"}}'
+    assert _trocar(texto, "C") == '{"game": {"scenarioId": "A", "scenarioId": "C"}}'
+
+
+def test_sem_scenario_id_insere_a_chave():
+    assert json.loads(_trocar('{"game": {\n    "name": "x"\n}}', "A")) == {"game": {"scenarioId": "A", "name": "x"}}
+    assert json.loads(_trocar('{"game": {}}', "A")) == {"game": {"scenarioId": "A"}}
+    assert json.loads(_trocar('{"game": {"name": "x"}}', "A")) == {"game": {"scenarioId": "A", "name": "x"}}
+
+
+def test_sem_game_objeto_devolve_none():
+    assert molde_scenario_id('[1, 2]') is None
+    assert molde_scenario_id('{"game": 3}') is None
+    assert molde_scenario_id('{"outro": {}}') is None
+
+
+def test_variantes_gravam_o_original_com_so_o_scenario_id_trocado(tmp_path):
+    texto = '{\r\n\t"game": {\r\n\t\t"scenarioId": "A",\r\n\t\t"name": "Ação"\r\n\t}\r\n}'
+    caminho = tmp_path / "server.json"
+    caminho.write_bytes(texto.encode("utf-8"))
+    variantes = VariantesServidorJson.ler(str(caminho), mapas=("B", "C"), extras=("D",)).preparar()
+    for scenario_id in ("B", "C", "D"):
+        assert variantes.conteudo(scenario_id) == texto.replace('"A"', f'"{scenario_id}"').encode("utf-8")
+    assert variantes.dados("B") == {"game": {"scenarioId": "B", "name": "Ação"}}
+    assert json.loads(caminho.read_text(encoding="utf-8"))["game"]["scenarioId"] == "A"  # A base não muda
+
+
+def test_variantes_sem_game_reserializam(tmp_path):
+    caminho = tmp_path / "server.json"
+    caminho.write_text('{"a": 1}', encoding="utf-8")
+    variantes = VariantesServidorJson.ler(str(caminho))
+    esperado = json.dumps({"a": 1, "game": {"scenarioId": "B"}}, indent=4).replace("\n", os.linesep)
+    assert variantes.conteudo("B") == esperado.encode("utf-8")
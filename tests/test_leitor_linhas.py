@@ -0,0 +1,50 @@
+import io
+
+import pytest
+
+from votemap_engine import LeitorLinhasBinario
+
+
+def _ler_tudo(leitor):
+    linhas = []
+    while True:
+        novas = leitor.ler_linhas()
+        linhas.extend(novas)
+        if not novas and not leitor.bloco_cheio:
+            return linhas
+
+
+@pytest.mark.parametrize("tamanho_bloco", [1, 2, 3, 7, 16, 4096])
+def test_linhas_divididas_entre_blocos_chegam_inteiras(tamanho_bloco):
+    dados = b"12:00 Votemap.EndVote()\r\n12:01 Winner: [3]\n\nsem fim"
+    leitor = LeitorLinhasBinario(io.BytesIO(dados), tamanho_bloco=tamanho_bloco)
+    assert _ler_tudo(leitor) == [b"12:00 Votemap.EndVote()\r\n", b"12:01 Winner: [3]\n", b"\n"]
+    assert leitor.offset == dados.rindex(b"\n") + 1  # A linha parcial não avança o offset
+
+
+def test_linha_parcial_completa_no_proximo_read():
+    arquivo = io.BytesIO()
+    leitor = LeitorLinhasBinario(arquivo, tamanho_bloco=8)
+    arquivo.write(b"Winner: [")
+    arquivo.seek(0)
+    assert _ler_tudo(leitor) == []
+    posicao = arquivo.tell()
+    arquivo.seek(0, io.SEEK_END)
+    arquivo.write(b"12]\nproxima")
+    arquivo.seek(posicao)
+    assert _ler_tudo(leitor) == [b"Winner: [12]\n"]
+    assert leitor.offset == len(b"Winner: [12]\n")
+
+
+def test_offset_parte_da_posicao_inicial_do_arquivo():
+    arquivo = io.BytesIO(b"ja lida\nnova\n")
+    arquivo.seek(8)
+    leitor = LeitorLinhasBinario(arquivo, tamanho_bloco=3)
+    assert _ler_tudo(leitor) == [b"nova\n"]
+    assert leitor.offset == 13
+
+
+def test_bloco_cheio_indica_que_ha_mais_dados():
+    leitor = LeitorLinhasBinario(io.BytesIO(b"a\n" * 10), tamanho_bloco=4)
+    assert leitor.ler_linhas() == [b"a\n", b"a\n"]
+    assert leitor.bloco_cheio
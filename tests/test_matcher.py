@@ -0,0 +1,74 @@
+import re
+
+import pytest
+
+from votemap_engine import (DEFAULT_SERVER_CONFIG, REGRA_VENCEDOR, REGRA_VOTO, MatcherVotemap,
+                            _padrao_para_matcher)
+
+
+def _matcher_padrao():
+    return MatcherVotemap(_padrao_para_matcher(DEFAULT_SERVER_CONFIG["vote_pattern"]),
+                          _padrao_para_matcher(DEFAULT_SERVER_CONFIG["winner_pattern"]))
+
+
+def test_padroes_padrao_detectam_voto_e_vencedor():
+    matcher = _matcher_padrao()
+    assert list(matcher.verificar(b"12:00:01 SCRIPT : Votemap.EndVote()\n")) == [(REGRA_VOTO, None)]
+    assert list(matcher.verificar(b"12:00:02 SCRIPT : Winner: [7]\n")) == [(REGRA_VENCEDOR, b"7")]
+
+
+def test_linha_sem_literal_nao_dispara():
+    matcher = _matcher_padrao()
+    assert not matcher.verificar(b"12:00:03 Chat: EndVote Winner\n")
+
+
+def test_voto_e_vencedor_na_mesma_linha():
+    matcher = _matcher_padrao()
+    assert list(matcher.verificar(b".EndVote() Winner: [4]")) == [(REGRA_VOTO, None), (REGRA_VENCEDOR, b"4")]
+
+
+def test_casamento_sobreposto_reporta_as_duas_regras():
+    # 'EndVote.*' engole o texto do vencedor na regex combinada; a regra que faltou roda sozinha
+    matcher = MatcherVotemap(rb'EndVote.*', rb'Winner: \[(\d+)\]')
+    assert list(matcher.verificar(b'x EndVote() Winner: [3]')) == [(REGRA_VOTO, None), (REGRA_VENCEDOR, b"3")]
+
+
+def test_vencedor_sem_grupo_captura_none():
+    matcher = MatcherVotemap(rb"\.EndVote\(\)", rb"Winner: \[\d+\]")
+    assert list(matcher.verificar(b"Winner: [2]")) == [(REGRA_VENCEDOR, None)]
+
+
+def test_padrao_vazio_desativa_a_regra():
+    matcher = MatcherVotemap(b"", rb"Winner: \[(\d+)\]")
+    assert not matcher.verificar(b".EndVote()")
+    assert list(matcher.verificar(b".EndVote() Winner: [1]")) == [(REGRA_VENCEDOR, b"1")]
+
+
+def test_referencia_a_grupo_usa_regex_propria():
+    matcher = MatcherVotemap(rb"\.EndVote\(\)", rb"Winner: \[(\d+)\] \(\1\)")
+    assert list(matcher.verificar(b".EndVote() Winner: [3] (3)")) == [(REGRA_VOTO, None), (REGRA_VENCEDOR, b"3")]
+    assert list(matcher.verificar(b".EndVote() Winner: [3] (4)")) == [(REGRA_VOTO, None)]
+
+
+def test_classe_unicode_roda_sobre_a_linha_decodificada():
+    # Em bytes \w é só ASCII; o padrão da configuração é str, então 'é' conta como letra
+    matcher = MatcherVotemap(rb"\.EndVote\(\)", rb"Vencedor \w+ \[(\d+)\]")
+    linha = "Vencedor Mapaé [2]".encode("latin-1")
+    assert list(matcher.verificar(linha)) == [(REGRA_VENCEDOR, b"2")]
+
+
+def test_ignorecase_roda_sobre_a_linha_decodificada():
+    matcher = MatcherVotemap(rb"(?i)\.endvote\(\)", rb"Winner: \[(\d+)\]")
+    assert list(matcher.verificar(b"Votemap.ENDVOTE()")) == [(REGRA_VOTO, None)]
+
+
+def test_padrao_fora_do_latin1_nao_quebra():
+    padrao = _padrao_para_matcher("Vencedor → \\[(\\d+)\\]")
+    assert isinstance(padrao, str)
+    matcher = MatcherVotemap(_padrao_para_matcher(r"\.EndVote\(\)"), padrao)
+    assert list(matcher.verificar(b".EndVote() Vencedor -> [1]")) == [(REGRA_VOTO, None)]
+
+
+def test_padrao_invalido_levanta_re_error():
+    with pytest.raises(re.error):
+        MatcherVotemap(rb"\.EndVote\(\)", rb"Winner: [(\d+")
@@ -0,0 +1,19 @@
+import pytest
+
+import votemap_engine
+from votemap_replay import ReplayVotemap
+
+
+@pytest.mark.parametrize("inotify", [True, False], ids=["inotify", "polling"])
+def test_virada_de_sessao_sem_espera_nao_perde_votos(monkeypatch, inotify):
+    # Uma pasta logs_* nova por voto, criada sem esperar o motor aplicar o voto anterior
+    if inotify and not votemap_engine.INOTIFY_AVAILABLE:
+        pytest.skip("inotify indisponível")
+    if not inotify:
+        monkeypatch.setattr(votemap_engine, "INOTIFY_AVAILABLE", False)
+    replay = ReplayVotemap(modo="max", votos=8, linhas_entre_votos=200, votos_por_sessao=1, timeout_voto_s=5.0)
+    resumo = replay.executar()
+    assert resumo["sessoes"] == 8
+    assert resumo["perdidos"] == 0
+    assert resumo["detectados"] == 8
+    assert resumo["json_final_confere"] is True
@@ -0,0 +1,273 @@
+"""Micro-benchmarks dos caminhos quentes do patch, com saída em JSON para comparar releases.
+
+    python votemap_bench.py [--so tail,padroes,json,gui] [--saida resultado.json]
+
+- ``tail``: vazão do loop ``acompanhar_log_do_arquivo`` (linhas/s e MB/s) lendo um console.log grande
+- ``padroes``: custo por linha de ``MatcherVotemap.verificar`` com os padrões padrão
+- ``json``: ``processar_troca_mapa_logica`` (ler-modificar-gravar do JSON do servidor), pequeno e grande
+- ``gui``: ``_append_text_to_log_area_gui_thread`` + redesenho; usa o DISPLAY atual ou sobe um Xvfb
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import timeit
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+import statistics
+
+import votemap_engine
+from votemap_engine import (ServidorEngine, ServidorEngineListener, EngineReactor, CheckpointStore, MatcherVotemap,
+                            DEFAULT_SERVER_CONFIG, LOG_ENCODING)
+
+BENCHMARKS = ("tail", "padroes", "json", "gui")
+LINHA_RUIDO = b"12:34:56.789  SCRIPT       : BaseGameMode tick, players=64, fps=58.3, entities=18231 [ok]\n"
+LINHA_VOTO = b"12:34:56.789  SCRIPT       : SCR_VotingManagerComponent.EndVote()\n"
+LINHA_VENCEDOR = b"12:34:56.789  SCRIPT       : Winner: [3]\n"
+MAPAS_BENCH = ["{RANDOM}Missions/Random.conf"] + [f"{{BENCH{i:02d}}}Missions/Mapa_{i:02d}.conf" for i in range(1, 6)]
+
+
+class _ListenerContador(ServidorEngineListener):
+    def __init__(self):
+        self.linhas = 0
+
+    def linha_log(self, texto):
+        self.linhas += 1
+
+
+def _melhor(tempos):
+    return {"melhor": min(tempos), "mediana": statistics.median(tempos)}
+
+
+# --- tail ---
+def bench_tail(diretorio, linhas=300_000, repeticoes=3):
+    """Lê um console.log já escrito do começo ao fim pelo mesmo loop do monitoramento."""
+    caminho = os.path.join(diretorio, "console.log")
+    # Um "Winner" a cada 1000 linhas passa pelo casamento completo, mas sem EndVote antes não toca no JSON
+    bloco = LINHA_RUIDO * 999 + LINHA_VENCEDOR
+    with open(caminho, 'wb') as f:
+        for _ in range(linhas // 1000):
+            f.write(bloco)
+    tamanho = os.path.getsize(caminho)
+    total_linhas = (linhas // 1000) * 1000
+
+    reactor = EngineReactor()
+    reactor.start()
+    tempos = []
+    try:
+        for _ in range(repeticoes):
+            listener = _ListenerContador()
+            engine = ServidorEngine("Bench", {"log_folder": diretorio}, listener=listener, reactor=reactor,
+                                    checkpoints=CheckpointStore(os.path.join(diretorio, "checkpoints.json")))
+            engine._drenar_tail = True  # Lê até o EOF e encerra, como na troca de sessão
+            inicio = time.perf_counter()
+            reactor.submit(engine.acompanhar_log_do_arquivo(caminho, open(caminho, 'rb'))).result()
+            tempos.append(time.perf_counter() - inicio)
+            if listener.linhas != total_linhas:
+                raise RuntimeError(f"tail leu {listener.linhas} de {total_linhas} linhas")
+    finally:
+        reactor.stop()
+    melhor = min(tempos)
+    return {
+        "linhas": total_linhas,
+        "bytes": tamanho,
+        "segundos": {k: round(v, 4) for k, v in _melhor(tempos).items()},
+        "linhas_por_s": round(total_linhas / melhor),
+        "mb_por_s": round(tamanho / melhor / 1e6, 2),
+    }
+
+
+# --- padroes ---
+def bench_padroes(repeticoes=5, numero=200_000):
+    """ns/linha de MatcherVotemap.verificar para ruído, fim de votação e vencedor."""
+    matcher = MatcherVotemap(DEFAULT_SERVER_CONFIG["vote_pattern"].encode(LOG_ENCODING),
+                             DEFAULT_SERVER_CONFIG["winner_pattern"].encode(LOG_ENCODING))
+    resultado = {}
+    for nome, linha in (("ruido", LINHA_RUIDO), ("voto", LINHA_VOTO), ("vencedor", LINHA_VENCEDOR)):
+        tempos = timeit.repeat(lambda: matcher.verificar(linha), number=numero, repeat=repeticoes)
+        resultado[f"{nome}_ns_por_linha"] = round(min(tempos) / numero * 1e9, 1)
+    return resultado
+
+
+# --- json ---
+def _escrever_server_json(caminho, mods):
+    dados = {
+        "bindAddress": "0.0.0.0", "bindPort": 2001, "publicAddress": "", "publicPort": 2001,
+        "game": {
+            "name": "Servidor Bench", "password": "", "scenarioId": MAPAS_BENCH[1], "maxPlayers": 128,
+            "gameProperties": {"serverMaxViewDistance": 2500, "battlEye": True},
+            "mods": [{"modId": f"{i:016X}", "name": f"Mod de teste {i}", "version": "1.0.0"} for i in range(mods)],
+        },
+    }
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(dados, f, indent=4)
+    return os.path.getsize(caminho)
+
+
+def bench_json(diretorio, repeticoes=5, chamadas=50):
+    """Custo de processar_troca_mapa_logica com um JSON de servidor pequeno e um muito grande."""
+    votemap = os.path.join(diretorio, "votemap.json")
+    with open(votemap, 'w', encoding='utf-8') as f:
+        json.dump({"list": MAPAS_BENCH}, f, indent=4)
+    resultado = {}
+    reactor = EngineReactor()  # Próprio, como no tail: nada do reactor/checkpoints compartilhados fica para trás
+    reactor.start()
+    try:
+        for nome, mods in (("pequeno", 20), ("grande", 50_000)):
+            server_json = os.path.join(diretorio, f"server_{nome}.json")
+            tamanho = _escrever_server_json(server_json, mods)
+            config = {"server_json": server_json, "votemap_json": votemap, "auto_restart": False}
+            engine = ServidorEngine("Bench", config, listener=ServidorEngineListener(), reactor=reactor,
+                                    checkpoints=CheckpointStore(os.path.join(diretorio, "checkpoints.json")))
+            n = chamadas if mods < 1000 else max(1, chamadas // 10)
+            tempos = []
+            for _ in range(repeticoes):
+                inicio = time.perf_counter()
+                for i in range(n):
+                    engine.processar_troca_mapa_logica(1 + i % (len(MAPAS_BENCH) - 1))
+                tempos.append((time.perf_counter() - inicio) / n)
+            resultado[nome] = {"bytes": tamanho,
+                               "ms_por_troca": {k: round(v * 1000, 3) for k, v in _melhor(tempos).items()}}
+    finally:
+        reactor.stop()
+    return resultado
+
+
+# --- gui ---
+class _AbaBench:
+    """O mínimo de ServidorTab que _append_text_to_log_area_gui_thread usa."""
+
+    def __init__(self, frame, log_view, max_linhas):
+        self.nome = "Bench"
+        self.text_area_log = log_view
+        self._frame = frame
+        self._max_linhas = max_linhas
+
+    def winfo_exists(self):
+        return self._frame.winfo_exists()
+
+    def _get_max_log_lines(self):
+        return self._max_linhas
+
+
+def _garantir_display():
+    """Usa o DISPLAY atual; sem ele, sobe um Xvfb temporário. Devolve (processo_xvfb, motivo_se_indisponível)."""
+    if os.environ.get("DISPLAY"):
+        return None, None
+    if not shutil.which("Xvfb"):
+        return None, "sem DISPLAY e Xvfb não encontrado"
+    numero = 90 + os.getpid() % 100
+    processo = subprocess.Popen(["Xvfb", f":{numero}", "-screen", "0", "1280x1024x24", "-nolisten", "tcp"],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(50):
+        if os.path.exists(f"/tmp/.X11-unix/X{numero}"):
+            break
+        time.sleep(0.1)
+    os.environ["DISPLAY"] = f":{numero}"
+    return processo, None
+
+
+def bench_gui(repeticoes=3, flushes=400, linhas_por_flush=50, max_linhas=5000):
+    """Custo de um flush da UIDispatchQueue (append na VirtualLogView + redesenho), com o limite de linhas ativo."""
+    xvfb, motivo = _garantir_display()
+    if motivo:
+        return {"ignorado": motivo}
+    try:
+        import tkinter as tk
+        import PQDT_Raphael_Votemappatch as gui
+
+        root = tk.Tk()
+        root.geometry("1200x800")
+        try:
+            frame = gui.ttk.Frame(root)
+            frame.pack(fill='both', expand=True)
+            log_view = gui.VirtualLogView(frame, auto_scroll_var=tk.BooleanVar(value=True), max_linhas=max_linhas)
+            log_view.pack(fill='both', expand=True)
+            aba = _AbaBench(frame, log_view, max_linhas)
+            root.update()
+            texto = LINHA_RUIDO.decode(LOG_ENCODING) * linhas_por_flush
+            tempos = []
+            for _ in range(repeticoes):
+                log_view.limpar()
+                root.update()
+                inicio = time.perf_counter()
+                for _ in range(flushes):
+                    gui.ServidorTab._append_text_to_log_area_gui_thread(aba, texto)
+                    root.update()  # Inclui o redesenho agendado (after_idle)
+                tempos.append((time.perf_counter() - inicio) / flushes)
+        finally:
+            root.destroy()
+    except Exception as e_gui:  # Sem Tk/ttkbootstrap/pystray utilizáveis neste ambiente
+        return {"ignorado": f"{type(e_gui).__name__}: {e_gui}"}
+    finally:
+        if xvfb:
+            xvfb.terminate()
+            xvfb.wait()
+    melhor = min(tempos)
+    return {
+        "linhas_por_flush": linhas_por_flush,
+        "max_linhas": max_linhas,
+        "ms_por_flush": {k: round(v * 1000, 3) for k, v in _melhor(tempos).items()},
+        "linhas_por_s": round(linhas_por_flush / melhor),
+    }
+
+
+def executar(selecionados, linhas_tail=300_000):
+    diretorio = tempfile.mkdtemp(prefix="votemap_bench_")
+    resultados = {}
+    try:
+        for nome in selecionados:
+            logging.info(f"Bench: executando '{nome}'...")
+            if nome == "tail":
+                resultados[nome] = bench_tail(diretorio, linhas=linhas_tail)
+            elif nome == "padroes":
+                resultados[nome] = bench_padroes()
+            elif nome == "json":
+                resultados[nome] = bench_json(diretorio)
+            elif nome == "gui":
+                resultados[nome] = bench_gui()
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+    return {
+        "maquina": {
+            "python": platform.python_version(),
+            "implementacao": platform.python_implementation(),
+            "sistema": platform.platform(),
+            "cpus": os.cpu_count(),
+            "inotify": votemap_engine.INOTIFY_AVAILABLE,
+        },
+        "quando": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "resultados": resultados,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks do Votemap Patch (saída em JSON).")
+    parser.add_argument("--so", default=",".join(BENCHMARKS),
+                        help=f"Benchmarks a rodar, separados por vírgula ({', '.join(BENCHMARKS)}).")
+    parser.add_argument("--linhas-tail", type=int, default=300_000, help="Tamanho do console.log do benchmark de tail.")
+    parser.add_argument("--saida", help="Grava o JSON neste arquivo (além de imprimir).")
+    parser.add_argument("--log-level", default="WARNING", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=getattr(logging, args.log_level), format=votemap_engine.LOG_FORMAT)
+    selecionados = [nome.strip() for nome in args.so.split(",") if nome.strip()]
+    desconhecidos = [nome for nome in selecionados if nome not in BENCHMARKS]
+    if desconhecidos:
+        parser.error(f"benchmark desconhecido: {', '.join(desconhecidos)}")
+
+    relatorio = executar(selecionados, linhas_tail=args.linhas_tail)
+    saida = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    print(saida)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            f.write(saida + "\n")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,3004 @@
+"""Motor do Predadores Votemap Patch, sem dependência de Tk.
+
+Contém toda a lógica de acompanhamento de logs, detecção de votação/vencedor,
+troca de mapa no JSON do servidor e reinício do serviço. A interface gráfica
+(PQDT_Raphael_Votemappatch.py) é apenas um cliente deste motor; o modo
+``--headless`` roda todos os servidores de ``votemap_config_multi.json`` sem
+nenhuma janela.
+"""
+import os
+import re
+import sys
+import asyncio
+import functools
+import collections
+import concurrent.futures
+import json
+import time
+import bisect
+import random
+import signal
+import stat
+import tempfile
+import struct
+import logging
+import argparse
+import platform
+import threading
+import subprocess
+import http.server
+import atexit
+import queue
+import hashlib
+import logging.handlers
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+try:
+    import win32com.client  # noqa: F401 - apenas para detectar a disponibilidade do pywin32
+    import pythoncom  # noqa: F401
+
+    PYWIN32_AVAILABLE = True
+except ImportError:
+    PYWIN32_AVAILABLE = False
+
+try:
+    import ctypes
+    import ctypes.util
+
+    _libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    _libc.inotify_init1.argtypes = [ctypes.c_int]
+    _libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    _libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    INOTIFY_AVAILABLE = sys.platform.startswith("linux")
+except (ImportError, OSError, AttributeError):
+    INOTIFY_AVAILABLE = False
+
+CONFIG_FILENAME = "votemap_config_multi.json"
+LOG_FILENAME = "votemap_patch_multi.log"
+CHECKPOINT_FILENAME = "votemap_checkpoints.json"
+LOG_FORMAT = '%(asctime)s - %(levelname)s - [%(threadName)s] - %(module)s.%(funcName)s:%(lineno)d - %(message)s'
+LOG_MAX_BYTES_PADRAO = 10 * 1024 * 1024  # Tamanho do votemap_patch_multi.log antes de rotacionar
+LOG_BACKUPS_PADRAO = 5  # Arquivos rotacionados mantidos (votemap_patch_multi.log.1 ... .5)
+
+DEFAULT_SERVER_CONFIG = {
+    "log_folder": "",
+    "server_json": "",
+    "votemap_json": "",
+    "service_name": "",
+    "filter": "",
+    "auto_restart": True,
+    "vote_pattern": r"\.EndVote\(\)",
+    "winner_pattern": r"Winner: \[(\d+)\]",
+    "default_mission": "{B88CC33A14B71FDC}Missions/V30_MapVoting_Mission.conf",
+    "stop_delay": 10,
+    "start_delay": 30,
+    "auto_scroll_log": True,
+    "max_log_lines": 5000,
+}
+
+
+# ############################################################################
+# # Logging - gravação em thread própria, com rotação por tamanho
+# ############################################################################
+class _QueueHandlerSemFormatar(logging.handlers.QueueHandler):
+    """Enfileira o registro como está; a formatação fica para a thread do QueueListener."""
+
+    def prepare(self, record):
+        return record
+
+
+_listener_logging = None
+
+
+def opcoes_log_da_config(config_file=CONFIG_FILENAME):
+    """Lê 'log_level', 'log_max_mb' e 'log_backups' do arquivo de configuração (padrões se ausente/inválido)."""
+    opcoes = {"nivel": logging.INFO, "max_bytes": LOG_MAX_BYTES_PADRAO, "backups": LOG_BACKUPS_PADRAO}
+    try:
+        with open(config_file, 'r', encoding='utf-8') as f:
+            config_data = json.load(f)
+    except (OSError, ValueError):
+        return opcoes
+    if not isinstance(config_data, dict):
+        return opcoes
+    nivel = logging.getLevelName(str(config_data.get("log_level", "INFO")).upper())
+    if isinstance(nivel, int):
+        opcoes["nivel"] = nivel
+    try:
+        opcoes["max_bytes"] = max(0, int(float(config_data.get("log_max_mb", LOG_MAX_BYTES_PADRAO / 1048576)) * 1048576))
+        opcoes["backups"] = max(0, int(config_data.get("log_backups", LOG_BACKUPS_PADRAO)))
+    except (TypeError, ValueError):
+        pass
+    return opcoes
+
+
+def configurar_logging(nivel=logging.INFO, arquivo=LOG_FILENAME, max_bytes=LOG_MAX_BYTES_PADRAO,
+                       backups=LOG_BACKUPS_PADRAO, console=False):
+    """Configura o logging raiz: as threads só enfileiram, e uma thread ("LogWriter") formata e grava.
+
+    O arquivo rotaciona ao passar de ``max_bytes`` (0 desativa a rotação), mantendo ``backups`` cópias.
+    Pode ser chamada de novo (ex: nível alterado); o listener anterior é esvaziado e parado.
+    """
+    global _listener_logging
+    parar_logging()
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [logging.handlers.RotatingFileHandler(arquivo, maxBytes=max_bytes, backupCount=backups,
+                                                     encoding='utf-8', delay=True)]
+    if console:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    fila = queue.SimpleQueue()
+    raiz = logging.getLogger()
+    for handler in raiz.handlers[:]:
+        raiz.removeHandler(handler)
+        handler.close()
+    raiz.addHandler(_QueueHandlerSemFormatar(fila))
+    raiz.setLevel(nivel)
+
+    _listener_logging = logging.handlers.QueueListener(fila, *handlers, respect_handler_level=True)
+    _listener_logging.start()
+    _listener_logging._thread.name = "LogWriter"
+    return _listener_logging
+
+
+def parar_logging():
+    """Grava o que ainda está na fila e fecha o arquivo. Também roda no atexit."""
+    global _listener_logging
+    listener, _listener_logging = _listener_logging, None
+    if listener is None:
+        return
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+
+atexit.register(parar_logging)
+
+
+# ############################################################################
+# # Observação de arquivos - inotify no Linux, polling como fallback
+# ############################################################################
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_MASK_ADD = 0x20000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_INOTIFY_EVENT_HEADER = struct.Struct("iIII")
+
+POLL_INTERVAL_S = 0.2  # Intervalo do fallback por polling (comportamento original do tail)
+INOTIFY_SAFETY_TIMEOUT_S = 5.0  # Releitura de segurança mesmo sem notificação (ex: arquivo recriado)
+BLOCO_LEITURA_BYTES = 64 * 1024  # Leitura do console.log em blocos; um bloco cheio devolve o loop aos demais servidores
+LOG_ENCODING = 'latin-1'  # Encoding dos logs do Arma; só é usado para as linhas exibidas
+MONITOR_PASTA_INTERVALO_S = 5.0  # Revarredura de segurança da pasta de logs quando há observação de diretório
+MONITOR_PASTA_POLL_S = 1.0  # Revarredura sem observação de diretório (sem inotify)
+DRENAR_TAIL_TIMEOUT_S = 2.0  # Tempo máximo para o tail antigo ler o resto do arquivo ao trocar de sessão
+CHECKPOINT_INTERVAL_S = 2.0  # Intervalo mínimo entre gravações do checkpoint de leitura (fim de votação grava na hora)
+FILA_EXIBICAO_MAX_LINHAS = 20000  # Linhas de log pendentes por destino antes de descartar as mais antigas
+METRICAS_HOST = "127.0.0.1"  # O endpoint de métricas só escuta localmente
+JSON_DEBOUNCE_S = 0.3  # Silêncio exigido após uma mudança nos JSONs observados antes de reler
+JSON_POLL_S = 2.0  # Revarredura dos JSONs observados sem inotify
+
+
+class InotifyWatcher:
+    """Wrapper mínimo sobre inotify(7) usando ctypes (sem dependências externas)."""
+
+    def __init__(self):
+        fd = _libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1 falhou: {os.strerror(err)}")
+        self.fd = fd
+
+    def fileno(self):
+        return self.fd
+
+    def add_watch(self, path, mask):
+        wd = _libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_add_watch falhou para '{path}': {os.strerror(err)}")
+        return wd
+
+    def rm_watch(self, wd):
+        _libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self):
+        """Lê todos os eventos pendentes. Retorna lista de (wd, mask, cookie, nome)."""
+        eventos = []
+        while True:
+            try:
+                dados = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not dados:
+                break
+            pos = 0
+            while pos < len(dados):
+                wd, mask, cookie, tamanho = _INOTIFY_EVENT_HEADER.unpack_from(dados, pos)
+                pos += _INOTIFY_EVENT_HEADER.size
+                nome = dados[pos:pos + tamanho].rstrip(b"\0")
+                pos += tamanho
+                eventos.append((wd, mask, cookie, os.fsdecode(nome)))
+        return eventos
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class EngineReactor:
+    """Um único loop asyncio que multiplexa o acompanhamento de todos os servidores.
+
+    Todo o tail e a observação de pastas rodam como corrotinas nesta thread; trabalho
+    bloqueante (sc.exe, varredura de pastas, JSON) vai para um pool pequeno e fixo.
+    O número de threads não depende do número de servidores.
+    """
+    _compartilhado = None
+    _compartilhado_lock = threading.Lock()
+
+    def __init__(self, max_workers=4):
+        self.loop = None
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers,
+                                                              thread_name_prefix="EngineWorker")
+        self._thread = None
+        self._pronto = threading.Event()
+        self._inotify = None
+        self._watches = {}  # wd -> {token: (mask, callback)}
+        self._proximo_token = 0
+
+    @classmethod
+    def compartilhado(cls):
+        """Reactor padrão do processo, iniciado sob demanda."""
+        with cls._compartilhado_lock:
+            if cls._compartilhado is None or not cls._compartilhado.is_running():
+                cls._compartilhado = cls()
+                cls._compartilhado.start()
+            return cls._compartilhado
+
+    def is_running(self):
+        return bool(self._thread and self._thread.is_alive())
+
+    def start(self):
+        if self.is_running():
+            return
+        self._pronto.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="EngineReactor")
+        self._thread.start()
+        self._pronto.wait()
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        if INOTIFY_AVAILABLE:
+            try:
+                self._inotify = InotifyWatcher()
+                self.loop.add_reader(self._inotify.fd, self._despachar_inotify)
+            except (OSError, NotImplementedError) as e_inotify:
+                logging.warning(f"Reactor: inotify indisponível ({e_inotify}). Usando polling.")
+                if self._inotify:
+                    self._inotify.close()
+                self._inotify = None
+        logging.info(f"Reactor iniciado (inotify={'sim' if self._inotify else 'não'}).")
+        self._pronto.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            pendentes = [t for t in asyncio.all_tasks(self.loop) if not t.done()]
+            for tarefa in pendentes:
+                tarefa.cancel()
+            if pendentes:
+                self.loop.run_until_complete(asyncio.gather(*pendentes, return_exceptions=True))
+            if self._inotify:
+                self.loop.remove_reader(self._inotify.fd)
+                self._inotify.close()
+                self._inotify = None
+            self.loop.close()
+            logging.info("Reactor encerrado.")
+
+    def stop(self, timeout=5.0):
+        if not self.is_running():
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        if self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
+        self.executor.shutdown(wait=False)
+
+    def in_reactor_thread(self):
+        return self._thread is threading.current_thread()
+
+    def submit(self, coro):
+        """Agenda uma corrotina no reactor a partir de qualquer thread. Retorna concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call_soon(self, func, *args):
+        self.loop.call_soon_threadsafe(func, *args)
+
+    def executar_em_background(self, func, *args, **kwargs):
+        """Executa uma função bloqueante no pool do reactor (chamável de qualquer thread)."""
+        return self.executor.submit(func, *args, **kwargs)
+
+    async def em_background(self, func, *args, **kwargs):
+        """Versão awaitable de executar_em_background, para uso dentro das corrotinas."""
+        return await self.loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    # --- Observação de arquivos/pastas (chamar somente na thread do reactor) ---
+    def observar(self, caminho, mask, callback):
+        """Registra callback(mask, nome) para eventos inotify em caminho. Retorna token ou None (sem inotify)."""
+        if not self._inotify:
+            return None
+        try:
+            wd = self._inotify.add_watch(caminho, mask | IN_MASK_ADD)
+        except OSError as e_watch:
+            logging.warning(f"Reactor: não foi possível observar '{caminho}': {e_watch}")
+            return None
+        self._proximo_token += 1
+        token = (wd, self._proximo_token)
+        self._watches.setdefault(wd, {})[token] = (mask, callback)
+        return token
+
+    def cancelar_observacao(self, token):
+        if not token:
+            return
+        wd = token[0]
+        callbacks = self._watches.get(wd)
+        if callbacks is None:
+            return
+        callbacks.pop(token, None)
+        if not callbacks:
+            del self._watches[wd]
+            if self._inotify:
+                self._inotify.rm_watch(wd)
+
+    def _despachar_inotify(self):
+        for wd, mask, _cookie, nome in self._inotify.read_events():
+            callbacks = self._watches.get(wd)
+            if not callbacks:
+                continue
+            for mask_obs, callback in list(callbacks.values()):
+                if mask & (mask_obs | IN_IGNORED):
+                    try:
+                        callback(mask, nome)
+                    except Exception as e_cb:
+                        logging.error(f"Reactor: erro em callback de observação: {e_cb}", exc_info=True)
+            if mask & IN_IGNORED:  # O kernel removeu o watch (arquivo/pasta apagado)
+                self._watches.pop(wd, None)
+
+
+class AsyncFileWaiter:
+    """Espera (no reactor) até o arquivo crescer; sem inotify, espera POLL_INTERVAL_S como o tail original."""
+
+    def __init__(self, reactor, caminho):
+        self.caminho = caminho
+        self.reactor = reactor
+        self._evento = asyncio.Event()
+        self._token = reactor.observar(
+            caminho, IN_MODIFY | IN_CLOSE_WRITE | IN_ATTRIB | IN_DELETE_SELF | IN_MOVE_SELF, self._notificado)
+
+    def _notificado(self, mask, nome):
+        self._evento.set()
+
+    async def aguardar(self):
+        """Retorna True se houve notificação (ou acordar), False no timeout."""
+        timeout = INOTIFY_SAFETY_TIMEOUT_S if self._token else POLL_INTERVAL_S
+        try:
+            await asyncio.wait_for(self._evento.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._evento.clear()
+
+    def acordar(self):
+        self._evento.set()
+
+    def close(self):
+        self.reactor.cancelar_observacao(self._token)
+        self._token = None
+
+
+class LeitorLinhasBinario:
+    """Lê um arquivo em blocos binários e devolve só as linhas completas (bytes, com o '\\n').
+
+    A linha parcial do fim de cada bloco fica guardada até o próximo read, então uma
+    linha escrita em duas partes pelo servidor chega inteira.
+    """
+
+    def __init__(self, file_handle, tamanho_bloco=BLOCO_LEITURA_BYTES):
+        self.file_handle = file_handle
+        self.tamanho_bloco = tamanho_bloco
+        self.offset = file_handle.tell()  # Fim da última linha completa devolvida (onde retomar)
+        self._parcial = b""
+        self.bloco_cheio = False  # True se o último read encheu o bloco (ainda há dados para ler)
+
+    def ler_linhas(self):
+        bloco = self.file_handle.read(self.tamanho_bloco)
+        self.bloco_cheio = len(bloco) == self.tamanho_bloco
+        if not bloco:
+            return []
+        if self._parcial:
+            bloco = self._parcial + bloco
+        fim = bloco.rfind(b"\n") + 1
+        self._parcial = bloco[fim:]
+        self.offset += fim
+        if not fim:
+            return []
+        return bloco[:fim].splitlines(keepends=True)
+
+
+# Pastas de sessão do Arma Reforger: logs_YYYY-MM-DD_HH-MM-SS (a ordem do nome é a ordem cronológica)
+LOG_FOLDER_PATTERN = re.compile(r"^logs_\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}$")
+
+
+class IndiceSessoesLog:
+    """Índice das pastas de sessão de uma pasta raiz de logs, ordenado pelo timestamp do nome.
+
+    A varredura (os.scandir, sem stat por entrada) só acontece quando o mtime da
+    pasta raiz muda ou quando a observação de diretório é perdida; eventos de
+    criação/remoção atualizam a lista incrementalmente. Entre mudanças, a sessão
+    mais recente sai em O(1) e as posteriores a uma sessão, por busca binária.
+    """
+
+    def __init__(self, pasta_raiz):
+        self.pasta_raiz = pasta_raiz
+        self.observado = False  # True enquanto há observação inotify da pasta raiz alimentando registrar_evento
+        self._lock = threading.Lock()
+        self._sessoes = []  # Nomes ordenados
+        self._mtime_ns = None
+        self._sujo = True
+
+    def mais_recente(self):
+        """Caminho da sessão mais recente, ou None. Pode levantar OSError se a pasta raiz sumir."""
+        sessoes = self._sessoes_atuais()
+        return os.path.join(self.pasta_raiz, sessoes[-1]) if sessoes else None
+
+    def posteriores(self, nome):
+        """Caminhos das sessões depois de ``nome`` (pelo timestamp), da mais antiga para a mais nova."""
+        sessoes = self._sessoes_atuais()
+        return [os.path.join(self.pasta_raiz, sessao) for sessao in sessoes[bisect.bisect_right(sessoes, nome):]]
+
+    def _sessoes_atuais(self):
+        """Cópia da lista ordenada, revarrendo a pasta se preciso. Pode levantar OSError."""
+        with self._lock:
+            if not self._sujo and self.observado:
+                return list(self._sessoes)
+        mtime_ns = os.stat(self.pasta_raiz).st_mtime_ns
+        with self._lock:
+            if self._sujo or mtime_ns != self._mtime_ns:
+                self._sessoes = self._varrer()
+                self._mtime_ns = mtime_ns
+                self._sujo = False
+            return list(self._sessoes)
+
+    def _varrer(self):
+        with os.scandir(self.pasta_raiz) as entradas:
+            return sorted(entrada.name for entrada in entradas
+                          if LOG_FOLDER_PATTERN.match(entrada.name) and entrada.is_dir())
+
+    def registrar_evento(self, mask, nome):
+        """Aplica um evento inotify da pasta raiz sem revarrer a pasta."""
+        if mask & IN_IGNORED:
+            with self._lock:
+                self.observado = False
+                self._sujo = True
+            return
+        if not nome or not LOG_FOLDER_PATTERN.match(nome):
+            return
+        with self._lock:
+            posicao = bisect.bisect_left(self._sessoes, nome)
+            presente = posicao < len(self._sessoes) and self._sessoes[posicao] == nome
+            if mask & (IN_CREATE | IN_MOVED_TO) and not presente:
+                self._sessoes.insert(posicao, nome)
+            elif mask & (IN_DELETE | IN_MOVED_FROM) and presente:
+                del self._sessoes[posicao]
+
+    def invalidar(self):
+        with self._lock:
+            self._sujo = True
+
+
+def identidade_arquivo(st):
+    """Identifica o arquivo independentemente do caminho: (dispositivo, inode) ou data de criação."""
+    if st.st_ino:
+        return [st.st_dev, st.st_ino]
+    return [st.st_dev, getattr(st, 'st_birthtime', st.st_ctime)]
+
+
+def assinatura_arquivo(st):
+    """(identidade, mtime, tamanho): muda sempre que o arquivo é regravado ou substituído."""
+    return (tuple(identidade_arquivo(st)), st.st_mtime_ns, st.st_size)
+
+
+_travas_gravacao = {}
+_travas_gravacao_lock = threading.Lock()
+
+
+def _trava_gravacao(caminho):
+    """Uma trava por arquivo de destino, compartilhada por todos os motores do processo."""
+    chave = os.path.normcase(os.path.abspath(caminho))
+    with _travas_gravacao_lock:
+        trava = _travas_gravacao.get(chave)
+        if trava is None:
+            trava = _travas_gravacao[chave] = threading.Lock()
+        return trava
+
+
+def gravar_arquivo_atomico(caminho, conteudo):
+    """Grava bytes em um temporário ao lado, fsync e os.replace: quem lê vê o arquivo antigo ou o novo, nunca
+    pela metade. Mantém as permissões do arquivo substituído. Devolve o os.stat do arquivo gravado.
+
+    Cada gravação usa um temporário próprio (mkstemp) e a trava do caminho vai da escrita ao os.replace,
+    então dois gravadores no mesmo arquivo nunca dividem o temporário nem se intercalam."""
+    with _trava_gravacao(caminho):
+        try:
+            modo = stat.S_IMODE(os.stat(caminho).st_mode)
+        except OSError:
+            modo = None
+        fd, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho) or None,
+                                          prefix=os.path.basename(caminho) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(conteudo)
+                f.flush()
+                os.fsync(f.fileno())
+            if modo is not None:
+                os.chmod(temporario, modo)
+            os.replace(temporario, caminho)
+        except BaseException:
+            try:
+                os.remove(temporario)
+            except OSError:
+                pass
+            raise
+        return os.stat(caminho)
+
+
+def caminho_checkpoints(config_file=CONFIG_FILENAME):
+    """votemap_checkpoints.json fica ao lado do arquivo de configuração, não no diretório de trabalho do processo."""
+    return os.path.join(os.path.dirname(os.path.abspath(config_file)), CHECKPOINT_FILENAME)
+
+
+class CheckpointStore:
+    """Checkpoints de leitura por servidor, para retomar o console.log após reiniciar o patch.
+
+    Cada entrada guarda arquivo, identidade, offset (fim da última linha processada)
+    e aguardando_winner. O arquivo é regravado por inteiro de forma atômica
+    (temporário + fsync + os.replace), então uma queda no meio nunca deixa JSON pela metade.
+    """
+    _compartilhados = {}
+    _compartilhados_lock = threading.Lock()
+
+    def __init__(self, caminho=None):
+        self.caminho = caminho or caminho_checkpoints()
+        self._lock = threading.Lock()
+        self._gravacao_lock = threading.Lock()
+        self._sujo = False
+        self._dados = self._carregar()
+
+    @classmethod
+    def compartilhado(cls, caminho=None):
+        """Store única por arquivo no processo (todos os servidores gravam no mesmo JSON)."""
+        caminho = os.path.abspath(caminho) if caminho else caminho_checkpoints()
+        with cls._compartilhados_lock:
+            if caminho not in cls._compartilhados:
+                cls._compartilhados[caminho] = cls(caminho)
+            return cls._compartilhados[caminho]
+
+    def _carregar(self):
+        try:
+            with open(self.caminho, 'r', encoding='utf-8') as f:
+                dados = json.load(f)
+            return dados if isinstance(dados, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e_carregar:
+            logging.warning(f"Checkpoints: não foi possível ler '{self.caminho}' ({e_carregar}). Começando do zero.")
+            return {}
+
+    def obter(self, chave):
+        with self._lock:
+            return self._dados.get(chave)
+
+    def atualizar(self, chave, dados):
+        with self._lock:
+            self._dados[chave] = dados
+            self._sujo = True
+
+    def gravar(self):
+        """Grava os checkpoints se houve mudança (chamável de qualquer thread)."""
+        with self._gravacao_lock:
+            with self._lock:
+                if not self._sujo:
+                    return
+                conteudo = json.dumps(self._dados, indent=2)
+                self._sujo = False
+            try:
+                gravar_arquivo_atomico(self.caminho, conteudo.encode('utf-8'))
+            except OSError as e_gravar:
+                with self._lock:
+                    self._sujo = True  # Tenta de novo na próxima gravação
+                logging.error(f"Checkpoints: erro ao gravar '{self.caminho}': {e_gravar}")
+
+
+class CacheVotemap:
+    """Lista de mapas ('list') de cada votemap.json, lida uma vez e compartilhada por todos os servidores.
+
+    Cada entrada guarda a assinatura do arquivo (identidade, mtime, tamanho); revalidar()
+    só relê o JSON quando ela muda. O motor revalida no pool do reactor (ao iniciar, ao
+    trocar o caminho e no fim de cada votação), então lista() no vencedor não toca o disco.
+    """
+    _compartilhado = None
+    _compartilhado_lock = threading.Lock()
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entradas = {}  # caminho normalizado -> (assinatura, lista, erro)
+
+    @classmethod
+    def compartilhado(cls):
+        """Cache única no processo: abas com o mesmo votemap.json usam a mesma lista."""
+        with cls._compartilhado_lock:
+            if cls._compartilhado is None:
+                cls._compartilhado = cls()
+            return cls._compartilhado
+
+    @staticmethod
+    def _chave(caminho):
+        return os.path.normcase(os.path.abspath(caminho))
+
+    def revalidar(self, caminho):
+        """Relê o votemap se o arquivo mudou desde a última leitura. Devolve True se a entrada foi trocada."""
+        chave = self._chave(caminho)
+        with self._lock:
+            atual = self._entradas.get(chave)
+        assinatura = None
+        try:
+            with open(chave, 'r', encoding='utf-8') as f:
+                st = os.fstat(f.fileno())
+                assinatura = assinatura_arquivo(st)
+                if atual and atual[0] == assinatura:
+                    return False
+                dados = json.load(f)
+            lista = tuple(dados.get("list") or ()) if isinstance(dados, dict) else ()
+            entrada = (assinatura, lista, None)
+        except (OSError, ValueError) as e_votemap:  # Guardado e relançado por lista() no vencedor
+            entrada = (assinatura, (), e_votemap)
+        with self._lock:
+            self._entradas[chave] = entrada
+        if entrada[2] is None:
+            logging.info(f"Votemap: {len(entrada[1])} mapa(s) carregado(s) de '{caminho}'.")
+        return True
+
+    def lista(self, caminho):
+        """Lista de mapas em memória (lê na hora só se o arquivo nunca foi visto). Relança o erro da última leitura."""
+        chave = self._chave(caminho)
+        with self._lock:
+            entrada = self._entradas.get(chave)
+        if entrada is None:
+            self.revalidar(caminho)
+            with self._lock:
+                entrada = self._entradas[chave]
+        if entrada[2] is not None:
+            raise entrada[2].with_traceback(None)
+        return entrada[1]
+
+
+_ESPACO_JSON = re.compile(r"[ \t\n\r]*")
+_DECODER_JSON = json.JSONDecoder()
+
+
+def _membros_objeto_json(texto, inicio):
+    """Percorre o objeto JSON que começa em texto[inicio] ('{'), gerando (chave, início_valor, fim_valor)."""
+    indice = _ESPACO_JSON.match(texto, inicio + 1).end()
+    if texto[indice:indice + 1] == "}":
+        return
+    while True:
+        if texto[indice:indice + 1] != '"':
+            raise ValueError(f"chave esperada na posição {indice}")
+        chave, indice = json.decoder.scanstring(texto, indice + 1)
+        indice = _ESPACO_JSON.match(texto, indice).end()
+        if texto[indice:indice + 1] != ":":
+            raise ValueError(f"':' esperado na posição {indice}")
+        inicio_valor = _ESPACO_JSON.match(texto, indice + 1).end()
+        _, fim_valor = _DECODER_JSON.raw_decode(texto, inicio_valor)
+        yield chave, inicio_valor, fim_valor
+        indice = _ESPACO_JSON.match(texto, fim_valor).end()
+        separador = texto[indice:indice + 1]
+        if separador == "}":
+            return
+        if separador != ",":
+            raise ValueError(f"',' ou '}}' esperado na posição {indice}")
+        indice = _ESPACO_JSON.match(texto, indice + 1).end()
+
+
+def molde_scenario_id(texto):
+    """Divide o texto do JSON do servidor em (antes, depois) em volta do valor de game.scenarioId.
+
+    ``antes + json.dumps(novo) + depois`` é o arquivo com só esse valor trocado; todo o
+    resto (ordem das chaves, indentação, quebras de linha, acentos) fica igual.
+    Sem scenarioId em 'game', o molde insere a chave no início do objeto. Devolve None
+    se não há um objeto 'game' no nível de cima (aí o arquivo inteiro é reserializado).
+    """
+    inicio = _ESPACO_JSON.match(texto).end()
+    if texto[inicio:inicio + 1] != "{":
+        return None
+    game = None
+    for chave, inicio_valor, fim_valor in _membros_objeto_json(texto, inicio):
+        if chave == "game":
+            game = (inicio_valor, fim_valor)  # Chave repetida: vale a última, como no json.loads
+    if game is None or texto[game[0]] != "{":
+        return None
+    span = None
+    for chave, inicio_valor, fim_valor in _membros_objeto_json(texto, game[0]):
+        if chave == "scenarioId":
+            span = (inicio_valor, fim_valor)
+    if span:
+        return texto[:span[0]], texto[span[1]:]
+    # Sem scenarioId: insere como primeiro membro, com o mesmo espaçamento do membro seguinte
+    apos_chave = game[0] + 1
+    espaco = _ESPACO_JSON.match(texto, apos_chave).group()
+    if texto[apos_chave + len(espaco)] == "}":
+        return texto[:apos_chave] + '"scenarioId": ', texto[apos_chave:]
+    return texto[:apos_chave] + espaco + '"scenarioId": ', ("," if espaco else ", ") + texto[apos_chave:]
+
+
+class VariantesServidorJson:
+    """JSON do servidor pronto para cada mapa do votemap (e a missão padrão).
+
+    Cada variante é o arquivo original com só o valor de game.scenarioId trocado
+    (molde_scenario_id), então o layout que o admin deixou no arquivo é preservado. No
+    vencedor, o conteúdo pronto só é gravado em um temporário e trocado com os.replace.
+    ``assinatura`` é a do arquivo lido e ``mapas`` a tupla do CacheVotemap usada: o motor
+    compara as duas antes de gravar e remonta se o JSON ou o votemap mudaram.
+    """
+    __slots__ = ("caminho", "assinatura", "mapas", "extras", "_base", "_molde", "_conteudos")
+
+    def __init__(self, caminho, assinatura, base, mapas=(), extras=(), molde=None, conteudos=None):
+        if not isinstance(base, dict) or not isinstance(base.get("game", {}), dict):
+            raise TypeError("o JSON do servidor precisa ser um objeto com 'game' também objeto")
+        self.caminho = caminho
+        self.assinatura = assinatura
+        self.mapas = mapas
+        self.extras = extras
+        self._base = base
+        self._molde = molde  # (antes, depois) em bytes, ou None para reserializar tudo
+        self._conteudos = conteudos if conteudos is not None else {}  # scenarioId -> bytes
+
+    @classmethod
+    def ler(cls, caminho, mapas=(), extras=()):
+        with open(caminho, 'rb') as f:
+            assinatura = assinatura_arquivo(os.fstat(f.fileno()))
+            texto = f.read().decode('utf-8')
+        base = json.loads(texto)
+        molde = molde_scenario_id(texto) if isinstance(base, dict) else None
+        if molde:
+            molde = (molde[0].encode('utf-8'), molde[1].encode('utf-8'))
+        return cls(caminho, assinatura, base, mapas, extras, molde)
+
+    def preparar(self):
+        """Serializa todas as variantes (no pool do reactor, fora do caminho do vencedor)."""
+        for scenario_id in self.mapas + self.extras:
+            if scenario_id:
+                self.conteudo(scenario_id)
+        return self
+
+    def dados(self, scenario_id):
+        """O JSON do servidor com game.scenarioId trocado (cópia rasa; a base não é alterada)."""
+        dados = dict(self._base)
+        dados["game"] = dict(self._base.get("game") or {})
+        dados["game"]["scenarioId"] = scenario_id
+        return dados
+
+    def conteudo(self, scenario_id):
+        conteudo = self._conteudos.get(scenario_id)
+        if conteudo is None:
+            if self._molde:
+                antes, depois = self._molde
+                conteudo = antes + json.dumps(scenario_id).encode('utf-8') + depois
+            else:  # Sem 'game' no arquivo: mesmo resultado do json.dump(indent=4) em modo texto
+                conteudo = json.dumps(self.dados(scenario_id), indent=4).replace("\n", os.linesep).encode('utf-8')
+            self._conteudos[scenario_id] = conteudo
+        return conteudo
+
+    def com_assinatura(self, assinatura):
+        """Mesmas variantes depois de o próprio motor gravar uma delas (o molde continua valendo no disco)."""
+        return VariantesServidorJson(self.caminho, assinatura, self._base, self.mapas, self.extras, self._molde,
+                                     self._conteudos)
+
+
+JSON_SERVIDOR = "servidor"
+JSON_VOTEMAP = "votemap"
+JSON_OK = "ok"
+JSON_INVALIDO = "invalido"
+JSON_ERRO_LEITURA = "erro_leitura"
+JSON_AUSENTE = "ausente"
+JSON_NAO_CONFIGURADO = "nao_configurado"
+
+
+def ler_json_para_exibicao(caminho):
+    """Lê e valida um JSON: (JSON_OK, dados) ou (estado, detalhe do erro) nos demais casos."""
+    if not caminho:
+        return JSON_NAO_CONFIGURADO, ""
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return JSON_OK, json.loads(f.read())
+    except FileNotFoundError:
+        return JSON_AUSENTE, ""
+    except json.JSONDecodeError as e_json:
+        return JSON_INVALIDO, str(e_json)
+    except Exception as e_leitura:
+        return JSON_ERRO_LEITURA, str(e_leitura)
+
+
+REGRA_VOTO = "voto"
+REGRA_VENCEDOR = "vencedor"
+
+
+def _literal_obrigatorio(padrao):
+    """Maior trecho literal (bytes) que toda linha casada pelo padrão precisa conter, ou None.
+
+    Um padrão em str (ver _padrao_para_matcher) tem os caracteres fora do Latin-1 tratados como não literais."""
+    try:
+        arvore = sre_parse.parse(padrao)
+    except Exception:  # Padrão inválido ou API interna do re diferente: sem pré-filtro
+        return None
+    if arvore.state.flags & re.IGNORECASE:
+        return None
+
+    trechos, atual = [], []
+
+    def fechar_trecho():
+        if atual:
+            trechos.append(bytes(atual))
+            del atual[:]
+
+    def percorrer(itens):
+        for op, valor in itens:
+            if op is sre_parse.LITERAL and valor < 256:
+                atual.append(valor)
+            elif op is sre_parse.SUBPATTERN and not (valor[1] & re.IGNORECASE):
+                percorrer(valor[3])  # Grupo obrigatório: o conteúdo dele também é obrigatório
+            else:  # Alternativas, repetições, classes, âncoras: quebram o trecho literal
+                fechar_trecho()
+
+    try:
+        percorrer(arvore)
+    except (TypeError, ValueError, IndexError):
+        return None
+    fechar_trecho()
+    return max(trechos, key=len) if trechos else None
+
+
+def _nos_do_padrao(itens):
+    """Todos os (op, valor) da árvore do sre_parse, descendo em grupos, alternativas e repetições."""
+    for op, valor in itens:
+        yield op, valor
+        pilha = [valor]
+        while pilha:
+            item = pilha.pop()
+            if isinstance(item, sre_parse.SubPattern):
+                yield from _nos_do_padrao(item)
+            elif isinstance(item, (tuple, list)):
+                pilha.extend(item)
+
+
+def _analisar_padrao(padrao):
+    """(tem_referencia_a_grupo, precisa_unicode) de um padrão em bytes (ou str).
+
+    Referências numéricas (``\\1``, ``(?(1)...)``) apontariam para o grupo errado dentro da regex
+    combinada. ``precisa_unicode``: o padrão usa ``\\w``/``\\s``/``\\b`` ou IGNORECASE, que em bytes
+    só enxergam ASCII (as regex em str, de antes, também casavam letras Latin-1 como 'é');
+    ``\\d`` é igual nos dois modos para Latin-1. Padrão que não analisa: tratado como tendo referência.
+    """
+    try:
+        arvore = sre_parse.parse(padrao)
+    except Exception:
+        return True, False
+    referencia = False
+    unicode_ = bool(arvore.state.flags & re.IGNORECASE)
+    categorias_iguais = (sre_parse.CATEGORY_DIGIT, sre_parse.CATEGORY_NOT_DIGIT)
+    try:
+        for op, valor in _nos_do_padrao(arvore):
+            if op in (sre_parse.GROUPREF, sre_parse.GROUPREF_EXISTS):
+                referencia = True
+            elif op is sre_parse.SUBPATTERN and valor[1] & re.IGNORECASE:
+                unicode_ = True
+            elif op is sre_parse.AT and valor in (sre_parse.AT_BOUNDARY, sre_parse.AT_NON_BOUNDARY):
+                unicode_ = True
+            elif op is sre_parse.IN and any(o is sre_parse.CATEGORY and a not in categorias_iguais for o, a in valor):
+                unicode_ = True
+    except (TypeError, ValueError, IndexError):
+        return True, unicode_
+    return referencia, unicode_
+
+
+def _padrao_para_matcher(padrao):
+    """Padrão da configuração em bytes (LOG_ENCODING); um caractere fora do Latin-1 o mantém em str,
+    e ele roda sobre a linha decodificada (trocar o caractere por '?' mudaria o significado da regex)."""
+    try:
+        return padrao.encode(LOG_ENCODING)
+    except UnicodeEncodeError:
+        return padrao
+
+
+def _compilar_regra(padrao):
+    """(regex, busca, em_texto): padrões que precisam de semântica Unicode (ou que só existem em str) rodam
+    sobre a linha decodificada (Latin-1 é 1:1 com os bytes); os demais, direto nos bytes."""
+    referencia, em_texto = _analisar_padrao(padrao)
+    if not em_texto and not isinstance(padrao, str):
+        regex = re.compile(padrao)
+        return regex, regex.search, referencia
+    regex = re.compile(padrao if isinstance(padrao, str) else padrao.decode(LOG_ENCODING))
+
+    def buscar(linha):
+        return regex.search(linha.decode(LOG_ENCODING))
+    return regex, buscar, True
+
+
+def _captura_bytes(match, grupo):
+    captura = match.group(grupo)
+    return captura.encode(LOG_ENCODING) if isinstance(captura, str) else captura
+
+
+class MatcherVotemap:
+    """Detecta as regras de fim de votação e de vencedor em uma passada por linha.
+
+    Cada regra tem um literal obrigatório extraído da regex (ex: ``.EndVote()``,
+    ``Winner: [``) que é procurado antes da regex do usuário. Só linhas candidatas
+    chegam à regex completa, e quando as duas regras são candidatas uma única
+    regex combinada varre a linha. O literal é buscado como regex escapada: a
+    busca de prefixo literal do ``re`` é mais rápida que ``bytes.__contains__``.
+
+    Um padrão com referência a grupo (``\\1``) não entra na regex combinada, e um padrão
+    com ``\\w``/``\\s``/``\\b``/IGNORECASE roda sobre a linha decodificada, para manter a
+    semântica Unicode das regex em str (ver _analisar_padrao).
+    """
+
+    def __init__(self, vote_pattern, winner_pattern):
+        self.vote_re = self.winner_re = None
+        self._buscar_voto = self._buscar_vencedor = None
+        separadas = False  # Alguma regra precisa de regex própria (referência a grupo ou texto decodificado)
+        if vote_pattern:
+            self.vote_re, self._buscar_voto, isolada = _compilar_regra(vote_pattern)
+            separadas = separadas or isolada
+        if winner_pattern:
+            self.winner_re, self._buscar_vencedor, isolada = _compilar_regra(winner_pattern)
+            separadas = separadas or isolada
+        self.literal_voto = _literal_obrigatorio(vote_pattern) if vote_pattern else None
+        self.literal_vencedor = _literal_obrigatorio(winner_pattern) if winner_pattern else None
+
+        self._combinado = None
+        self._grupo_vencedor = None
+        if self.vote_re and self.winner_re and not separadas:
+            try:
+                self._combinado = re.compile(b"(?P<_voto>" + vote_pattern + b")|(?P<_vencedor>" + winner_pattern + b")")
+            except re.error:  # Ex: flags inline no meio ou nomes de grupo repetidos; usa as regex separadas
+                self._combinado = None
+            else:
+                if self.winner_re.groups:
+                    self._grupo_vencedor = self._combinado.groupindex["_vencedor"] + 1
+        self._grupo_vencedor_isolado = 1 if self.winner_re and self.winner_re.groups else None
+        self._prefiltro_voto = self._criar_prefiltro(self.vote_re, self.literal_voto)
+        self._prefiltro_vencedor = self._criar_prefiltro(self.winner_re, self.literal_vencedor)
+
+    @staticmethod
+    def _criar_prefiltro(regex, literal):
+        if regex is None:  # Regra desativada (padrão vazio)
+            return lambda linha: None
+        if literal is None:  # Sem literal obrigatório: toda linha é candidata
+            return lambda linha: True
+        return re.compile(re.escape(literal)).search
+
+    def verificar(self, linha):
+        """Lista de (regra, captura) que dispararam na linha, na ordem voto -> vencedor.
+
+        Para o vencedor, captura é o grupo 1 (bytes) ou None se a regex não tiver grupo.
+        """
+        cand_voto = self._prefiltro_voto(linha)
+        cand_vencedor = self._prefiltro_vencedor(linha)
+        if not (cand_voto or cand_vencedor):
+            return ()
+
+        linha = linha.strip()
+        if cand_voto and cand_vencedor and self._combinado:
+            voto = vencedor = None
+            for match in self._combinado.finditer(linha):
+                if match.lastgroup == "_voto" and voto is None:
+                    voto = (REGRA_VOTO, None)
+                elif match.lastgroup == "_vencedor" and vencedor is None:
+                    captura = match.group(self._grupo_vencedor) if self._grupo_vencedor else None
+                    vencedor = (REGRA_VENCEDOR, captura)
+                if voto and vencedor:
+                    break
+            # O casamento de uma regra pode cobrir o texto da outra (ex: 'EndVote.*' engole o 'Winner: [n]'):
+            # a regra que faltou ainda roda sozinha, como nas regex separadas
+            if voto is None and self._buscar_voto(linha):
+                voto = (REGRA_VOTO, None)
+            if vencedor is None:
+                match = self._buscar_vencedor(linha)
+                if match:
+                    vencedor = (REGRA_VENCEDOR, _captura_bytes(match, self._grupo_vencedor_isolado)
+                                if self._grupo_vencedor_isolado else None)
+            return tuple(regra for regra in (voto, vencedor) if regra)
+
+        disparos = []
+        if cand_voto and self._buscar_voto(linha):
+            disparos.append((REGRA_VOTO, None))
+        if cand_vencedor:
+            match = self._buscar_vencedor(linha)
+            if match:
+                disparos.append((REGRA_VENCEDOR, _captura_bytes(match, self._grupo_vencedor_isolado)
+                                 if self._grupo_vencedor_isolado else None))
+        return disparos
+
+
+def _regex_trie(termos):
+    """Alternação em forma de trie para literais (bytes): prefixos comuns viram um único ramo.
+
+    Em cada posição da linha o motor de regex percorre no máximo o comprimento do maior
+    termo, então o custo por linha não cresce com a quantidade de termos (como num Aho-Corasick).
+    """
+    trie = {}
+    for termo in termos:
+        no = trie
+        for byte in termo:
+            no = no.setdefault(byte, {})
+        no[None] = True  # Fim de termo
+
+    def montar(no):
+        if None in no:  # Um termo termina aqui; numa busca, as continuações mais longas são redundantes
+            return b""
+        ramos = [re.escape(bytes([byte])) + montar(filho) for byte, filho in sorted(no.items())]
+        return ramos[0] if len(ramos) == 1 else b"(?:" + b"|".join(ramos) + b")"
+
+    return montar(trie)
+
+
+class FiltroExibicao:
+    """Filtro das linhas exibidas, compilado uma vez e imutável (seguro para ler de qualquer thread).
+
+    Sintaxe do campo "Filtro" (sem diferenciar maiúsculas de minúsculas):
+    termos separados por vírgula; ``-termo`` exclui; ``re:padrão`` é uma expressão regular
+    (``-re:padrão`` exclui). Um texto sem vírgula continua sendo uma única substring.
+    A linha aparece se casar com algum termo de inclusão (ou se não houver nenhum)
+    e com nenhum de exclusão. Todos os termos de cada grupo vão para uma única regex,
+    aplicada sobre a linha em minúsculas (literais em trie, regexes com ``(?i:...)``).
+    """
+    __slots__ = ("texto", "_incluir", "_excluir", "erros")
+
+    def __init__(self, texto):
+        incluir_literais, incluir_regex, excluir_literais, excluir_regex, erros = [], [], [], [], []
+        for termo in texto.split(","):
+            termo = termo.strip()
+            excluir = termo.startswith("-")
+            if excluir:
+                termo = termo[1:].strip()
+            if not termo:
+                continue
+            literais, regexes = (excluir_literais, excluir_regex) if excluir else (incluir_literais, incluir_regex)
+            if termo.lower().startswith("re:"):
+                padrao = termo[3:].strip().encode(LOG_ENCODING, errors='replace')
+                try:
+                    re.compile(padrao)  # Primeiro sem o (?i:...), para a mensagem de erro apontar a posição certa
+                    re.compile(b"(?i:" + padrao + b")")
+                    regexes.append(padrao)
+                    continue
+                except re.error as e_termo:
+                    erros.append(f"'{termo}': {e_termo}")  # Regex inválida vira texto literal
+            literais.append(termo.lower().encode(LOG_ENCODING, errors='replace'))
+        object.__setattr__(self, "texto", texto)
+        object.__setattr__(self, "_incluir", self._compilar(incluir_literais, incluir_regex))
+        object.__setattr__(self, "_excluir", self._compilar(excluir_literais, excluir_regex))
+        object.__setattr__(self, "erros", tuple(erros))
+
+    def __setattr__(self, nome, valor):
+        raise AttributeError("FiltroExibicao é imutável; compile um novo filtro.")
+
+    @staticmethod
+    def _compilar(literais, regexes):
+        # Literais sem IGNORECASE (a linha já vem em minúsculas): o re usa a busca rápida de prefixo
+        alternativas = [b"(?i:" + padrao + b")" for padrao in regexes]
+        if literais:
+            alternativas.insert(0, _regex_trie(set(literais)))
+        if not alternativas:
+            return None
+        return re.compile(b"|".join(alternativas)).search
+
+    @property
+    def vazio(self):
+        return self._incluir is None and self._excluir is None
+
+    def mostra(self, linha):
+        """True se a linha (bytes) deve ser exibida."""
+        linha = linha.lower()
+        if self._incluir is not None and self._incluir(linha) is None:
+            return False
+        return self._excluir is None or self._excluir(linha) is None
+
+
+# Etapas de uma troca de mapa, na ordem em que acontecem (nem toda troca passa por todas)
+ETAPA_FIM_VOTO = "fim_voto"
+ETAPA_VENCEDOR = "vencedor"
+ETAPA_TROCA_INICIO = "troca_inicio"
+ETAPA_JSON_GRAVADO = "json_gravado"
+ETAPA_TROCA_FIM = "troca_fim"
+ETAPA_SC_STOP = "sc_stop"
+ETAPA_PARADO = "parado"
+ETAPA_SC_START = "sc_start"
+ETAPA_RODANDO = "rodando"
+ETAPA_JSON_PADRAO = "json_padrao"
+NOMES_ETAPAS = {
+    ETAPA_FIM_VOTO: "EndVote",
+    ETAPA_VENCEDOR: "Winner",
+    ETAPA_TROCA_INICIO: "Início troca",
+    ETAPA_JSON_GRAVADO: "JSON gravado",
+    ETAPA_TROCA_FIM: "Fim troca",
+    ETAPA_SC_STOP: "sc stop",
+    ETAPA_PARADO: "STOPPED",
+    ETAPA_SC_START: "sc start",
+    ETAPA_RODANDO: "RUNNING",
+    ETAPA_JSON_PADRAO: "JSON padrão",
+}
+LIMITES_HISTOGRAMA_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, 120000)
+
+
+class HistogramaLatencia:
+    """Histograma de durações (ms) em faixas fixas; percentis são estimados pelo limite da faixa."""
+
+    def __init__(self, limites=LIMITES_HISTOGRAMA_MS):
+        self.limites = limites
+        self.contagens = [0] * (len(limites) + 1)  # Última faixa: acima do maior limite
+        self.total = 0
+        self.soma = 0.0
+        self.minimo = None
+        self.maximo = None
+        self.ultimo = None
+
+    def registrar(self, duracao_ms):
+        self.contagens[bisect.bisect_left(self.limites, duracao_ms)] += 1
+        self.total += 1
+        self.soma += duracao_ms
+        self.minimo = duracao_ms if self.minimo is None else min(self.minimo, duracao_ms)
+        self.maximo = duracao_ms if self.maximo is None else max(self.maximo, duracao_ms)
+        self.ultimo = duracao_ms
+
+    def percentil(self, fracao):
+        if not self.total:
+            return None
+        alvo = fracao * self.total
+        acumulado = 0
+        for indice, contagem in enumerate(self.contagens):
+            acumulado += contagem
+            if acumulado >= alvo and contagem:
+                limite = self.limites[indice] if indice < len(self.limites) else self.maximo
+                return min(limite, self.maximo)
+        return self.maximo
+
+    def resumo(self):
+        return {
+            "amostras": self.total,
+            "ultimo_ms": self.ultimo,
+            "media_ms": self.soma / self.total if self.total else None,
+            "p50_ms": self.percentil(0.5),
+            "p95_ms": self.percentil(0.95),
+            "min_ms": self.minimo,
+            "max_ms": self.maximo,
+        }
+
+
+class MedidorTrocaMapa:
+    """Marca (em tempo monotônico) as etapas de cada troca de mapa e acumula as durações por servidor.
+
+    Cada etapa registra o tempo desde a etapa anterior da mesma troca, num histograma
+    por par (anterior, etapa); ao concluir, o tempo total da troca vai para TOTAL.
+    Chamável de qualquer thread (tail no reactor, troca de mapa no executor).
+    """
+    TOTAL = ("total", "total")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ciclo = []  # [(etapa, monotonic), ...] da troca em andamento
+        self._histogramas = {}
+
+    def marcar(self, etapa, instante=None):
+        """Registra uma etapa. Devolve a duração (ms) desde a etapa anterior, ou None."""
+        instante = time.monotonic() if instante is None else instante
+        with self._lock:
+            if etapa in (ETAPA_FIM_VOTO, ETAPA_VENCEDOR) and (etapa == ETAPA_FIM_VOTO or not self._ciclo):
+                self._ciclo = [(etapa, instante)]  # Nova troca (Winner sem EndVote: ex. retomada de checkpoint)
+                return None
+            if not self._ciclo:  # Etapa fora de uma troca (ex: reinício manual)
+                return None
+            anterior, instante_anterior = self._ciclo[-1]
+            self._ciclo.append((etapa, instante))
+            duracao_ms = (instante - instante_anterior) * 1000
+            self._histograma((anterior, etapa)).registrar(duracao_ms)
+            return duracao_ms
+
+    def concluir(self):
+        """Fecha a troca em andamento. Devolve as etapas [(etapa, ms desde o início)] ou None."""
+        with self._lock:
+            ciclo, self._ciclo = self._ciclo, []
+            if len(ciclo) < 2:
+                return None
+            inicio = ciclo[0][1]
+            self._histograma(self.TOTAL).registrar((ciclo[-1][1] - inicio) * 1000)
+            return [(etapa, (instante - inicio) * 1000) for etapa, instante in ciclo]
+
+    def _histograma(self, chave):
+        if chave not in self._histogramas:
+            self._histogramas[chave] = HistogramaLatencia()
+        return self._histogramas[chave]
+
+    def limpar(self):
+        with self._lock:
+            self._histogramas.clear()
+
+    def histogramas(self):
+        """Cópia crua dos histogramas para exportação: [(de, para, limites_ms, contagens, total, soma_ms)]."""
+        with self._lock:
+            return [(de, para, hist.limites, list(hist.contagens), hist.total, hist.soma)
+                    for (de, para), hist in self._histogramas.items()]
+
+    def instantaneo(self):
+        """Cópia dos resumos: [(de, para, resumo)] na ordem das etapas, com o total por último."""
+        ordem = {etapa: indice for indice, etapa in enumerate(NOMES_ETAPAS)}
+        with self._lock:
+            itens = [(de, para, hist.resumo()) for (de, para), hist in self._histogramas.items()
+                     if (de, para) != self.TOTAL]
+            total = self._histogramas.get(self.TOTAL)
+            total = total.resumo() if total else None
+        itens.sort(key=lambda item: (ordem.get(item[1], 99), ordem.get(item[0], 99)))
+        if total:
+            itens.append((self.TOTAL[0], self.TOTAL[1], total))
+        return itens
+
+
+class MetricasServidor:
+    """Contadores de um servidor para o endpoint de métricas.
+
+    Incrementados só por quem é dono de cada etapa (tail no reactor, troca de mapa no
+    executor, reinício no reactor) e lidos sem lock pelo endpoint: um valor atrasado
+    em uma leitura é aceitável, e o tail paga só somas de inteiros por bloco lido.
+    """
+    __slots__ = ("linhas_lidas", "bytes_lidos", "casamentos_voto", "casamentos_vencedor", "votos_processados",
+                 "votos_aplicados", "reinicios_sucesso", "reinicios_falha")
+
+    def __init__(self):
+        for nome in self.__slots__:
+            setattr(self, nome, 0)
+
+
+class FilaEventos:
+    """Fila limitada entre o motor (produtores em qualquer thread) e um consumidor.
+
+    Três faixas, retiradas juntas e nesta ordem pelo consumidor:
+    - prioritária: votação/vencedor e o que não pode se perder; nunca descarta, sai sempre primeiro
+    - coalescida: eventos com chave (status, rótulos); só o mais recente de cada chave é mantido
+    - exibição: texto de log por destino, limitado a ``max_linhas`` linhas pendentes por destino;
+      na sobrecarga as linhas mais antigas são descartadas e contadas
+
+    Assim uma enxurrada de linhas de chat custa no máximo ``max_linhas`` por destino
+    a cada retirada e nunca atrasa um evento prioritário.
+    """
+
+    def __init__(self, max_linhas=FILA_EXIBICAO_MAX_LINHAS):
+        self.max_linhas = max_linhas
+        self._lock = threading.Lock()
+        self._prioritarios = []
+        self._coalescidos = {}  # chave -> evento; a ordem de inserção é a ordem de chegada
+        self._linhas = {}  # destino -> deque de textos pendentes
+        self._linhas_pendentes = {}  # destino -> total de linhas nos textos pendentes
+        self._descartadas = {}  # destino -> linhas descartadas desde a última retirada
+        self.descartadas_total = 0  # Linhas descartadas desde o início (para métricas)
+
+    def publicar_prioritario(self, evento):
+        with self._lock:
+            self._prioritarios.append(evento)
+
+    def publicar_coalescido(self, chave, evento):
+        with self._lock:
+            self._coalescidos.pop(chave, None)  # Reinsere no fim para manter a ordem de chegada
+            self._coalescidos[chave] = evento
+
+    def publicar_linhas(self, destino, texto):
+        linhas = texto.count("\n") or 1
+        with self._lock:
+            pendentes = self._linhas.get(destino)
+            if pendentes is None:
+                pendentes = self._linhas[destino] = collections.deque()
+                self._linhas_pendentes[destino] = 0
+            pendentes.append((texto, linhas))
+            total = self._linhas_pendentes[destino] + linhas
+            if self.max_linhas and total > self.max_linhas:
+                descartadas = 0
+                while len(pendentes) > 1 and total > self.max_linhas:
+                    _, linhas_antigas = pendentes.popleft()
+                    total -= linhas_antigas
+                    descartadas += linhas_antigas
+                self._descartadas[destino] = self._descartadas.get(destino, 0) + descartadas
+                self.descartadas_total += descartadas
+            self._linhas_pendentes[destino] = total
+
+    def retirar(self):
+        """Tudo o que está pendente: (prioritários, coalescidos, {destino: (texto, linhas_descartadas)})."""
+        with self._lock:
+            prioritarios, self._prioritarios = self._prioritarios, []
+            coalescidos, self._coalescidos = self._coalescidos, {}
+            linhas, self._linhas = self._linhas, {}
+            descartadas, self._descartadas = self._descartadas, {}
+            self._linhas_pendentes = {}
+        textos = {destino: ("".join(texto for texto, _ in pendentes), descartadas.get(destino, 0))
+                  for destino, pendentes in linhas.items()}
+        return prioritarios, list(coalescidos.values()), textos
+
+    def profundidade(self):
+        """Eventos e linhas aguardando a próxima retirada."""
+        with self._lock:
+            return len(self._prioritarios) + len(self._coalescidos) + sum(self._linhas_pendentes.values())
+
+
+class ServidorEngineListener:
+    """Recebe os eventos emitidos por um ServidorEngine.
+
+    Todos os métodos podem ser chamados de qualquer thread do motor; quem
+    implementa (ex: a aba da GUI) é responsável por levar a atualização para
+    a sua própria thread. A implementação padrão ignora tudo.
+    """
+
+    def linha_log(self, linha):
+        """Linha lida do console.log do servidor (já filtrada)."""
+
+    def log(self, texto):
+        """Mensagem do próprio motor destinada à área de log do servidor."""
+
+    def status(self, mensagem):
+        """Mensagem curta para a barra de status."""
+
+    def mensagem(self, tipo, titulo, texto):
+        """Notificação importante ("info", "warning" ou "error")."""
+
+    def arquivo_log_alterado(self, nome_exibicao):
+        """Um novo console.log passou a ser acompanhado."""
+
+    def json_servidor_atualizado(self, dados):
+        """O JSON do servidor foi reescrito pelo motor."""
+
+    def json_alterado(self, tipo, caminho, estado, texto, externo=False):
+        """O conteúdo de um JSON observado (JSON_SERVIDOR/JSON_VOTEMAP) mudou: texto já formatado (JSON_OK)
+        ou o detalhe do erro. Só é chamado quando o hash do conteúdo muda (ou num recarregar_jsons()).
+        externo indica que o hash mudou por uma edição fora do motor (não na carga inicial nem nas gravações
+        do próprio motor após a troca de mapa)."""
+
+    def servico_alterado(self):
+        """O estado do serviço do Windows pode ter mudado."""
+
+    def pasta_raiz_perdida(self):
+        """A pasta raiz de logs sumiu ou ficou inacessível."""
+
+    def latencias_atualizadas(self, resumo):
+        """Uma etapa da troca de mapa foi medida (resumo de MedidorTrocaMapa.instantaneo())."""
+
+
+class LoggingListener(ServidorEngineListener):
+    """Listener do modo headless: tudo vai para o log da aplicação."""
+
+    def __init__(self, nome):
+        self.nome = nome
+
+    def log(self, texto):
+        texto = texto.strip()
+        if texto:
+            logging.info(f"Tab '{self.nome}': {texto}")
+
+    def status(self, mensagem):
+        logging.debug(f"Status: {mensagem}")
+
+    def mensagem(self, tipo, titulo, texto):
+        nivel = {"error": logging.ERROR, "warning": logging.WARNING}.get(tipo, logging.INFO)
+        logging.log(nivel, f"{titulo}: {texto}")
+
+    def json_alterado(self, tipo, caminho, estado, texto, externo=False):
+        if estado == JSON_OK:
+            if externo:
+                logging.info(f"Tab '{self.nome}': JSON do {tipo} '{caminho}' alterado externamente.")
+        elif estado != JSON_NAO_CONFIGURADO:
+            logging.warning(f"Tab '{self.nome}': JSON do {tipo} '{caminho}': {estado} {texto}".rstrip())
+
+
+_TEXTOS_VERDADEIROS = ("true", "1", "yes", "sim", "on")
+_TEXTOS_FALSOS = ("false", "0", "no", "nao", "não", "off")
+
+
+def _booleano(valor):
+    """bool de um valor de configuração: aceita bool, 0/1 e textos como "true"/"false" (um JSON editado à mão).
+    Qualquer outra coisa levanta ValueError, em vez de virar True só por não ser vazia."""
+    if isinstance(valor, bool):
+        return valor
+    if isinstance(valor, int) and valor in (0, 1):
+        return bool(valor)
+    if isinstance(valor, str):
+        texto = valor.strip().lower()
+        if texto in _TEXTOS_VERDADEIROS:
+            return True
+        if texto in _TEXTOS_FALSOS:
+            return False
+    raise ValueError(f"não é um booleano: {valor!r}")
+
+
+class ConfigServidor:
+    """Snapshot imutável da configuração de um servidor, lido pelo motor sem lock e sem Tk.
+
+    Quem muda a configuração (traces da aba, modo headless) monta um snapshot novo
+    e troca a referência em ServidorEngine.config; a troca é atômica, então uma
+    iteração do tail ou uma troca de mapa sempre vê um conjunto coerente de valores.
+    Campos ausentes em ``dados`` (ex: Spinbox com texto inválido enquanto o usuário
+    digita) mantêm o valor do snapshot ``anterior``. O filtro de exibição já vem compilado.
+    """
+    __slots__ = ("nome",) + tuple(DEFAULT_SERVER_CONFIG) + ("filtro",)
+    _INTEIROS = ("stop_delay", "start_delay", "max_log_lines")
+    _BOOLEANOS = ("auto_restart", "auto_scroll_log")
+
+    def __init__(self, dados=None, anterior=None, nome=""):
+        valores = anterior.como_dict() if anterior is not None else dict(DEFAULT_SERVER_CONFIG, nome=nome)
+        for chave, valor in (dados or {}).items():
+            if chave not in valores:
+                continue
+            try:
+                if chave in self._INTEIROS:
+                    valor = int(valor)
+                elif chave in self._BOOLEANOS:
+                    valor = _booleano(valor)
+                elif valor is None:
+                    valor = ""
+            except (TypeError, ValueError):
+                logging.warning(f"Config '{valores['nome']}': valor inválido para '{chave}': {valor!r}. Mantendo o anterior.")
+                continue
+            valores[chave] = valor
+        for chave, valor in valores.items():
+            object.__setattr__(self, chave, valor)
+
+        if anterior is not None and anterior.filter == self.filter:
+            filtro = anterior.filtro  # Mesmo texto: reaproveita o filtro já compilado
+        else:
+            filtro = FiltroExibicao(self.filter or "")
+            for erro in filtro.erros:
+                logging.warning(f"Tab '{self.nome}': Regex inválida no filtro {erro}. Usando como texto.")
+            filtro = None if filtro.vazio else filtro
+        object.__setattr__(self, "filtro", filtro)
+
+    def __setattr__(self, nome, valor):
+        raise AttributeError("ConfigServidor é imutável; use substituir() para um snapshot novo.")
+
+    def substituir(self, **mudancas):
+        return ConfigServidor(mudancas, anterior=self)
+
+    def como_dict(self):
+        return {chave: getattr(self, chave) for chave in ("nome",) + tuple(DEFAULT_SERVER_CONFIG)}
+
+
+# ############################################################################
+# # Classe ServidorEngine - Monitoramento e troca de mapa de um servidor
+# ############################################################################
+def _texto(valor):
+    """Converte bytes lidos do log em texto para mensagens (None e str passam direto)."""
+    if isinstance(valor, bytes):
+        return valor.decode(LOG_ENCODING)
+    return valor
+
+
+class ServidorEngine:
+    def __init__(self, nome_servidor, config_dict=None, listener=None, reactor=None, checkpoints=None,
+                 cache_votemap=None):
+        self.nome = nome_servidor
+        self.config = ConfigServidor(config_dict, nome=nome_servidor)  # Snapshot imutável; trocado por inteiro
+        self._config_lock = threading.Lock()  # Serializa quem monta snapshots novos (GUI, pool)
+        self.listener = listener if listener else LoggingListener(nome_servidor)
+        self.reactor = reactor if reactor else EngineReactor.compartilhado()
+        self.checkpoints = checkpoints if checkpoints is not None else CheckpointStore.compartilhado()
+        self.cache_votemap = cache_votemap if cache_votemap is not None else CacheVotemap.compartilhado()
+        self._variantes = None  # VariantesServidorJson do JSON do servidor atual (protegido por _variantes_lock)
+        self._variantes_lock = threading.RLock()
+        # Trocas de mapa (e o reset pós-reinício) deste servidor rodam uma de cada vez, na ordem dos vencedores,
+        # no pool compartilhado do reactor (nenhuma thread por servidor); ver _enfileirar_troca
+        self._fila_troca = collections.deque()  # (func, args, Future)
+        self._fila_troca_lock = threading.Lock()
+        self._fila_troca_ativa = False  # Um worker do pool está drenando a fila
+        self._encerrado = False  # Aba fechada: novas trocas/resets são recusados
+        self._json_task = None  # Corrotina observar_jsons
+        self._acordar_json = None  # asyncio.Event: mudança em um JSON observado ou nos caminhos
+        self._json_lock = threading.Lock()
+        self._assinaturas_json = {}  # tipo -> (caminho, assinatura) da última leitura
+        self._hashes_json = {}  # tipo -> hash do último conteúdo entregue ao listener
+
+        # --- Estado de monitoramento (só tocado na thread do reactor) ---
+        self.paused = False
+        self._monitor_task = None
+        self._tail_task = None
+        self._observador_log = None  # AsyncFileWaiter do tail atual
+        self._acordar_monitor = None  # asyncio.Event para reavaliar a pasta de logs antes dos 5 s
+        self._drenar_tail = False  # Pede ao tail atual que leia até o EOF e termine (troca de sessão)
+        self._observacao_raiz = None  # Tokens de observação de diretório (pasta raiz e sessão atual)
+        self._observacao_sessao = (None, None)  # (pasta, token)
+        self._indice_sessoes = None  # IndiceSessoesLog da pasta raiz monitorada
+        self.caminho_log_atual = None
+        self.pasta_log_detectada_atual = None  # Para rastrear a pasta de log ex: 2023-10-27_10-00-00
+        self.aguardando_winner = False
+        self._checkpoint_gravado = (None, None, 0.0)  # (offset, aguardando_winner, monotonic) da última gravação
+        self._ultimo_checkpoint = None  # (caminho_log, identidade, offset) do último _registrar_checkpoint
+        self._votacao_seq = 0  # Incrementado a cada fim de votação
+        # votacao_seq -> (caminho_log, offset do início da linha Winner) das trocas ainda não gravadas:
+        # o checkpoint não passa dessa linha até a troca terminar
+        self._trocas_pendentes = {}
+        self._bloco_lido = (None, 0, ())  # (caminho_log, offset do início, linhas) do bloco em processamento
+        self._matcher = None  # MatcherVotemap do tail atual
+        self._winner_pattern_str = ""
+        self.latencias = MedidorTrocaMapa()  # Duração de cada etapa das trocas de mapa deste servidor
+        self.metricas = MetricasServidor()
+
+    def atualizar_config(self, config_dict):
+        """Monta um snapshot novo a partir do atual e troca a referência (atômico para as outras threads).
+
+        Chamável de qualquer thread: o lock garante que duas atualizações simultâneas (ex: a GUI e a
+        pasta raiz perdida, no pool) partem uma do resultado da outra, sem perder nenhuma.
+        """
+        with self._config_lock:
+            anterior = self.config
+            novo_config = ConfigServidor(config_dict, anterior=anterior)
+            self.nome = novo_config.nome or self.nome
+            self.config = novo_config
+        if (novo_config.votemap_json, novo_config.server_json, novo_config.default_mission) != (
+                anterior.votemap_json, anterior.server_json, anterior.default_mission):
+            self._revalidar_votemap()
+            self._acordar_observacao_json()
+
+    def _revalidar_votemap(self):
+        """No pool do reactor: relê a lista do votemap se o arquivo mudou e remonta as variantes do JSON do
+        servidor se ele ou o votemap mudaram. O vencedor só consulta a memória e faz o os.replace."""
+        if self.reactor.is_running():
+            self.reactor.executar_em_background(self._revalidar_arquivos)
+
+    def _revalidar_arquivos(self):
+        config = self.config
+        mapas = ()
+        if config.votemap_json:
+            self.cache_votemap.revalidar(config.votemap_json)
+            try:
+                mapas = self.cache_votemap.lista(config.votemap_json)
+            except (OSError, ValueError):
+                pass  # O erro aparece no vencedor, com a mensagem de sempre
+        if not config.server_json:
+            return
+        try:
+            with self._variantes_lock:
+                self._variantes_atuais(config.server_json, mapas).preparar()
+        except (OSError, ValueError, TypeError) as e_variantes:
+            logging.debug(f"Tab '{self.nome}': variantes do JSON do servidor não preparadas: {e_variantes}")
+
+    def _variantes_atuais(self, caminho, mapas=None):
+        """Variantes do JSON do servidor, remontadas se o arquivo (ou, com ``mapas``, o votemap) mudou.
+        Chamar com _variantes_lock."""
+        variantes = self._variantes
+        if variantes is not None and variantes.caminho == caminho and (mapas is None or variantes.mapas is mapas):
+            try:
+                if assinatura_arquivo(os.stat(caminho)) == variantes.assinatura:
+                    return variantes
+            except OSError:
+                pass  # ler() abaixo levanta o erro real
+        variantes = VariantesServidorJson.ler(caminho, mapas if mapas is not None else (),
+                                              (self.config.default_mission,))
+        self._variantes = variantes
+        return variantes
+
+    def _gravar_scenario_id(self, arquivo_json_servidor_path, scenario_id, mapas=None):
+        """Troca o JSON do servidor pela variante de scenario_id (temporário + os.replace) e devolve os dados gravados."""
+        with self._variantes_lock:
+            variantes = self._variantes_atuais(arquivo_json_servidor_path, mapas)
+            st = gravar_arquivo_atomico(arquivo_json_servidor_path, variantes.conteudo(scenario_id))
+            self._variantes = variantes.com_assinatura(assinatura_arquivo(st))
+        with self._json_lock:  # A observação não relê a própria gravação (nem a toma por edição externa)
+            self._assinaturas_json[JSON_SERVIDOR] = (arquivo_json_servidor_path, assinatura_arquivo(st))
+        dados = variantes.dados(scenario_id)
+        # A formatação para a tela fica fora do caminho da troca; a releitura da observação vê o mesmo hash
+        self.reactor.executar_em_background(self._publicar_json, JSON_SERVIDOR, arquivo_json_servidor_path,
+                                            JSON_OK, dados)
+        return dados
+
+    # --- Observação dos JSONs do servidor e do votemap ---
+    def iniciar_observacao_json(self):
+        """Passa a observar os JSONs do servidor e do votemap (chamável de qualquer thread)."""
+        if self.reactor.is_running():
+            self.reactor.call_soon(self._iniciar_observacao_json_no_reactor)
+
+    def _iniciar_observacao_json_no_reactor(self):
+        if self._json_task and not self._json_task.done():
+            return
+        self._acordar_json = asyncio.Event()
+        self._json_task = self.reactor.loop.create_task(self.observar_jsons(), name=f"JsonWatch-{self.nome}")
+
+    def parar_observacao_json(self):
+        tarefa = self._json_task
+        if tarefa and self.reactor.is_running():
+            try:
+                self.reactor.call_soon(tarefa.cancel)
+            except RuntimeError:  # Loop do reactor já encerrado
+                pass
+
+    def _acordar_observacao_json(self):
+        if self._acordar_json and self.reactor.is_running():
+            try:
+                self.reactor.call_soon(self._acordar_json.set)
+            except RuntimeError:
+                pass
+
+    def recarregar_jsons(self):
+        """Relê os dois JSONs no pool e entrega ao listener mesmo sem mudança (botão de atualizar)."""
+        return self.reactor.executar_em_background(self._recarregar_jsons, self._caminhos_json(), True)
+
+    def _caminhos_json(self):
+        config = self.config
+        return {JSON_SERVIDOR: config.server_json, JSON_VOTEMAP: config.votemap_json}
+
+    async def observar_jsons(self):
+        """Relê (no pool) os JSONs quando mudam no disco; o listener só é avisado se o conteúdo mudou.
+
+        Observa as pastas dos arquivos, não os arquivos: um os.replace (do patch ou de um
+        editor) troca o inode. Uma rajada de eventos é agrupada até JSON_DEBOUNCE_S sem
+        novidade; sem inotify, a assinatura dos arquivos é conferida a cada JSON_POLL_S.
+        """
+        observacoes = {}  # pasta -> (token, nomes); token None = sem inotify para ela
+        try:
+            while True:
+                caminhos = self._caminhos_json()
+                self._sincronizar_observacoes_json(observacoes, caminhos)
+                try:
+                    await self.reactor.em_background(self._recarregar_jsons, caminhos)
+                except Exception as e_recarregar:
+                    logging.error(f"Tab '{self.nome}': Erro ao reler JSONs observados: {e_recarregar}", exc_info=True)
+
+                intervalo = INOTIFY_SAFETY_TIMEOUT_S if all(t for t, _ in observacoes.values()) else JSON_POLL_S
+                try:
+                    await asyncio.wait_for(self._acordar_json.wait(), intervalo)
+                except asyncio.TimeoutError:
+                    continue
+                while True:  # Debounce: editores e o próprio os.replace geram vários eventos seguidos
+                    self._acordar_json.clear()
+                    try:
+                        await asyncio.wait_for(self._acordar_json.wait(), JSON_DEBOUNCE_S)
+                    except asyncio.TimeoutError:
+                        break
+        finally:
+            for token, _ in observacoes.values():
+                self.reactor.cancelar_observacao(token)
+
+    def _sincronizar_observacoes_json(self, observacoes, caminhos):
+        """Observa a pasta de cada JSON configurado (na thread do reactor) e larga as que não são mais usadas."""
+        nomes_por_pasta = {}
+        for caminho in caminhos.values():
+            if caminho:
+                caminho = os.path.abspath(caminho)
+                nomes_por_pasta.setdefault(os.path.dirname(caminho), set()).add(os.path.basename(caminho))
+        for pasta in list(observacoes):
+            if pasta not in nomes_por_pasta:
+                self.reactor.cancelar_observacao(observacoes.pop(pasta)[0])
+        for pasta, nomes in nomes_por_pasta.items():
+            token, nomes_atuais = observacoes.get(pasta, (None, None))
+            if token and nomes_atuais == nomes:
+                continue
+            self.reactor.cancelar_observacao(token)
+            token = None
+            if os.path.isdir(pasta):  # Pasta inexistente fica no polling, sem aviso a cada volta
+                token = self.reactor.observar(
+                    pasta, IN_CLOSE_WRITE | IN_MODIFY | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_MOVED_FROM,
+                    functools.partial(self._evento_json, observacoes, pasta, nomes))
+            observacoes[pasta] = (token, nomes)
+
+    def _evento_json(self, observacoes, pasta, nomes, mask, nome):
+        if mask & IN_IGNORED:  # Pasta removida: volta ao polling até reaparecer
+            observacoes[pasta] = (None, nomes)
+        if nome in nomes or mask & IN_IGNORED:
+            self._acordar_json.set()
+
+    def _recarregar_jsons(self, caminhos, forcar=False):
+        """No pool: relê os JSONs cuja assinatura mudou (todos, com forcar) e entrega os que mudaram de conteúdo."""
+        alterado = False
+        for tipo, caminho in caminhos.items():
+            try:
+                assinatura = assinatura_arquivo(os.stat(caminho)) if caminho else None
+            except OSError:
+                assinatura = None
+            with self._json_lock:
+                if not forcar and self._assinaturas_json.get(tipo) == (caminho, assinatura):
+                    continue
+                self._assinaturas_json[tipo] = (caminho, assinatura)
+            alterado = True
+            estado, conteudo = ler_json_para_exibicao(caminho)
+            self._publicar_json(tipo, caminho, estado, conteudo, forcar, origem_externa=True)
+        if alterado:
+            self._revalidar_arquivos()  # Edição externa: lista do votemap e variantes já prontas para o vencedor
+
+    def _publicar_json(self, tipo, caminho, estado, conteudo, forcar=False, origem_externa=False):
+        """Formata e avisa o listener se o hash do conteúdo formatado mudou desde a última entrega.
+        Com origem_externa (releitura do disco), um hash diferente do já entregue é uma edição externa;
+        a releitura da própria gravação do motor cai no mesmo hash e nem chega ao listener."""
+        texto = json.dumps(conteudo, indent=4, ensure_ascii=False) if estado == JSON_OK else conteudo
+        resumo = hashlib.sha1(f"{caminho}\0{estado}\0{texto}".encode('utf-8', 'surrogatepass')).digest()
+        with self._json_lock:
+            anterior = self._hashes_json.get(tipo)
+            if not forcar and anterior == resumo:
+                return False
+            self._hashes_json[tipo] = resumo
+        externo = origem_externa and anterior is not None and anterior != resumo
+        self.listener.json_alterado(tipo, caminho, estado, texto, externo)
+        return True
+
+    def is_running(self):
+        return bool(self._monitor_task and not self._monitor_task.done())
+
+    def start(self):
+        """Inicia o monitoramento da pasta de logs. Retorna False se a pasta for inválida."""
+        pasta_raiz = self.config.log_folder
+        if not pasta_raiz or not os.path.isdir(pasta_raiz):
+            self.listener.log(f"AVISO: Pasta de logs '{pasta_raiz}' inválida. Monitoramento não iniciado.\n")
+            return False
+        self._revalidar_votemap()
+        self.reactor.call_soon(self._iniciar_no_reactor)
+        logging.info(f"Tab '{self.nome}': Monitoramento de logs iniciado para pasta '{pasta_raiz}'.")
+        return True
+
+    def _iniciar_no_reactor(self):
+        if self.is_running():
+            logging.warning(f"Tab '{self.nome}': Tentativa de iniciar monitoramento de log já em execução.")
+            return
+        self._monitor_task = self.reactor.loop.create_task(self.monitorar_pasta_logs(), name=f"LogMonitor-{self.nome}")
+
+    def solicitar_parada(self, from_tab_closure=False):
+        """Pede a parada do monitoramento sem bloquear. Devolve o concurrent.futures.Future da parada,
+        ou None se não há o que esperar (reactor parado ou chamada na própria thread do reactor)."""
+        if not self.reactor.is_running():
+            return None
+        if from_tab_closure:
+            self._encerrado = True  # Novos resets são recusados; trocas já enfileiradas ainda terminam
+        if self.reactor.in_reactor_thread():
+            self.reactor.loop.create_task(self._parar())
+            return None
+        try:
+            return self.reactor.submit(self._parar())
+        except RuntimeError:  # Loop do reactor já encerrado
+            return None
+
+    def stop(self, from_tab_closure=False):
+        """Para o monitoramento de logs deste servidor (chamável de qualquer thread)."""
+        if not self.reactor.is_running():
+            return
+        futuro = self.solicitar_parada(from_tab_closure)
+        if futuro is not None:
+            try:
+                futuro.result(timeout=2.0)
+            except concurrent.futures.TimeoutError:
+                logging.warning(f"Tab '{self.nome}': Monitoramento não finalizou no tempo esperado.")
+        if not from_tab_closure:  # Só loga se não for parte do fechamento da aba/app
+            logging.info(f"Tab '{self.nome}': stop completado.")
+
+    async def _parar(self):
+        for tarefa in (self._monitor_task, self._tail_task):
+            if tarefa and not tarefa.done():
+                tarefa.cancel()
+                try:
+                    await tarefa
+                except asyncio.CancelledError:
+                    pass
+        self._monitor_task = None
+        self._tail_task = None
+        self.caminho_log_atual = None
+        self.pasta_log_detectada_atual = None
+
+    async def _cancelar_tail(self, drenar=False):
+        """Encerra o tail atual. Com drenar=True, ele primeiro lê o que falta do arquivo antigo."""
+        tarefa, self._tail_task = self._tail_task, None
+        if tarefa and not tarefa.done() and drenar:
+            self._drenar_tail = True
+            if self._observador_log:
+                self._observador_log.acordar()
+            try:
+                await asyncio.wait_for(asyncio.shield(tarefa), DRENAR_TAIL_TIMEOUT_S)
+            except asyncio.TimeoutError:
+                logging.warning(f"Tab '{self.nome}': Tail antigo não terminou de drenar em {DRENAR_TAIL_TIMEOUT_S}s.")
+            finally:
+                self._drenar_tail = False
+        if tarefa and not tarefa.done():
+            tarefa.cancel()
+            try:
+                await tarefa
+            except asyncio.CancelledError:
+                pass
+
+    async def monitorar_pasta_logs(self):
+        """Corrotina que observa a pasta de logs e troca o tail quando surge um novo console.log."""
+        pasta_raiz_monitorada = self.config.log_folder
+        self._acordar_monitor = asyncio.Event()
+        self.listener.status(
+            f"'{self.nome}': Monitorando pasta: {os.path.basename(pasta_raiz_monitorada) if pasta_raiz_monitorada else 'N/A'}")
+        logging.info(f"Tab '{self.nome}': Iniciando monitoramento contínuo de: {pasta_raiz_monitorada}")
+
+        try:
+            while True:
+                self._observar_pasta_raiz(pasta_raiz_monitorada)
+                if not pasta_raiz_monitorada or not os.path.isdir(pasta_raiz_monitorada):
+                    if pasta_raiz_monitorada:  # Se havia um caminho, mas agora é inválido
+                        logging.warning(
+                            f"Tab '{self.nome}': Pasta de logs '{pasta_raiz_monitorada}' não encontrada ou não é um diretório.")
+                    await asyncio.sleep(10)  # Pausa longa se a pasta for inválida
+                    pasta_raiz_monitorada = self.config.log_folder  # Re-checa se o usuário corrigiu
+                    continue
+
+                try:
+                    if await self._verificar_pasta_logs(pasta_raiz_monitorada):
+                        continue  # Há sessões mais novas que a recém-aberta: a próxima drena esta antes de abri-las
+                except Exception as e_monitor_loop:
+                    logging.error(f"Tab '{self.nome}': Erro no loop principal de monitoramento: {e_monitor_loop}",
+                                  exc_info=True)
+                    self.listener.log(
+                        f"ERRO CRÍTICO AO MONITORAR LOGS: {e_monitor_loop}\nVerifique o Log do Sistema do Patch.\n")
+
+                # Nova sessão/console.log acorda o monitor na hora pela observação de diretório;
+                # o intervalo é só uma revarredura de segurança (ou o polling, sem inotify)
+                intervalo = MONITOR_PASTA_INTERVALO_S if self._observacao_raiz else MONITOR_PASTA_POLL_S
+                try:
+                    await asyncio.wait_for(self._acordar_monitor.wait(), intervalo)
+                except asyncio.TimeoutError:
+                    pass
+                self._acordar_monitor.clear()
+        finally:
+            self._cancelar_observacoes_pasta()
+            await self._cancelar_tail()
+            self.caminho_log_atual = None
+            logging.info(f"Tab '{self.nome}': Monitoramento de log contínuo encerrado.")
+
+    def _acordar_monitor_por_evento(self, mask, nome):
+        if self._acordar_monitor:
+            self._acordar_monitor.set()
+
+    def _evento_pasta_raiz(self, mask, nome):
+        if mask & IN_IGNORED:  # Pasta raiz removida: o kernel desfez a observação
+            self._observacao_raiz = None
+        if self._indice_sessoes:
+            self._indice_sessoes.registrar_evento(mask, nome)
+        self._acordar_monitor_por_evento(mask, nome)
+
+    def _observar_pasta_raiz(self, pasta_raiz):
+        if self._indice_sessoes is None or self._indice_sessoes.pasta_raiz != pasta_raiz:
+            self._indice_sessoes = IndiceSessoesLog(pasta_raiz)
+        if self._observacao_raiz is None and pasta_raiz and os.path.isdir(pasta_raiz):
+            self._observacao_raiz = self.reactor.observar(
+                pasta_raiz, IN_CREATE | IN_MOVED_TO | IN_DELETE | IN_MOVED_FROM | IN_ONLYDIR,
+                self._evento_pasta_raiz)
+            if self._observacao_raiz:
+                # Eventos perdidos antes da observação existir: força uma varredura antes de confiar neles
+                self._indice_sessoes.invalidar()
+                self._indice_sessoes.observado = True
+
+    def _observar_sessao(self, subpasta):
+        """Observa a sessão mais recente para abrir o console.log assim que ele for criado."""
+        pasta_atual, token = self._observacao_sessao
+        if pasta_atual == subpasta:
+            return
+        self.reactor.cancelar_observacao(token)
+        token = self.reactor.observar(subpasta, IN_CREATE | IN_MOVED_TO | IN_ONLYDIR,
+                                      self._acordar_monitor_por_evento) if subpasta else None
+        self._observacao_sessao = (subpasta, token)
+
+    def _cancelar_observacoes_pasta(self):
+        self.reactor.cancelar_observacao(self._observacao_raiz)
+        self._observacao_raiz = None
+        self.reactor.cancelar_observacao(self._observacao_sessao[1])
+        self._observacao_sessao = (None, None)
+
+    async def _verificar_pasta_logs(self, pasta_raiz_monitorada):
+        """Abre o console.log da próxima sessão, se houver. Devolve True se ainda há sessões depois dela."""
+        # Próxima subpasta de log (ex: .../logs/2023-10-27_10-00-00) depois da atual, sem bloquear o reactor
+        sessao_atual = self.pasta_log_detectada_atual if self.caminho_log_atual else None
+        subpasta_log_recente, ha_mais = await self.reactor.em_background(
+            self._obter_proxima_subpasta_log, pasta_raiz_monitorada, self._indice_sessoes, sessao_atual)
+
+        if not subpasta_log_recente:  # Nenhuma subpasta de log encontrada
+            if self.caminho_log_atual:  # Se antes estávamos monitorando algo
+                self.listener.log(
+                    f"AVISO: Nenhuma subpasta de log encontrada em '{pasta_raiz_monitorada}'. Verificando...\n")
+                self.caminho_log_atual = None  # Resetar
+                await self._cancelar_tail()
+            return
+
+        self._observar_sessao(subpasta_log_recente)
+        # Caminho para o arquivo console.log dentro da subpasta mais recente
+        novo_arquivo_log_path_potencial = os.path.join(subpasta_log_recente, 'console.log')
+
+        # Se um novo arquivo de log foi detectado (diferente do atual) OU se não há log atual mas encontramos um
+        if os.path.exists(novo_arquivo_log_path_potencial) and \
+                (novo_arquivo_log_path_potencial != self.caminho_log_atual or not self.caminho_log_atual):
+
+            logging.info(
+                f"Tab '{self.nome}': Novo arquivo de log detectado/mudança: '{novo_arquivo_log_path_potencial}' (anterior: '{self.caminho_log_atual}')")
+            self.listener.log(f"\n>>> Monitorando novo arquivo de log: {novo_arquivo_log_path_potencial}\n")
+
+            # Uma sessão que aparece depois da atual é lida desde o byte 0 (nada escrito antes da detecção se perde)
+            sessao_nova = bool(self.caminho_log_atual)
+            # Parar o acompanhamento anterior, lendo antes o que ainda faltava dele (fecha o handle antigo)
+            await self._cancelar_tail(drenar=True)
+
+            try:
+                # Modo binário: a decodificação (latin-1) fica só para as linhas exibidas
+                novo_fh = open(novo_arquivo_log_path_potencial, 'rb')
+            except FileNotFoundError:
+                logging.error(f"Tab '{self.nome}': Arquivo {novo_arquivo_log_path_potencial} não encontrado ao tentar abrir.")
+                self.caminho_log_atual = None
+                return
+            except Exception as e_open_new:
+                logging.error(
+                    f"Tab '{self.nome}': Erro ao abrir/acompanhar {novo_arquivo_log_path_potencial}: {e_open_new}",
+                    exc_info=True)
+                self.caminho_log_atual = None
+                return
+            aguardando_winner_inicial = self._retomar_checkpoint(novo_arquivo_log_path_potencial, novo_fh, sessao_nova)
+
+            self.caminho_log_atual = novo_arquivo_log_path_potencial
+            self.pasta_log_detectada_atual = subpasta_log_recente  # Atualiza a pasta de log sendo monitorada
+            log_file_display_name = os.path.join(os.path.basename(self.pasta_log_detectada_atual),
+                                                 os.path.basename(self.caminho_log_atual))
+            self.listener.arquivo_log_alterado(log_file_display_name)
+            self.listener.status(f"'{self.nome}': Monitorando: {log_file_display_name}")
+
+            logging.info(f"Tab '{self.nome}': Novo log {self.caminho_log_atual} aberto. Iniciando novo acompanhamento.")
+            self._tail_task = self.reactor.loop.create_task(
+                self.acompanhar_log_do_arquivo(self.caminho_log_atual, novo_fh, aguardando_winner_inicial),
+                name=f"LogTail-{self.nome}-{os.path.basename(self.caminho_log_atual)}")
+            return ha_mais
+
+        elif self.caminho_log_atual and not os.path.exists(self.caminho_log_atual):
+            # O arquivo que estávamos monitorando sumiu
+            logging.warning(f"Tab '{self.nome}': Arquivo de log monitorado {self.caminho_log_atual} não existe mais.")
+            self.listener.log(f"AVISO: Arquivo de log {self.caminho_log_atual} não encontrado. Procurando por novo...\n")
+            await self._cancelar_tail()
+            self.caminho_log_atual = None  # Força a redetecção no próximo ciclo
+
+    def _chave_checkpoint(self):
+        return os.path.normcase(os.path.abspath(self.config.log_folder))
+
+    def _retomar_checkpoint(self, caminho_log, file_handle, sessao_nova=False):
+        """Posiciona o handle no offset salvo se o checkpoint for deste mesmo arquivo.
+
+        Sessões mais novas que a anterior (detectadas agora ou posteriores à do checkpoint)
+        começam do byte 0; sem referência nenhuma, vai para o fim como antes.
+        Retorna o aguardando_winner a restaurar.
+        """
+        checkpoint = self.checkpoints.obter(self._chave_checkpoint())
+        try:
+            st = os.fstat(file_handle.fileno())
+            if checkpoint and checkpoint.get("arquivo") == caminho_log and \
+                    checkpoint.get("identidade") == identidade_arquivo(st) and \
+                    0 <= checkpoint.get("offset", -1) <= st.st_size:
+                file_handle.seek(checkpoint["offset"])
+                aguardando = bool(checkpoint.get("aguardando_winner"))
+                pendente = st.st_size - checkpoint["offset"]
+                logging.info(
+                    f"Tab '{self.nome}': Retomando '{caminho_log}' do checkpoint (byte {checkpoint['offset']}, "
+                    f"{pendente} bytes pendentes, aguardando_winner={aguardando}).")
+                self.listener.log(f">>> Retomando do último ponto lido ({pendente} bytes pendentes).\n")
+                return aguardando
+        except (OSError, TypeError, ValueError) as e_checkpoint:
+            logging.warning(f"Tab '{self.nome}': Checkpoint ignorado para '{caminho_log}': {e_checkpoint}")
+
+        if not sessao_nova and checkpoint and checkpoint.get("arquivo"):
+            # Patch fechado durante um reinício do servidor: a sessão atual é posterior à do checkpoint
+            sessao_checkpoint = os.path.basename(os.path.dirname(str(checkpoint["arquivo"])))
+            sessao_nova = os.path.basename(os.path.dirname(caminho_log)) > sessao_checkpoint
+        if sessao_nova:
+            file_handle.seek(0)
+            logging.info(f"Tab '{self.nome}': Nova sessão de log; lendo '{caminho_log}' desde o início.")
+            return False
+        file_handle.seek(0, os.SEEK_END)  # Ir para o fim do arquivo
+        return False
+
+    def _registrar_checkpoint(self, caminho_log, identidade, offset, forcar_gravacao=False):
+        """Atualiza o checkpoint em memória e agenda a gravação (na hora se aguardando_winner mudou).
+
+        Com uma troca de mapa ainda não gravada neste arquivo, o offset fica no início da linha do vencedor.
+        """
+        self._ultimo_checkpoint = (caminho_log, identidade, offset)
+        retidos = [pendente[1] for pendente in self._trocas_pendentes.values() if pendente and pendente[0] == caminho_log]
+        if retidos:
+            offset = min(offset, min(retidos))
+        ultimo_offset, ultimo_aguardando, ultima_gravacao = self._checkpoint_gravado
+        if offset == ultimo_offset and self.aguardando_winner == ultimo_aguardando and not forcar_gravacao:
+            return
+        self.checkpoints.atualizar(self._chave_checkpoint(), {
+            "arquivo": caminho_log,
+            "identidade": identidade,
+            "offset": offset,
+            "aguardando_winner": self.aguardando_winner,
+        })
+        agora = time.monotonic()
+        if forcar_gravacao:  # Fim do acompanhamento: grava já, o pool pode estar encerrando junto com o reactor
+            self.checkpoints.gravar()
+            self._checkpoint_gravado = (offset, self.aguardando_winner, agora)
+        elif self.aguardando_winner != ultimo_aguardando or agora - ultima_gravacao >= CHECKPOINT_INTERVAL_S:
+            self.reactor.executar_em_background(self.checkpoints.gravar)
+            self._checkpoint_gravado = (offset, self.aguardando_winner, agora)
+        else:
+            self._checkpoint_gravado = (ultimo_offset, ultimo_aguardando, ultima_gravacao)
+
+    def _obter_proxima_subpasta_log(self, pasta_raiz_logs, indice=None, sessao_atual=None):
+        """Próxima subpasta de log a ler dentro da pasta_raiz_logs e se ainda há outras depois dela.
+
+        Sem sessão atual (início do monitoramento), é a mais recente pelo timestamp do nome. Com uma
+        sessão aberta, é a primeira posterior a ela que já tem console.log: as sessões criadas
+        enquanto a atual era lida são abertas uma a uma, em ordem, e nenhuma é pulada. Uma posterior
+        sem console.log só é pulada se houver outra depois dela. Sem posteriores, é a própria atual.
+        """
+        if not pasta_raiz_logs:
+            return None, False
+        if indice is None or indice.pasta_raiz != pasta_raiz_logs:
+            indice = IndiceSessoesLog(pasta_raiz_logs)
+        try:
+            if not sessao_atual or os.path.normpath(os.path.dirname(sessao_atual)) != os.path.normpath(pasta_raiz_logs):
+                return indice.mais_recente(), False
+            posteriores = indice.posteriores(os.path.basename(sessao_atual))
+            for posicao, sessao in enumerate(posteriores):
+                if os.path.exists(os.path.join(sessao, 'console.log')):
+                    return sessao, posicao < len(posteriores) - 1
+            # Nenhuma posterior com console.log ainda: observa a mais nova até ele aparecer
+            return (posteriores[-1] if posteriores else sessao_atual), False
+        except NotADirectoryError:
+            return None, False
+        except FileNotFoundError:  # Se a pasta_raiz_logs sumir entre a verificação e a varredura
+            logging.warning(f"Tab '{self.nome}': Pasta raiz '{pasta_raiz_logs}' não encontrada ao buscar subpastas.")
+            self._limpar_pasta_raiz()
+            return None, False
+        except PermissionError:
+            logging.error(f"Tab '{self.nome}': Permissão negada ao acessar '{pasta_raiz_logs}' para buscar subpastas.")
+            self._limpar_pasta_raiz()
+            return None, False
+        except Exception as e:
+            logging.error(f"Tab '{self.nome}': Erro ao obter subpasta mais recente em '{pasta_raiz_logs}': {e}",
+                          exc_info=True)
+            return None, False
+
+    def _limpar_pasta_raiz(self):
+        """Limpa a configuração da pasta raiz (ela sumiu ou ficou inacessível) e avisa o listener."""
+        self.atualizar_config({"log_folder": ""})  # Mesmo caminho (e lock) das atualizações da GUI
+        self.listener.pasta_raiz_perdida()
+
+    async def acompanhar_log_do_arquivo(self, caminho_log, file_handle, aguardando_winner=False):
+        """Corrotina que acompanha um arquivo de log específico (tail -f). Dona do file_handle."""
+        logging.info(f"Tab '{self.nome}': Iniciando acompanhamento EFETIVO de: {caminho_log}")
+        self.aguardando_winner = aguardando_winner  # Restaurado do checkpoint ao retomar um arquivo
+        vote_pattern_str = self.config.vote_pattern
+        winner_pattern_str = self.config.winner_pattern
+        try:
+            # Compilar os padrões uma vez, em bytes, para casar direto nas linhas lidas
+            matcher = MatcherVotemap(_padrao_para_matcher(vote_pattern_str), _padrao_para_matcher(winner_pattern_str))
+        except re.error as e_re_compile:
+            logging.error(f"Tab '{self.nome}': Erro de RegEx nos padrões para '{caminho_log}': {e_re_compile}",
+                          exc_info=True)
+            self.listener.log(f"ERRO DE REGEX: Verifique os padrões em 'Opções Votemap': {e_re_compile}\n")
+            self.listener.status(f"'{self.nome}': Erro de RegEx! Verifique Configurações.")
+            file_handle.close()
+            return  # Não continuar se os padrões são inválidos
+        self._matcher = matcher
+        self._winner_pattern_str = winner_pattern_str
+
+        logging.debug(
+            f"Tab '{self.nome}': Padrões para '{caminho_log}': FimVoto='{vote_pattern_str}', Vencedor='{winner_pattern_str}' "
+            f"(pré-filtros: {_texto(matcher.literal_voto)!r}, {_texto(matcher.literal_vencedor)!r})")
+
+        leitor = LeitorLinhasBinario(file_handle)
+        metricas = self.metricas
+        identidade = identidade_arquivo(os.fstat(file_handle.fileno()))
+        self._checkpoint_gravado = (None, None, 0.0)
+        # Registrado antes da primeira leitura: uma escrita entre o EOF e a espera não é perdida
+        observador = AsyncFileWaiter(self.reactor, caminho_log)
+        self._observador_log = observador
+        try:
+            while True:
+                if self.paused:  # Se a pausa deste servidor estiver ativa
+                    await asyncio.sleep(0.5)
+                    continue
+
+                offset_anterior = leitor.offset
+                linhas = leitor.ler_linhas()
+                self._bloco_lido = (caminho_log, offset_anterior, linhas)  # Para achar o offset de um vencedor
+                for linha in linhas:
+                    self._processar_linha(linha)
+                metricas.linhas_lidas += len(linhas)
+                metricas.bytes_lidos += leitor.offset - offset_anterior
+                self._registrar_checkpoint(caminho_log, identidade, leitor.offset)
+
+                if leitor.bloco_cheio:
+                    await asyncio.sleep(0)  # Rajada: devolve o loop para os outros servidores antes de continuar
+                elif self._drenar_tail:  # Trocando de sessão e o arquivo antigo já foi lido até o fim
+                    break
+                else:  # Fim do arquivo por enquanto
+                    await observador.aguardar()  # Acorda só quando o console.log crescer
+        except asyncio.CancelledError:
+            raise
+        except Exception as e_tail_loop_inesperado:
+            logging.error(f"Tab '{self.nome}': Erro INESPERADO ao acompanhar log {caminho_log}: {e_tail_loop_inesperado}",
+                          exc_info=True)
+            self.listener.log(f"ERRO GRAVE ao ler log: {e_tail_loop_inesperado}\nVerifique o Log do Sistema do Patch.\n")
+            self.listener.status(f"'{self.nome}': Erro na leitura do log. Ver Log do Sistema.")
+        finally:
+            if self._observador_log is observador:
+                self._observador_log = None
+            observador.close()
+            file_handle.close()
+            # Último ponto lido fica salvo para o próximo start (inclusive ao fechar o patch)
+            self._registrar_checkpoint(caminho_log, identidade, leitor.offset, forcar_gravacao=True)
+            logging.info(
+                f"Tab '{self.nome}': Acompanhamento de '{caminho_log}' encerrado. Estado final aguardando_winner: {self.aguardando_winner}")
+
+    def _processar_linha(self, linha):
+        """Aplica filtro de exibição e a detecção de votação/vencedor em uma linha (bytes) do console.log."""
+        # Aplicar filtro (decodifica só o que vai para a tela)
+        filtro = self.config.filtro
+        if filtro is None or filtro.mostra(linha):
+            self.listener.linha_log(linha.decode(LOG_ENCODING))  # Adiciona a linha original (com \n)
+
+        if logging.root.isEnabledFor(logging.DEBUG):
+            logging.debug("Tab '%s': LIDO: repr=%r, aguardando_winner=%s", self.nome, linha, self.aguardando_winner)
+
+        for regra, captura in self._matcher.verificar(linha):
+            if regra == REGRA_VOTO:
+                self.metricas.casamentos_voto += 1
+                self._fim_de_votacao(linha)
+            else:
+                self.metricas.casamentos_vencedor += 1
+                self._vencedor_encontrado(linha, captura)
+
+    def _fim_de_votacao(self, linha):
+        linha_txt = _texto(linha.strip())
+        if not self.aguardando_winner:
+            logging.info(
+                f"Tab '{self.nome}': FIM DE VOTAÇÃO detectado. Linha: '{linha_txt}'. Set aguardando_winner=True.")
+        else:  # Já estava aguardando, isso pode ser um log repetido ou um problema
+            logging.warning(
+                f"Tab '{self.nome}': FIM DE VOTAÇÃO detectado NOVAMENTE (aguardando_winner já era True). Linha: '{linha_txt}'.")
+        self.aguardando_winner = True
+        self._votacao_seq += 1
+        self._marcar_etapa(ETAPA_FIM_VOTO)
+        self._revalidar_votemap()  # Em background, antes da linha do vencedor chegar
+        self.listener.status(f"'{self.nome}': Fim da votação. Aguardando vencedor...")
+
+    def _vencedor_encontrado(self, linha, indice_str):
+        linha_txt = _texto(linha.strip())
+        winner_pattern_str = self._winner_pattern_str
+        if not self.aguardando_winner:
+            # Encontrou padrão de vencedor, mas não estávamos esperando (ex: log antigo)
+            logging.info(
+                f"Tab '{self.nome}': Padrão de vencedor APARECEU na linha '{linha_txt}', MAS aguardando_winner era FALSO. Ignorando.")
+            return
+        if self._votacao_seq in self._trocas_pendentes:
+            logging.info(f"Tab '{self.nome}': Vencedor repetido na linha '{linha_txt}'; a troca desta votação já está em andamento.")
+            return
+        try:
+            if indice_str is None:  # A regex não tem grupo de captura
+                raise IndexError("no such group")
+            indice_vencedor = int(indice_str)
+            logging.info(
+                f"Tab '{self.nome}': VENCEDOR detectado (aguardando_winner=True). Índice: {indice_vencedor}. Linha: '{linha_txt}'")
+            self._marcar_etapa(ETAPA_VENCEDOR)
+            self.listener.status(f"'{self.nome}': Vencedor índice {indice_vencedor}. Processando...")
+
+            futuro = self._despachar_troca_mapa(indice_vencedor)
+            if futuro is not None:
+                # aguardando_winner e o checkpoint só andam quando o JSON tiver sido gravado (ou a troca falhar):
+                # uma queda antes disso retoma na linha do vencedor e aplica o voto
+                seq = self._votacao_seq
+                self._trocas_pendentes[seq] = self._posicao_da_linha(linha)
+                futuro.add_done_callback(lambda _futuro: self._agendar_troca_concluida(seq))
+                return
+        except IndexError:
+            logging.error(
+                f"Tab '{self.nome}': Padrão de vencedor '{winner_pattern_str}' casou em '{linha_txt}', mas falta grupo de captura (group 1).")
+            self.listener.log(
+                f"ERRO: Padrão de vencedor '{winner_pattern_str}' não tem grupo de captura (verifique Opções Votemap).\n")
+        except (ValueError, TypeError):
+            logging.error(
+                f"Tab '{self.nome}': Padrão vencedor capturou '{_texto(indice_str)}' em '{linha_txt}', que não é um número de índice válido.")
+            self.listener.log(
+                f"ERRO: Vencedor capturado '{_texto(indice_str)}' não é um número (verifique Opções Votemap e logs).\n")
+        except Exception as e_proc_winner_inesperado:
+            logging.error(f"Tab '{self.nome}': Erro inesperado ao processar vencedor: {e_proc_winner_inesperado}",
+                          exc_info=True)
+        self.aguardando_winner = False  # Resetar após erro, para evitar loops
+
+    def _posicao_da_linha(self, linha):
+        """(caminho_log, offset do início de ``linha``) no bloco em processamento; só calculado para vencedores."""
+        caminho_log, offset, linhas = self._bloco_lido
+        for outra in linhas:
+            if outra is linha:
+                return caminho_log, offset
+            offset += len(outra)
+        return caminho_log, self._bloco_lido[1]  # Linha fora do bloco (não acontece no tail): retém o bloco todo
+
+    def _agendar_troca_concluida(self, seq):
+        try:
+            self.reactor.call_soon(self._troca_concluida, seq)
+        except RuntimeError:  # Reactor já encerrado: o checkpoint em disco continua na linha do vencedor
+            pass
+
+    def _troca_concluida(self, seq):
+        """Na thread do reactor, quando a troca da votação ``seq`` terminou: libera o checkpoint."""
+        self._trocas_pendentes.pop(seq, None)
+        if seq == self._votacao_seq:  # Nenhuma votação nova começou enquanto a troca rodava
+            self.aguardando_winner = False
+        if self._ultimo_checkpoint:
+            self._registrar_checkpoint(*self._ultimo_checkpoint)
+
+    def _despachar_troca_mapa(self, indice_vencedor):
+        """Executa a troca de mapa na fila própria deste servidor: não depende da GUI (nem do loop do reactor)
+        estar livre, e dois vencedores seguidos são gravados na ordem em que apareceram no log.
+        Devolve o Future da troca, ou None se o motor já foi encerrado."""
+        try:
+            return self._enfileirar_troca(self.processar_troca_mapa_logica, indice_vencedor)
+        except RuntimeError:  # Aba fechada ou pool encerrado
+            logging.warning(f"Tab '{self.nome}': Vencedor {indice_vencedor} ignorado; motor já encerrado.")
+            return None
+
+    def _enfileirar_troca(self, func, *args):
+        """Enfileira func(*args) na fila serial deste servidor e devolve um concurrent.futures.Future.
+
+        Um único worker do pool compartilhado drena a fila por vez, então as trocas de um servidor
+        nunca se sobrepõem nem terminam fora de ordem, sem thread dedicada por servidor.
+        Levanta RuntimeError se o motor (ou o pool) já foi encerrado.
+        """
+        if self._encerrado:
+            raise RuntimeError("motor encerrado")
+        futuro = concurrent.futures.Future()
+        with self._fila_troca_lock:
+            self._fila_troca.append((func, args, futuro))
+            if self._fila_troca_ativa:
+                return futuro
+            self._fila_troca_ativa = True
+        try:
+            self.reactor.executar_em_background(self._drenar_fila_troca)
+        except RuntimeError:
+            with self._fila_troca_lock:
+                self._fila_troca_ativa = False
+                pendentes = list(self._fila_troca)
+                self._fila_troca.clear()
+            for _, _, pendente in pendentes:
+                if pendente is not futuro:
+                    pendente.set_exception(RuntimeError("pool do reactor encerrado"))
+            raise
+        return futuro
+
+    def _drenar_fila_troca(self):
+        while True:
+            with self._fila_troca_lock:
+                if not self._fila_troca:
+                    self._fila_troca_ativa = False
+                    return
+                func, args, futuro = self._fila_troca.popleft()
+            if not futuro.set_running_or_notify_cancel():
+                continue
+            try:
+                futuro.set_result(func(*args))
+            except BaseException as e_troca:
+                futuro.set_exception(e_troca)
+
+    def _marcar_etapa(self, etapa):
+        """Marca uma etapa da troca de mapa em andamento e avisa o listener se alguma duração mudou."""
+        if self.latencias.marcar(etapa) is not None:
+            self.listener.latencias_atualizadas(self.latencias.instantaneo())
+
+    def _concluir_troca(self):
+        """Fecha a medição da troca de mapa atual (com ou sem reinício, com ou sem erro)."""
+        etapas = self.latencias.concluir()
+        if etapas:
+            logging.info(f"Tab '{self.nome}': Etapas da troca de mapa: " + ", ".join(
+                f"{NOMES_ETAPAS.get(etapa, etapa)} +{ms:.1f} ms" for etapa, ms in etapas))
+            self.listener.latencias_atualizadas(self.latencias.instantaneo())
+
+    def processar_troca_mapa_logica(self, indice_vencedor):
+        """Lógica para processar a troca de mapa para o índice vencedor."""
+        self._marcar_etapa(ETAPA_TROCA_INICIO)
+        self.metricas.votos_processados += 1
+        scenario_reiniciar = None
+        try:
+            scenario_reiniciar = self._aplicar_troca_mapa(indice_vencedor)
+        finally:
+            self._marcar_etapa(ETAPA_TROCA_FIM)
+            if not scenario_reiniciar:
+                self._concluir_troca()
+        if scenario_reiniciar:
+            # O reinício roda como corrotina no reactor: os delays não ocupam nenhuma thread
+            self.reactor.submit(self.reiniciar_servidor(scenario_reiniciar))
+
+    def _aplicar_troca_mapa(self, indice_vencedor):
+        """Grava o scenarioId vencedor no JSON do servidor. Devolve o scenarioId se o servidor deve ser reiniciado."""
+        logging.info(f"Tab '{self.nome}': Processando troca de mapa para o índice: {indice_vencedor}")
+        config = self.config
+        arquivo_json_val = config.server_json
+        arquivo_json_votemap_val = config.votemap_json
+
+        if not arquivo_json_val or not arquivo_json_votemap_val:
+            msg = f"Arquivos JSON de servidor ({arquivo_json_val}) ou votemap ({arquivo_json_votemap_val}) não configurados para '{self.nome}'."
+            self.listener.log(f"ERRO: {msg}\n")
+            logging.error(msg)
+            self.listener.status(f"'{self.nome}': Erro - JSONs não configurados.")
+            return
+
+        try:
+            map_list = self.cache_votemap.lista(arquivo_json_votemap_val)
+        except FileNotFoundError:
+            msg = f"Arquivo votemap.json ('{arquivo_json_votemap_val}') não encontrado para '{self.nome}'."
+            self.listener.log(f"ERRO: {msg}\n")
+            logging.error(msg)
+            self.listener.status(f"'{self.nome}': Erro - votemap.json não encontrado.")
+            return
+        except json.JSONDecodeError as e_json_vm:
+            msg = f"Erro ao decodificar votemap.json ('{arquivo_json_votemap_val}') para '{self.nome}': {e_json_vm}"
+            self.listener.log(f"ERRO: {msg}\n")
+            logging.error(msg)
+            self.listener.status(f"'{self.nome}': Erro - votemap.json inválido.")
+            return
+
+        if not map_list:
+            msg = f"Lista de mapas ('list') vazia ou não encontrada no votemap.json ('{arquivo_json_votemap_val}') para '{self.nome}'."
+            self.listener.log(f"AVISO: {msg}\n")
+            logging.warning(msg)
+            self.listener.status(f"'{self.nome}': Aviso - Lista de mapas vazia.")
+            return
+
+        novo_scenario_id = None
+        nome_mapa_log = "N/A"
+        # O índice 0 no log do Arma geralmente significa "Random" ou a primeira opção da lista que pode ser "Random"
+        if indice_vencedor == 0:  # Assumindo que o primeiro item (índice 0 da lista de mapas) é o "random" ou um placeholder.
+            if len(map_list) > 1:  # Precisa de pelo menos mais uma opção além do "random"
+                # Escolhe um mapa aleatório da lista, EXCLUINDO o primeiro item (índice 0)
+                indice_selecionado_random_na_lista = random.randint(1, len(map_list) - 1)
+                novo_scenario_id = map_list[indice_selecionado_random_na_lista]
+                nome_mapa_log = os.path.basename(str(novo_scenario_id)).replace(".ArmaReforgerLink", "")
+                self.listener.log(
+                    f"VOTO ALEATÓRIO: Selecionado mapa '{nome_mapa_log}' (índice real na lista: {indice_selecionado_random_na_lista}).\n")
+                logging.info(
+                    f"Tab '{self.nome}': Seleção aleatória: {novo_scenario_id} (índice da lista {indice_selecionado_random_na_lista})")
+            else:
+                msg = f"Voto aleatório (índice 0), mas não há mapas suficientes na lista de votemap.json (apenas {len(map_list)} item(ns)) para '{self.nome}'."
+                self.listener.log(f"AVISO: {msg}\n")
+                logging.warning(msg)
+                self.listener.status(f"'{self.nome}': Aviso - Poucos mapas para aleatório.")
+                return
+        elif 0 < indice_vencedor < len(map_list):  # Voto direto para um mapa da lista (excluindo o primeiro se for random)
+            novo_scenario_id = map_list[indice_vencedor]
+            nome_mapa_log = os.path.basename(str(novo_scenario_id)).replace(".ArmaReforgerLink", "")
+            self.listener.log(f"MAPA VENCEDOR: '{nome_mapa_log}' (índice {indice_vencedor} da lista de votemap.json).\n")
+            logging.info(f"Tab '{self.nome}': Mapa vencedor selecionado: {novo_scenario_id}")
+        else:  # Índice inválido
+            msg = f"Índice do mapa vencedor ({indice_vencedor}) inválido para a lista de mapas (tamanho {len(map_list)}) em votemap.json para '{self.nome}'."
+            self.listener.log(f"ERRO: {msg}\n")
+            logging.error(msg)
+            self.listener.status(f"'{self.nome}': Erro - Índice de mapa inválido.")
+            return
+
+        if not novo_scenario_id:
+            msg = f"Não foi possível determinar o novo scenarioId para o índice {indice_vencedor} para '{self.nome}'."
+            self.listener.log(f"ERRO: {msg}\n")
+            logging.error(msg)
+            return
+
+        # Atualizar o JSON de configuração do servidor
+        try:
+            # Variante já serializada em background (game.scenarioId; 'game' é criado se não existir)
+            server_data = self._gravar_scenario_id(arquivo_json_val, novo_scenario_id, map_list)
+            self._marcar_etapa(ETAPA_JSON_GRAVADO)
+            self.metricas.votos_aplicados += 1
+
+            self.listener.json_servidor_atualizado(server_data)
+            self.listener.log(
+                f"JSON do servidor '{os.path.basename(arquivo_json_val)}' atualizado para o mapa: {nome_mapa_log}\n")
+            logging.info(f"Tab '{self.nome}': JSON do servidor atualizado com scenarioId: {novo_scenario_id}")
+
+            # Reiniciar o servidor se auto_restart estiver habilitado e nome_servico configurado
+            if config.auto_restart and config.service_name:
+                self.listener.log("Iniciando reinício automático do servidor...\n")
+                return novo_scenario_id
+            else:
+                msg_status = f"'{self.nome}': Mapa alterado para {nome_mapa_log}. Reinício manual."
+                if not config.service_name and config.auto_restart:
+                    msg_status += " (Serviço não config.)"
+                self.listener.status(msg_status)
+                logging.info(f"Tab '{self.nome}': Reinício automático desabilitado ou serviço não configurado.")
+
+        except FileNotFoundError:
+            msg = f"Arquivo de config. do servidor ('{arquivo_json_val}') não encontrado para '{self.nome}' ao tentar atualizar."
+            self.listener.log(f"ERRO: {msg}\n")
+            logging.error(msg)
+            self.listener.status(f"'{self.nome}': Erro - server.json não encontrado.")
+        except (KeyError, TypeError) as e_json_key:
+            msg = f"Estrutura do JSON do servidor ('{arquivo_json_val}') inválida para '{self.nome}' (game -> scenarioId não encontrado ou tipo errado): {e_json_key}"
+            self.listener.log(f"ERRO: {msg}\n")
+            logging.error(msg)
+            self.listener.status(f"'{self.nome}': Erro - Estrutura server.json inválida.")
+        except json.JSONDecodeError as e_json_srv:
+            msg = f"Erro ao decodificar JSON do servidor ('{arquivo_json_val}') para '{self.nome}': {e_json_srv}"
+            self.listener.log(f"ERRO: {msg}\n")
+            logging.error(msg)
+            self.listener.status(f"'{self.nome}': Erro - server.json inválido.")
+        except Exception as e_proc_mapa_inesperado:
+            msg = f"Erro inesperado ao processar troca de mapa para '{self.nome}': {e_proc_mapa_inesperado}"
+            self.listener.log(f"ERRO: {msg}\n")
+            logging.error(msg, exc_info=True)
+            self.listener.status(f"'{self.nome}': Erro inesperado na troca de mapa.")
+
+    async def reiniciar_servidor(self, scenario_id_que_causou_restart):
+        """Corrotina que reinicia o serviço do Windows."""
+        sucesso = False
+        try:
+            sucesso = await self._reiniciar_servidor(scenario_id_que_causou_restart)
+        finally:
+            if sucesso:
+                self.metricas.reinicios_sucesso += 1
+            else:
+                self.metricas.reinicios_falha += 1
+            self._concluir_troca()
+
+    async def _reiniciar_servidor(self, scenario_id_que_causou_restart):
+        if not PYWIN32_AVAILABLE:  # Dupla checagem
+            self.listener.mensagem("error", f"'{self.nome}': Funcionalidade Indisponível",
+                                   "pywin32 é necessário para reiniciar serviços.")
+            return False
+
+        nome_servico_reiniciar = self.config.service_name
+        if not nome_servico_reiniciar:
+            self.listener.log("ERRO: Nome do serviço não configurado para reinício automático.\n")
+            logging.error(f"Tab '{self.nome}': Tentativa de reiniciar servidor sem nome de serviço.")
+            self.listener.status(f"'{self.nome}': Erro - Serviço não configurado para reinício.")
+            return False
+
+        logging.info(
+            f"Tab '{self.nome}': Iniciando processo de reinício do serviço '{nome_servico_reiniciar}' em background.")
+        self.listener.status(f"'{self.nome}': Reiniciando {nome_servico_reiniciar}...")
+
+        # Chamar a lógica de reinício que contém os comandos 'sc' e delays
+        success = await self._executar_logica_reinicio_servico(nome_servico_reiniciar, scenario_id_que_causou_restart)
+
+        # Após a tentativa de reinício, notificar e atualizar status
+        if success:
+            self.listener.mensagem("info", f"'{self.nome}': Servidor Reiniciado",
+                                   f"O serviço {nome_servico_reiniciar} foi reiniciado com sucesso.")
+        else:
+            self.listener.mensagem("error", f"'{self.nome}': Falha no Reinício",
+                                   f"Ocorreu um erro ao reiniciar o serviço {nome_servico_reiniciar}.\nVerifique os logs.")
+        self.listener.servico_alterado()  # Atualiza o status do serviço após a tentativa
+        return bool(success)
+
+    async def _executar_logica_reinicio_servico(self, nome_servico_a_gerenciar, scenario_id_anterior):
+        """Contém a lógica real de parada e início do serviço usando 'sc'."""
+        config = self.config
+        stop_delay_s = config.stop_delay
+        start_delay_s = config.start_delay
+        default_votemap_mission_id = config.default_mission
+        arquivo_json_servidor_path = config.server_json
+
+        startupinfo = None
+        if platform.system() == "Windows":
+            startupinfo = subprocess.STARTUPINFO()
+            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+            startupinfo.wShowWindow = subprocess.SW_HIDE
+
+        try:
+            # --- Parar o Serviço ---
+            self.listener.status(f"'{self.nome}': Parando serviço {nome_servico_a_gerenciar}...")
+            self.listener.log(f"Parando serviço '{nome_servico_a_gerenciar}'...\n")
+            logging.info(f"Tab '{self.nome}': Tentando parar o serviço: {nome_servico_a_gerenciar}")
+
+            status_atual = await self.reactor.em_background(self.verificar_status_servico, nome_servico_a_gerenciar)
+            if status_atual == "RUNNING" or status_atual == "START_PENDING":  # Se estiver rodando ou iniciando
+                self._marcar_etapa(ETAPA_SC_STOP)
+                await self.reactor.em_background(subprocess.run, ["sc", "stop", nome_servico_a_gerenciar],
+                                                 check=True, shell=False, startupinfo=startupinfo)
+                self.listener.log(f"Comando de parada enviado. Aguardando {stop_delay_s}s...\n")
+                await asyncio.sleep(stop_delay_s)  # Esperar o serviço parar
+                status_apos_parada = await self.reactor.em_background(self.verificar_status_servico, nome_servico_a_gerenciar)
+                if status_apos_parada != "STOPPED":
+                    logging.warning(
+                        f"Tab '{self.nome}': Serviço {nome_servico_a_gerenciar} não parou como esperado. Status: {status_apos_parada}")
+                    self.listener.log(
+                        f"AVISO: Serviço '{nome_servico_a_gerenciar}' pode não ter parado. Status: {status_apos_parada}\n")
+                else:
+                    self._marcar_etapa(ETAPA_PARADO)
+                    logging.info(f"Tab '{self.nome}': Serviço {nome_servico_a_gerenciar} parado com sucesso.")
+            elif status_atual == "STOPPED":
+                self.listener.log(f"Serviço '{nome_servico_a_gerenciar}' já estava parado.\n")
+                logging.info(f"Tab '{self.nome}': Serviço {nome_servico_a_gerenciar} já estava parado.")
+            elif status_atual == "NOT_FOUND":
+                self.listener.log(f"ERRO: Serviço '{nome_servico_a_gerenciar}' não encontrado para parada.\n")
+                logging.error(f"Tab '{self.nome}': Serviço {nome_servico_a_gerenciar} não encontrado para parada.")
+                self.listener.status(f"'{self.nome}': Erro - Serviço '{nome_servico_a_gerenciar}' não existe.")
+                return False  # Falha crítica
+            else:  # Erro ou estado desconhecido
+                self.listener.log(
+                    f"ERRO: Não foi possível determinar estado do serviço '{nome_servico_a_gerenciar}' ou estado inesperado: {status_atual}.\n")
+                logging.error(
+                    f"Tab '{self.nome}': Estado do serviço {nome_servico_a_gerenciar} desconhecido ou erro: {status_atual}")
+                self.listener.status(f"'{self.nome}': Erro - Estado de '{nome_servico_a_gerenciar}' desconhecido.")
+                return False  # Falha
+
+            # --- Iniciar o Serviço ---
+            self.listener.status(f"'{self.nome}': Iniciando serviço {nome_servico_a_gerenciar}...")
+            self.listener.log(f"Iniciando serviço '{nome_servico_a_gerenciar}'...\n")
+            logging.info(f"Tab '{self.nome}': Tentando iniciar o serviço: {nome_servico_a_gerenciar}")
+            self._marcar_etapa(ETAPA_SC_START)
+            await self.reactor.em_background(subprocess.run, ["sc", "start", nome_servico_a_gerenciar],
+                                             check=True, shell=False, startupinfo=startupinfo)
+            self.listener.log(f"Comando de início enviado. Aguardando {start_delay_s}s para estabilizar...\n")
+            self.listener.status(f"'{self.nome}': Aguardando {nome_servico_a_gerenciar} iniciar ({start_delay_s}s)...")
+            await asyncio.sleep(start_delay_s)  # Esperar o servidor iniciar
+
+            status_apos_inicio = await self.reactor.em_background(self.verificar_status_servico, nome_servico_a_gerenciar)
+            if status_apos_inicio != "RUNNING":
+                logging.error(
+                    f"Tab '{self.nome}': Serviço {nome_servico_a_gerenciar} falhou ao iniciar. Status: {status_apos_inicio}")
+                self.listener.log(
+                    f"ERRO: Serviço '{nome_servico_a_gerenciar}' falhou ao iniciar ou demorando. Status: {status_apos_inicio}\n")
+                self.listener.status(
+                    f"'{self.nome}': Erro - {nome_servico_a_gerenciar} não iniciou. Status: {status_apos_inicio}")
+                return False  # Falha
+
+            self._marcar_etapa(ETAPA_RODANDO)
+            logging.info(f"Tab '{self.nome}': Serviço {nome_servico_a_gerenciar} iniciado com sucesso.")
+            self.listener.servico_alterado()
+
+            # --- Restaurar JSON do Servidor para o Mapa de Votação Padrão ---
+            self.listener.log("Restaurando JSON do servidor para o mapa de votação padrão...\n")
+            if not default_votemap_mission_id:
+                self.listener.log(
+                    "AVISO: Missão padrão de votemap não definida. O servidor pode não iniciar a votação.\n")
+                logging.warning(f"Tab '{self.nome}': Missão padrão de votemap não definida em Opções.")
+            elif not arquivo_json_servidor_path or not os.path.exists(arquivo_json_servidor_path):
+                msg = f"Arquivo JSON do servidor ({arquivo_json_servidor_path}) não encontrado para restaurar votemap para '{self.nome}'."
+                self.listener.log(f"ERRO: {msg}\n")
+                logging.error(msg)
+                self.listener.status(f"'{self.nome}': Erro - server.json não encontrado para reset.")
+                return False  # Considerar falha se não puder resetar o mapa
+            elif self._encerrado:
+                logging.warning(f"Tab '{self.nome}': Motor encerrado; JSON do servidor não restaurado para o votemap.")
+                return False
+            else:  # Tentar restaurar
+                try:
+                    futuro_reset = self._enfileirar_troca(
+                        self._gravar_scenario_id, arquivo_json_servidor_path, default_votemap_mission_id)
+                except RuntimeError:  # Motor/pool encerrado entre a checagem e o envio
+                    logging.warning(
+                        f"Tab '{self.nome}': Motor encerrado; JSON do servidor não restaurado para o votemap.")
+                    return False
+                server_data_reset = await asyncio.wrap_future(futuro_reset)
+                self._marcar_etapa(ETAPA_JSON_PADRAO)
+
+                self.listener.json_servidor_atualizado(server_data_reset)
+                self.listener.log(
+                    f"JSON do servidor restaurado para votemap: {os.path.basename(default_votemap_mission_id)}\n")
+                logging.info(
+                    f"Tab '{self.nome}': JSON do servidor restaurado para scenarioId de votemap: {default_votemap_mission_id}")
+
+            nome_mapa_anterior_log = os.path.basename(str(scenario_id_anterior)).replace(".ArmaReforgerLink", "")
+            self.listener.status(
+                f"'{self.nome}': Servidor reiniciado. Mapa anterior: {nome_mapa_anterior_log}. Próximo: Votação.")
+            return True  # Sucesso no reinício
+
+        except subprocess.CalledProcessError as e_sc:
+            # Tentar decodificar a saída de erro do 'sc'
+            err_output = "Nenhuma saída de erro detalhada."
+            if e_sc.stderr:
+                try:
+                    err_output = e_sc.stderr.decode('latin-1', errors='replace')
+                except:
+                    pass  # Se falhar, mantém a msg padrão
+            elif e_sc.stdout:
+                try:
+                    err_output = e_sc.stdout.decode('latin-1', errors='replace')
+                except:
+                    pass
+
+            err_msg = f"Erro ao executar comando 'sc' para '{nome_servico_a_gerenciar}': {err_output.strip()}"
+            self.listener.log(f"ERRO: {err_msg}\n")
+            logging.error(err_msg, exc_info=True)
+            self.listener.status(f"'{self.nome}': Erro ao gerenciar serviço: {e_sc.cmd}")
+            self.listener.servico_alterado()  # Atualiza status mesmo em erro
+            return False
+        except FileNotFoundError:  # sc.exe não encontrado
+            self.listener.mensagem("error", f"'{self.nome}': Erro de Comando",
+                                   "Comando 'sc.exe' não encontrado. Verifique o PATH do sistema.")
+            logging.error(f"Tab '{self.nome}': Comando 'sc.exe' não encontrado.")
+            self.listener.status(f"'{self.nome}': Erro - sc.exe não encontrado.")
+            self.listener.servico_alterado()
+            return False
+        except (json.JSONDecodeError, KeyError, TypeError) as e_json_reset:
+            err_msg = f"Erro ao manipular JSON do servidor durante o reinício para '{self.nome}': {e_json_reset}"
+            self.listener.log(f"ERRO: {err_msg}\n")
+            logging.error(err_msg, exc_info=True)
+            self.listener.status(f"'{self.nome}': Erro - Falha ao atualizar JSON do servidor.")
+            return False
+        except Exception as e_reinicio_inesperado:
+            err_msg = f"Erro inesperado ao reiniciar o servidor '{self.nome}': {e_reinicio_inesperado}"
+            self.listener.log(f"ERRO: {err_msg}\n")
+            logging.error(err_msg, exc_info=True)
+            self.listener.status(f"'{self.nome}': Erro inesperado no reinício do servidor.")
+            self.listener.servico_alterado()
+            return False
+
+    def verificar_status_servico(self, nome_servico_local):
+        """Verifica o status de um serviço do Windows usando 'sc query'."""
+        if not PYWIN32_AVAILABLE: return "ERROR"  # Deveria ser checado antes, mas por segurança
+        if not nome_servico_local: return "NOT_FOUND"
+        try:
+            startupinfo = None
+            if platform.system() == "Windows":
+                startupinfo = subprocess.STARTUPINFO()
+                startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+                startupinfo.wShowWindow = subprocess.SW_HIDE
+
+            # Tentar com 'latin-1' para decodificar a saída do 'sc', comum em PT-BR Windows
+            # Se falhar, tentar com 'utf-8' como fallback.
+            encodings_to_try = ['latin-1', 'utf-8', 'cp850', 'cp1252']
+            output_text = None
+            for enc in encodings_to_try:
+                try:
+                    result = subprocess.run(
+                        ['sc', 'query', nome_servico_local],
+                        capture_output=True, text=False,  # text=False para decodificar manualmente
+                        check=False,  # Não levantar exceção para códigos de saída != 0
+                        startupinfo=startupinfo
+                    )
+                    # Tentar decodificar stdout e stderr
+                    stdout_decoded = result.stdout.decode(enc, errors='replace')
+                    stderr_decoded = result.stderr.decode(enc, errors='replace')
+                    output_text = stdout_decoded + stderr_decoded
+                    break  # Sucesso na decodificação
+                except UnicodeDecodeError:
+                    logging.warning(
+                        f"Tab '{self.nome}': Falha ao decodificar saída 'sc query' com {enc} para '{nome_servico_local}'. Tentando próximo.")
+                except Exception as e_run:  # Outros erros do subprocess
+                    logging.error(
+                        f"Tab '{self.nome}': Erro ao executar 'sc query' para '{nome_servico_local}': {e_run}",
+                        exc_info=True)
+                    return "ERROR"
+
+            if output_text is None:  # Se todas as tentativas de decodificação falharem
+                logging.error(
+                    f"Tab '{self.nome}': Não foi possível decodificar a saída de 'sc query' para '{nome_servico_local}'.")
+                return "ERROR"
+
+            output_lower = output_text.lower()
+
+            # Erros comuns para serviço não encontrado (incluindo PT-BR)
+            service_not_found_errors = [
+                "failed 1060", "falha 1060", "o servi‡o especificado nÆo existe como servi‡o instalado",
+                "specified service does not exist as an installed service"
+            ]
+            if any(err_str in output_lower for err_str in service_not_found_errors):
+                logging.warning(
+                    f"Tab '{self.nome}': Serviço '{nome_servico_local}' não encontrado via 'sc query'. Output: {output_text[:200]}")
+                return "NOT_FOUND"
+
+            if "state" not in output_lower:  # Se a palavra "STATE" não estiver na saída
+                logging.warning(
+                    f"Tab '{self.nome}': Saída inesperada de 'sc query {nome_servico_local}', sem 'STATE': {output_text[:200]}")
+                return "ERROR"  # Ou UNKNOWN se preferir
+
+            # Mapeamento de estados (incluindo PT-BR comuns)
+            if "running" in output_lower or "em execu‡Æo" in output_lower: return "RUNNING"
+            if "stopped" in output_lower or "parado" in output_lower: return "STOPPED"
+            if "start_pending" in output_lower or "pendente deinÝcio" in output_lower: return "START_PENDING"  # "início" com acento pode variar
+            if "stop_pending" in output_lower or "pendente deparada" in output_lower: return "STOP_PENDING"  # "parada" com acento pode variar
+
+            logging.info(
+                f"Tab '{self.nome}': Status desconhecido para '{nome_servico_local}' com saída: {output_text[:200]}")
+            return "UNKNOWN"
+
+        except FileNotFoundError:  # sc.exe não encontrado
+            logging.error(f"Tab '{self.nome}': 'sc.exe' não encontrado. Verifique se o System32 está no PATH.",
+                          exc_info=True)
+            return "ERROR"
+        except Exception as e:
+            logging.error(f"Tab '{self.nome}': Erro ao verificar status do serviço '{nome_servico_local}': {e}",
+                          exc_info=True)
+            return "ERROR"
+
+
+# ############################################################################
+# # Métricas - endpoint OpenMetrics/Prometheus local, opcional
+# ############################################################################
+def parar_engines(engines, timeout=2.0):
+    """Fechamento: pede a parada de todos os motores e espera por todos com um único prazo,
+    em vez de somar um timeout por servidor."""
+    futuros = {}
+    for engine in engines:
+        engine.parar_observacao_json()
+        futuro = engine.solicitar_parada(from_tab_closure=True)
+        if futuro is not None:
+            futuros[futuro] = engine
+    _, pendentes = concurrent.futures.wait(futuros, timeout=timeout) if futuros else ((), ())
+    for futuro, engine in futuros.items():
+        if futuro in pendentes:
+            logging.warning(f"Tab '{engine.nome}': Monitoramento não finalizou no tempo esperado.")
+
+
+def memoria_residente_bytes():
+    """RSS do processo, ou None se a plataforma não permitir medir."""
+    try:
+        if sys.platform.startswith("linux"):
+            with open("/proc/self/statm", 'rb') as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        if sys.platform == "win32":
+            class _ContadoresMemoria(ctypes.Structure):
+                _fields_ = [("cb", ctypes.c_ulong), ("PageFaultCount", ctypes.c_ulong),
+                            ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                            ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+            contadores = _ContadoresMemoria()
+            contadores.cb = ctypes.sizeof(contadores)
+            processo = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(processo, ctypes.byref(contadores), contadores.cb):
+                return contadores.WorkingSetSize
+    except (OSError, ValueError, AttributeError, NameError):
+        pass
+    return None
+
+
+def _rotulos(**rotulos):
+    def escapar(valor):
+        return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    return "{" + ",".join(f'{chave}="{escapar(valor)}"' for chave, valor in rotulos.items()) + "}"
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class ServidorMetricas:
+    """Expõe contadores e histogramas do motor em http://127.0.0.1:<porta>/metrics.
+
+    Roda em uma thread própria; cada coleta só lê os contadores dos motores (sem lock
+    no caminho do tail). Fala OpenMetrics quando o coletor pede
+    (Accept: application/openmetrics-text) e o formato texto 0.0.4 do Prometheus nos demais casos.
+    ``gauges`` e ``contadores`` mapeiam nome -> (ajuda, função sem argumentos); a função pode
+    devolver None para omitir. Contadores são expostos com o sufixo _total.
+    """
+
+    def __init__(self, porta, fonte_engines, gauges=None, contadores=None, host=METRICAS_HOST):
+        self.porta = porta
+        self.host = host
+        self.fonte_engines = fonte_engines
+        self.gauges = dict(gauges or {})
+        self.contadores = dict(contadores or {})
+        self._http = None
+        self._thread = None
+
+    def start(self):
+        """Abre a porta e começa a servir. Devolve False (e só registra o erro) se não for possível."""
+        metricas = self
+
+        class _Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+                try:
+                    corpo = metricas.renderizar(openmetrics).encode('utf-8')
+                except Exception as e_render:
+                    logging.error(f"Métricas: erro ao gerar a coleta: {e_render}", exc_info=True)
+                    self.send_error(500)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/openmetrics-text; version=1.0.0; charset=utf-8"
+                                 if openmetrics else "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, formato, *args):
+                logging.debug(f"Métricas: {self.address_string()} {formato % args}")
+
+        try:
+            self._http = http.server.HTTPServer((self.host, self.porta), _Handler)
+        except OSError as e_porta:
+            logging.error(f"Métricas: não foi possível abrir {self.host}:{self.porta}: {e_porta}")
+            self._http = None
+            return False
+        self._thread = threading.Thread(target=self._http.serve_forever, name="Metricas", daemon=True)
+        self._thread.start()
+        logging.info(f"Métricas: servindo em http://{self.host}:{self._http.server_address[1]}/metrics")
+        return True
+
+    def stop(self):
+        if self._http:
+            self._http.shutdown()
+            self._http.server_close()
+            self._http = None
+        if self._thread:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    @property
+    def porta_efetiva(self):
+        return self._http.server_address[1] if self._http else None
+
+    def renderizar(self, openmetrics=True):
+        linhas = []
+
+        def familia(nome, tipo, ajuda, amostras, sufixo=""):
+            # No OpenMetrics o TYPE de um contador vai sem o sufixo _total; no formato 0.0.4, com ele
+            nome_tipo = nome if openmetrics or tipo != "counter" else nome + sufixo
+            linhas.append(f"# HELP {nome_tipo} {ajuda}")
+            linhas.append(f"# TYPE {nome_tipo} {tipo}")
+            linhas.extend(amostras)
+
+        engines = list(self.fonte_engines())
+        # (nome, ajuda, [(rótulos extras, valor a partir de MetricasServidor)])
+        contadores = (
+            ("votemap_log_lines_read", "Linhas lidas do console.log.", [({}, lambda m: m.linhas_lidas)]),
+            ("votemap_log_bytes_read", "Bytes lidos do console.log.", [({}, lambda m: m.bytes_lidos)]),
+            ("votemap_pattern_matches", "Linhas que casaram com os padrões de votação.",
+             [({"regra": REGRA_VOTO}, lambda m: m.casamentos_voto),
+              ({"regra": REGRA_VENCEDOR}, lambda m: m.casamentos_vencedor)]),
+            ("votemap_votes_processed", "Vencedores processados, por resultado da gravação do JSON.",
+             [({"resultado": "ok"}, lambda m: m.votos_aplicados),
+              ({"resultado": "erro"}, lambda m: max(0, m.votos_processados - m.votos_aplicados))]),
+            ("votemap_restarts", "Reinícios automáticos do serviço, por resultado.",
+             [({"resultado": "sucesso"}, lambda m: m.reinicios_sucesso),
+              ({"resultado": "falha"}, lambda m: m.reinicios_falha)]),
+        )
+        for nome, ajuda, series in contadores:
+            amostras = [f"{nome}_total{_rotulos(servidor=engine.nome, **extra)} {valor(engine.metricas)}"
+                        for engine in engines for extra, valor in series]
+            familia(nome, "counter", ajuda, amostras, sufixo="_total")
+
+        amostras = []
+        for engine in engines:
+            for de, para, limites_ms, contagens, total, soma_ms in engine.latencias.histogramas():
+                rotulos = {"servidor": engine.nome, "de": de, "para": para}
+                acumulado = 0
+                for limite_ms, contagem in zip(limites_ms, contagens):
+                    acumulado += contagem
+                    amostras.append(f"votemap_stage_latency_seconds_bucket"
+                                    f"{_rotulos(**rotulos, le=_numero(limite_ms / 1000))} {acumulado}")
+                amostras.append(f"votemap_stage_latency_seconds_bucket{_rotulos(**rotulos, le='+Inf')} {total}")
+                amostras.append(f"votemap_stage_latency_seconds_count{_rotulos(**rotulos)} {total}")
+                amostras.append(f"votemap_stage_latency_seconds_sum{_rotulos(**rotulos)} {_numero(soma_ms / 1000)}")
+        familia("votemap_stage_latency_seconds", "histogram",
+                "Duração de cada etapa da troca de mapa (de -> para); de=para=total é a troca inteira.", amostras)
+
+        gauges = dict(self.gauges)
+        gauges.setdefault("votemap_threads", ("Threads ativas no processo.", threading.active_count))
+        gauges.setdefault("process_resident_memory_bytes", ("Memória residente do processo.", memoria_residente_bytes))
+        for tipo, sufixo, funcoes in (("counter", "_total", self.contadores), ("gauge", "", gauges)):
+            for nome, (ajuda, funcao) in funcoes.items():
+                try:
+                    valor = funcao()
+                except Exception as e_funcao:
+                    logging.debug(f"Métricas: '{nome}' falhou: {e_funcao}")
+                    valor = None
+                if valor is not None:
+                    familia(nome, tipo, ajuda, [f"{nome}{sufixo} {_numero(valor)}"], sufixo=sufixo)
+
+        if openmetrics:
+            linhas.append("# EOF")
+        return "\n".join(linhas) + "\n"
+
+
+# ############################################################################
+# # Modo headless - todos os servidores em um único processo, sem janela
+# ############################################################################
+class VotemapHeadless:
+    def __init__(self, config_file=CONFIG_FILENAME, porta_metricas=None):
+        self.config_file = config_file
+        self.engines = []
+        self.reactor = EngineReactor()  # Uma thread de I/O para todos os servidores
+        self.porta_metricas = porta_metricas  # None = usa "metrics_port" do arquivo de configuração
+        self.metricas = None
+        self._stop_event = threading.Event()
+
+    def carregar_servidores(self):
+        """Lê o arquivo de configuração e cria um ServidorEngine por servidor."""
+        with open(self.config_file, 'r', encoding='utf-8') as f:
+            config_data = json.load(f)
+        servers_config_list = config_data.get("servers", [])
+        checkpoints = CheckpointStore.compartilhado(caminho_checkpoints(self.config_file))
+        for i, srv_conf in enumerate(servers_config_list):
+            nome = srv_conf.get("nome", f"Servidor {i + 1}")
+            self.engines.append(ServidorEngine(nome, srv_conf, reactor=self.reactor, checkpoints=checkpoints))
+        if self.porta_metricas is None:
+            self.porta_metricas = config_data.get("metrics_port", 0)
+        logging.info(f"Headless: {len(self.engines)} servidor(es) carregado(s) de {self.config_file}")
+        return self.engines
+
+    def run(self):
+        self.reactor.start()
+        if self.porta_metricas:
+            self.metricas = ServidorMetricas(self.porta_metricas, lambda: self.engines)
+            self.metricas.start()
+        try:
+            for engine in self.engines:
+                engine.iniciar_observacao_json()
+            iniciados = sum(1 for engine in self.engines if engine.start())
+            if not iniciados:
+                logging.error("Headless: nenhum servidor com pasta de logs válida. Encerrando.")
+                return 1
+            logging.info(f"Headless: monitorando {iniciados} de {len(self.engines)} servidor(es).")
+            # wait() com timeout para o Ctrl+C continuar funcionando no Windows
+            while not self._stop_event.wait(1.0):
+                pass
+            return 0
+        finally:
+            parar_engines(self.engines)
+            self.reactor.stop()
+            if self.metricas:
+                self.metricas.stop()
+
+    def stop(self, *args):
+        self._stop_event.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Predadores Votemap Patch - motor sem interface gráfica.")
+    parser.add_argument("--headless", action="store_true",
+                        help="Roda todos os servidores do arquivo de configuração sem abrir a janela.")
+    parser.add_argument("--config", default=CONFIG_FILENAME,
+                        help=f"Arquivo de configuração multi-servidor (padrão: {CONFIG_FILENAME}).")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="Nível do log (padrão: 'log_level' da configuração, ou INFO).")
+    parser.add_argument("--log-max-mb", type=float, default=None,
+                        help=f"Tamanho (MB) do {LOG_FILENAME} antes de rotacionar; 0 desativa (padrão: 'log_max_mb').")
+    parser.add_argument("--log-backups", type=int, default=None,
+                        help="Arquivos de log rotacionados mantidos (padrão: 'log_backups').")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="Porta local do endpoint de métricas (0 desativa; padrão: 'metrics_port' da configuração).")
+    args = parser.parse_args(argv)
+
+    opcoes = opcoes_log_da_config(args.config)
+    if args.log_level:
+        opcoes["nivel"] = getattr(logging, args.log_level)
+    if args.log_max_mb is not None:
+        opcoes["max_bytes"] = max(0, int(args.log_max_mb * 1048576))
+    if args.log_backups is not None:
+        opcoes["backups"] = max(0, args.log_backups)
+    configurar_logging(console=True, **opcoes)
+
+    headless = VotemapHeadless(args.config, porta_metricas=args.metrics_port)
+    try:
+        headless.carregar_servidores()
+    except (OSError, json.JSONDecodeError) as e_config:
+        logging.error(f"Headless: falha ao ler configuração '{args.config}': {e_config}")
+        return 1
+
+    signal.signal(signal.SIGTERM, headless.stop)
+    try:
+        return headless.run()
+    except KeyboardInterrupt:
+        logging.info("Interrupção por teclado (Ctrl+C) recebida. Encerrando...")
+        return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,337 @@
+"""Replay de console.log para medir a latência ponta a ponta da troca de mapa.
+
+Escreve um console.log sintético (ou gravado) em uma árvore ``logs_*`` temporária,
+no ritmo escolhido, com sequências ``EndVote()``/``Winner: [n]`` e trocas de sessão,
+e roda o ServidorEngine de verdade contra JSONs de servidor/votemap temporários.
+Para cada voto mede o tempo entre a escrita da linha do vencedor e a gravação do
+novo ``scenarioId`` (o motor avisa logo após o os.replace). Todas as gravações são
+registradas e casadas com os votos na ordem, então um voto sobrescrito pelo
+seguinte antes de ser conferido não conta como perdido; ao final, o
+``scenarioId`` no disco precisa ser o do último voto.
+
+Roda em Linux puro (sem Tk, sem serviço do Windows), então pode ser usado como
+critério de release:
+
+    python votemap_replay.py --modo rajada --votos 50 --max-p95-ms 50
+"""
+import os
+import sys
+import json
+import time
+import queue
+import collections
+import shutil
+import logging
+import argparse
+import datetime
+import tempfile
+import threading
+import statistics
+
+import votemap_engine
+from votemap_engine import ServidorEngine, ServidorEngineListener, EngineReactor, CheckpointStore
+
+MAPAS_REPLAY = ["{RANDOM}Missions/Random.conf"] + [f"{{REPLAY{i:02d}}}Missions/Mapa_{i:02d}.conf" for i in range(1, 6)]
+SESSAO_INICIAL = datetime.datetime(2025, 1, 1, 12, 0, 0)
+LINHA_SINTETICA = "{hora}  SCRIPT       : [Replay] linha de ruído {n} - BaseGameMode tick, players=64, fps=58.3\n"
+LINHA_FIM_VOTO = "{hora}  SCRIPT       : SCR_VotingManagerComponent.EndVote()\n"
+LINHA_VENCEDOR = "{hora}  SCRIPT       : Winner: [{indice}]\n"
+
+
+class _ListenerSilencioso(ServidorEngineListener):
+    """Não exibe as linhas do log; só registra cada gravação do JSON do servidor, com o instante."""
+
+    def __init__(self, eventos):
+        self._eventos = eventos
+
+    def json_servidor_atualizado(self, dados):
+        agora = time.perf_counter()
+        self._eventos.put(("gravado", agora, (dados.get("game") or {}).get("scenarioId")))
+
+
+class GeradorLinhas:
+    """Linhas de ruído sintéticas ou de um console.log gravado (sem as linhas de voto/vencedor)."""
+
+    def __init__(self, arquivo_gravado=None):
+        self._n = 0
+        self._gravadas = None
+        if arquivo_gravado:
+            with open(arquivo_gravado, 'r', encoding=votemap_engine.LOG_ENCODING, errors='replace') as f:
+                self._gravadas = [linha if linha.endswith("\n") else linha + "\n" for linha in f
+                                  if "EndVote" not in linha and "Winner:" not in linha]
+            if not self._gravadas:
+                raise ValueError(f"'{arquivo_gravado}' não tem linhas utilizáveis para o replay.")
+
+    def proximas(self, quantidade):
+        linhas = []
+        for _ in range(quantidade):
+            self._n += 1
+            if self._gravadas:
+                linhas.append(self._gravadas[self._n % len(self._gravadas)])
+            else:
+                linhas.append(LINHA_SINTETICA.format(hora=_hora(), n=self._n))
+        return "".join(linhas)
+
+
+def _hora():
+    return datetime.datetime.now().strftime("%H:%M:%S.%f")[:-3]
+
+
+class ReplayVotemap:
+    def __init__(self, modo="constante", votos=20, taxa=2000, linhas_entre_votos=2000, votos_por_sessao=5,
+                 rajada=5000, pausa_rajada_s=0.5, arquivo_gravado=None, timeout_voto_s=10.0, diretorio=None,
+                 aguardar_antes_da_sessao=False):
+        self.modo = modo
+        self.votos = votos
+        self.taxa = taxa
+        self.linhas_entre_votos = linhas_entre_votos
+        self.votos_por_sessao = votos_por_sessao
+        self.aguardar_antes_da_sessao = aguardar_antes_da_sessao
+        self.rajada = rajada
+        self.pausa_rajada_s = pausa_rajada_s
+        self.timeout_voto_s = timeout_voto_s
+        self.gerador = GeradorLinhas(arquivo_gravado)
+        self._diretorio_proprio = diretorio is None
+        self.diretorio = diretorio or tempfile.mkdtemp(prefix="votemap_replay_")
+        self.pasta_logs = os.path.join(self.diretorio, "logs")
+        self.server_json = os.path.join(self.diretorio, "server.json")
+        self.votemap_json = os.path.join(self.diretorio, "votemap.json")
+        self._sessao = 0
+        self._log = None
+        self._eventos = queue.Queue()  # ("voto", t_escrita_vencedor, esperado) / ("gravado", t, scenarioId) / None
+        self.latencias_ms = []
+        self.perdidos = 0
+        self._votos_escritos = 0
+        self._resolvidos = threading.Condition()  # Avisada a cada voto medido ou perdido
+        self.ultimo_gravado = None
+        self.json_final_confere = None
+        self.linhas_escritas = 0
+
+    # --- Preparação ---
+    def preparar(self):
+        os.makedirs(self.pasta_logs, exist_ok=True)
+        with open(self.server_json, 'w', encoding='utf-8') as f:
+            json.dump({"game": {"scenarioId": MAPAS_REPLAY[0]}}, f, indent=4)
+        with open(self.votemap_json, 'w', encoding='utf-8') as f:
+            json.dump({"list": MAPAS_REPLAY}, f, indent=4)
+        self._nova_sessao()
+
+    def _nova_sessao(self):
+        """Cria a próxima pasta logs_* (timestamp crescente) e passa a escrever no console.log dela."""
+        if self._log:
+            self._log.close()
+        nome = (SESSAO_INICIAL + datetime.timedelta(minutes=self._sessao)).strftime("logs_%Y-%m-%d_%H-%M-%S")
+        self._sessao += 1
+        pasta = os.path.join(self.pasta_logs, nome)
+        os.makedirs(pasta, exist_ok=True)
+        self._log = open(os.path.join(pasta, "console.log"), 'a', encoding=votemap_engine.LOG_ENCODING)
+
+    # --- Escrita ---
+    def _escrever(self, texto, linhas):
+        self._log.write(texto)
+        self._log.flush()
+        self.linhas_escritas += linhas
+
+    def _escrever_ruido(self, total):
+        if self.modo == "max":
+            while total > 0:
+                lote = min(total, 1000)
+                self._escrever(self.gerador.proximas(lote), lote)
+                total -= lote
+        elif self.modo == "rajada":
+            while total > 0:
+                lote = min(total, self.rajada)
+                self._escrever(self.gerador.proximas(lote), lote)
+                total -= lote
+                time.sleep(self.pausa_rajada_s)
+        else:  # constante: lotes a cada 10 ms
+            por_lote = max(1, int(self.taxa / 100))
+            proximo = time.perf_counter()
+            while total > 0:
+                lote = min(total, por_lote)
+                self._escrever(self.gerador.proximas(lote), lote)
+                total -= lote
+                proximo += 0.01
+                espera = proximo - time.perf_counter()
+                if espera > 0:
+                    time.sleep(espera)
+
+    def _escrever_voto(self, numero_voto):
+        indice = 1 + numero_voto % (len(MAPAS_REPLAY) - 1)  # Votos seguidos nunca repetem o mapa
+        self._escrever(LINHA_FIM_VOTO.format(hora=_hora()), 1)
+        t_vencedor = time.perf_counter()
+        # Enfileirado antes da linha: a gravação do motor nunca chega ao medidor antes do próprio voto
+        self._eventos.put(("voto", t_vencedor, MAPAS_REPLAY[indice]))
+        self._votos_escritos += 1
+        self._escrever(LINHA_VENCEDOR.format(hora=_hora(), indice=indice), 1)
+
+    # --- Medição ---
+    def _ler_scenario_id(self):
+        try:
+            with open(self.server_json, 'r', encoding='utf-8') as f:
+                return json.load(f).get("game", {}).get("scenarioId")
+        except (OSError, ValueError):  # Arquivo sendo regravado
+            return None
+
+    def _aguardar_votos_aplicados(self):
+        """Opcional (--aguardar-antes-da-sessao): só abre outra sessão depois que os votos da atual foram
+        aplicados. Por padrão as sessões vêm coladas, e um voto perdido na troca de sessão reprova o replay."""
+        with self._resolvidos:
+            self._resolvidos.wait_for(lambda: len(self.latencias_ms) + self.perdidos >= self._votos_escritos,
+                                      timeout=self.timeout_voto_s)
+
+    def _resolver(self, latencia_ms=None):
+        with self._resolvidos:
+            if latencia_ms is None:
+                self.perdidos += 1
+            else:
+                self.latencias_ms.append(latencia_ms)
+            self._resolvidos.notify_all()
+
+    def _medir(self):
+        """Casa as gravações com os votos pendentes, na ordem. Uma gravação que pula votos os conta como perdidos."""
+        pendentes = collections.deque()  # (t_escrita_vencedor, scenarioId esperado)
+        limite_final = None
+        while True:
+            if limite_final is not None:
+                if not pendentes:
+                    break
+                restante = limite_final - time.perf_counter()
+                if restante <= 0:
+                    break
+            else:
+                restante = None
+            try:
+                item = self._eventos.get(timeout=restante)
+            except queue.Empty:
+                break
+            if item is None:
+                limite_final = time.perf_counter() + self.timeout_voto_s
+                continue
+            tipo, instante, scenario_id = item
+            if tipo == "voto":
+                pendentes.append((instante, scenario_id))
+                continue
+            self.ultimo_gravado = scenario_id
+            posicao = next((i for i, (_, esperado) in enumerate(pendentes) if esperado == scenario_id), None)
+            if posicao is None:
+                continue  # Gravação que não corresponde a nenhum voto pendente
+            for _ in range(posicao):
+                _, esperado = pendentes.popleft()
+                self._resolver()
+                logging.error(f"Replay: scenarioId '{esperado}' nunca foi gravado (voto seguinte já aplicado).")
+            t_vencedor, _ = pendentes.popleft()
+            self._resolver((instante - t_vencedor) * 1000)
+        for _, esperado in pendentes:
+            self._resolver()
+            logging.error(f"Replay: scenarioId '{esperado}' não foi gravado em {self.timeout_voto_s}s.")
+
+    # --- Execução ---
+    def executar(self):
+        self.preparar()
+        reactor = EngineReactor()
+        reactor.start()
+        engine = ServidorEngine("Replay", {
+            "log_folder": self.pasta_logs,
+            "server_json": self.server_json,
+            "votemap_json": self.votemap_json,
+            "auto_restart": False,
+        }, listener=_ListenerSilencioso(self._eventos), reactor=reactor,
+            checkpoints=CheckpointStore(os.path.join(self.diretorio, "checkpoints.json")))
+        medidor = threading.Thread(target=self._medir, daemon=True, name="ReplayMedidor")
+        medidor.start()
+        inicio = time.perf_counter()
+        try:
+            engine.start()
+            time.sleep(0.5)  # Motor abre o console.log inicial
+            for numero_voto in range(self.votos):
+                if numero_voto and self.votos_por_sessao and numero_voto % self.votos_por_sessao == 0:
+                    if self.aguardar_antes_da_sessao:
+                        self._aguardar_votos_aplicados()
+                    self._nova_sessao()
+                self._escrever_ruido(self.linhas_entre_votos)
+                self._escrever_voto(numero_voto)
+            self._eventos.put(None)
+            medidor.join()
+            if self.votos:
+                self.json_final_confere = self._ler_scenario_id() == self.ultimo_gravado
+        finally:
+            engine.stop(from_tab_closure=True)
+            reactor.stop()
+            if self._log:
+                self._log.close()
+            if self._diretorio_proprio:
+                shutil.rmtree(self.diretorio, ignore_errors=True)
+        return self.resumo(time.perf_counter() - inicio)
+
+    def resumo(self, duracao_s):
+        lat = sorted(self.latencias_ms)
+        resumo = {
+            "modo": self.modo,
+            "votos": self.votos,
+            "detectados": len(lat),
+            "perdidos": self.perdidos,
+            "json_final_confere": self.json_final_confere,
+            "sessoes": self._sessao,
+            "linhas_escritas": self.linhas_escritas,
+            "duracao_s": round(duracao_s, 3),
+            "inotify": votemap_engine.INOTIFY_AVAILABLE,
+        }
+        if lat:
+            resumo.update({
+                "latencia_min_ms": round(lat[0], 3),
+                "latencia_mediana_ms": round(statistics.median(lat), 3),
+                "latencia_p95_ms": round(lat[min(len(lat) - 1, int(round(0.95 * (len(lat) - 1))))], 3),
+                "latencia_max_ms": round(lat[-1], 3),
+            })
+        return resumo
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay de console.log para medir a latência Winner -> scenarioId.")
+    parser.add_argument("--modo", choices=["constante", "rajada", "max"], default="constante",
+                        help="Ritmo de escrita do ruído entre votos.")
+    parser.add_argument("--votos", type=int, default=20, help="Quantidade de votações (EndVote + Winner).")
+    parser.add_argument("--taxa", type=int, default=2000, help="Linhas/s no modo constante.")
+    parser.add_argument("--linhas-entre-votos", type=int, default=2000, help="Linhas de ruído antes de cada voto.")
+    parser.add_argument("--votos-por-sessao", type=int, default=5,
+                        help="Cria uma nova pasta logs_* a cada N votos (0 = sessão única).")
+    parser.add_argument("--rajada", type=int, default=5000, help="Linhas por rajada no modo rajada.")
+    parser.add_argument("--pausa-rajada", type=float, default=0.5, help="Pausa (s) entre rajadas.")
+    parser.add_argument("--aguardar-antes-da-sessao", action="store_true",
+                        help="Só cria a próxima pasta logs_* depois que os votos da atual foram aplicados.")
+    parser.add_argument("--arquivo", help="console.log gravado para usar como ruído (em vez do sintético).")
+    parser.add_argument("--timeout-voto", type=float, default=10.0, help="Tempo (s) até considerar um voto perdido.")
+    parser.add_argument("--diretorio", help="Diretório de trabalho (padrão: temporário, removido ao final).")
+    parser.add_argument("--polling", action="store_true", help="Desativa o inotify (simula o fallback por polling).")
+    parser.add_argument("--json", action="store_true", help="Imprime o resumo em JSON.")
+    parser.add_argument("--max-p95-ms", type=float, help="Falha (código 1) se o p95 da latência passar deste valor.")
+    parser.add_argument("--log-level", default="WARNING", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=getattr(logging, args.log_level), format=votemap_engine.LOG_FORMAT)
+    if args.polling:
+        votemap_engine.INOTIFY_AVAILABLE = False
+
+    replay = ReplayVotemap(modo=args.modo, votos=args.votos, taxa=args.taxa,
+                           linhas_entre_votos=args.linhas_entre_votos, votos_por_sessao=args.votos_por_sessao,
+                           rajada=args.rajada, pausa_rajada_s=args.pausa_rajada, arquivo_gravado=args.arquivo,
+                           timeout_voto_s=args.timeout_voto, diretorio=args.diretorio,
+                           aguardar_antes_da_sessao=args.aguardar_antes_da_sessao)
+    resumo = replay.executar()
+
+    if args.json:
+        print(json.dumps(resumo, indent=2))
+    else:
+        for chave, valor in resumo.items():
+            print(f"{chave:>22}: {valor}")
+
+    if resumo["perdidos"] or resumo["json_final_confere"] is False:
+        return 1
+    if args.max_p95_ms is not None and resumo.get("latencia_p95_ms", float("inf")) > args.max_p95_ms:
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())